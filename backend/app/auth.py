@@ -1,22 +1,61 @@
+import math
+import secrets
+import time
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy import event, inspect
 from app import models
 from app.config import settings
+from app.passwords import (
+    HashPoolBusy, LoginThrottled, hash_password, hash_pool, login_throttle, pwd_context, verify_and_update,
+)
+from app.revocation import USER, revocations, revoke
 
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
+# Header is optional here: EventSource can't send one (see get_current_user_for_stream)
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return hash_password(password)
+
+# Login hashes in the bounded pool of app.passwords, so a burst of logins
+# waits there instead of occupying request threads
+
+def _hash_pool_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many logins in progress, try again shortly",
+        headers={"Retry-After": "1"},
+    )
+
+def throttle_login(username: str):
+    try:
+        login_throttle.hit(username)
+    except LoginThrottled as exc:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts, try again later",
+            headers={"Retry-After": str(math.ceil(exc.retry_after))},
+        )
+
+async def verify_password_pooled(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """(matches, replacement hash if the stored one uses outdated rounds)."""
+    try:
+        return await hash_pool.run(verify_and_update, plain_password, hashed_password)
+    except HashPoolBusy:
+        raise _hash_pool_busy()
+
+async def get_password_hash_pooled(password: str) -> str:
+    try:
+        return await hash_pool.run(hash_password, password)
+    except HashPoolBusy:
+        raise _hash_pool_busy()
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -28,21 +67,92 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
+# Tokens
+#
+# Access tokens are short-lived (ACCESS_TOKEN_EXPIRE_MINUTES) and carry the
+# user's id, name and email, so validating one is a signature check plus a
+# lookup in the in-memory revocation list (app.revocation), with no database
+# I/O. A login also gets a refresh token for the same session (`sid`); the
+# session ends REFRESH_TOKEN_EXPIRE_DAYS after login, and /refresh, which
+# does read the user row, issues new tokens until then.
+
+ACCESS = "access"
+REFRESH = "refresh"
+
+def create_tokens(user: models.User, session_id: str = None, session_expires: datetime = None) -> dict:
+    """Access and refresh token for `user`, continuing `session_id` if given."""
+    now = datetime.now(timezone.utc)
+    if session_id is None:
+        session_id = secrets.token_urlsafe(16)
+        session_expires = now + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    access_expires = min(now + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES), session_expires)
+    claims = {"sub": user.username, "uid": user.id, "sid": session_id, "iat": now}
+    access_token = create_access_token(
+        {**claims, "type": ACCESS, "email": user.email, "sexp": int(session_expires.timestamp())},
+        expires_delta=access_expires - now,
+    )
+    refresh_token = create_access_token({**claims, "type": REFRESH}, expires_delta=session_expires - now)
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+        "expires_in": int((access_expires - now).total_seconds()),
+    }
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def decode_token(token: str, token_type: str = ACCESS) -> dict:
+    """Verified, unrevoked claims of a token of `token_type`, or a 401."""
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
+        claims = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
     except JWTError:
-        raise credentials_exception
-    
-    user = db.query(models.User).filter(models.User.username == username).first()
-    if user is None:
-        raise credentials_exception
-    return user
\ No newline at end of file
+        raise _credentials_exception()
+    # Tokens from before refresh tokens existed lack uid/sid; they must log in again
+    if claims.get("type") != token_type or claims.get("sub") is None or claims.get("uid") is None:
+        raise _credentials_exception()
+    if revocations.is_revoked(claims.get("sid"), str(claims["uid"]), claims.get("iat", 0)):
+        raise _credentials_exception()
+    return claims
+
+def _token_user(claims: dict) -> models.User:
+    # Transient, never added to a session; inactive users' tokens are revoked
+    return models.User(id=claims["uid"], username=claims["sub"], email=claims.get("email"), is_active=True)
+
+async def get_current_claims(token: str = Depends(oauth2_scheme)) -> dict:
+    return decode_token(token)
+
+async def get_current_user(claims: dict = Depends(get_current_claims)) -> models.User:
+    # async, and free of I/O, so it runs on the event loop without a thread hop
+    return _token_user(claims)
+
+async def get_current_user_for_stream(
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+    access_token: Optional[str] = None,
+):
+    # Browsers' EventSource can't set headers, so the token may also come as
+    # ?access_token=. It is only checked when the stream opens.
+    token = token or access_token
+    if not token:
+        raise _credentials_exception()
+    return _token_user(decode_token(token))
+
+@event.listens_for(models.User, "after_update")
+def _revoke_deactivated_user(mapper, connection, target):
+    history = inspect(target).attrs.is_active.history
+    if history.has_changes() and not target.is_active:
+        _revoke_user_tokens(connection, target)
+
+@event.listens_for(models.User, "after_delete")
+def _revoke_deleted_user(mapper, connection, target):
+    _revoke_user_tokens(connection, target)
+
+def _revoke_user_tokens(connection, user: models.User):
+    # Every token issued so far has expired once the longest session would have.
+    # Applied in memory only once the flushing session commits.
+    expires_at = time.time() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS).total_seconds()
+    revoke(USER, user.id, expires_at, connection, session=inspect(user).session)
\ No newline at end of file
@@ -0,0 +1,278 @@
+from pathlib import Path
+import sys
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+import argparse
+import csv
+import io
+import json
+import logging
+from typing import Callable, IO, Iterable, Iterator, Optional, Tuple
+from pydantic import ValidationError
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app import counters, models, schemas, stats
+from app.events import emit
+
+# Streaming bulk import of books from CSV or JSON Lines.
+#
+# Rows are parsed one at a time and written in batches: each batch checks
+# its ISBNs against the database with one IN query and is inserted with a
+# single executemany (or upsert) in its own transaction, so memory stays
+# bounded by the batch size regardless of the file size.
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("csv", "jsonl")
+DUPLICATE_MODES = ("skip", "update")
+MAX_REPORTED_ERRORS = 1000
+_BOOK_FIELDS = ("title", "author", "isbn", "category", "status", "copies")
+
+
+def detect_format(filename: Optional[str]) -> str:
+    suffix = Path(filename or "").suffix.lower()
+    if suffix in (".jsonl", ".ndjson", ".json"):
+        return "jsonl"
+    return "csv"
+
+
+def iter_rows(stream: IO[bytes], fmt: str) -> Iterator[Tuple[int, object]]:
+    """Yield `(line_number, record)` pairs without reading the whole stream."""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for record in reader:
+            yield reader.line_num, record
+    elif fmt == "jsonl":
+        for line_number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_number, e
+    else:
+        raise ValueError(f"Unsupported format {fmt!r}, expected one of {FORMATS}")
+
+
+def _validate(record) -> dict:
+    if isinstance(record, Exception):
+        raise ValueError(f"Invalid JSON: {record}")
+    if not isinstance(record, dict):
+        raise ValueError("Row must be an object")
+    # Blank CSV cells fall back to the schema defaults
+    values = {k: v for k, v in record.items() if k in _BOOK_FIELDS and v not in (None, "")}
+    book = schemas.BookCreate(**values).dict()
+    # A new title has every copy on the shelf, whatever the file says
+    # (overwritten titles get theirs in _resize_shelves)
+    book["status"] = models.BookStatus(book["status"])
+    if book["status"] != models.BookStatus.RESERVED:
+        book["status"] = models.BookStatus.AVAILABLE if book["copies"] else models.BookStatus.BORROWED
+    return book
+
+
+def _upsert_statement(db: Session):
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        raise ValueError(f"on_duplicate='update' is not supported on {dialect}")
+
+    stmt = dialect_insert(models.Book)
+    return stmt.on_conflict_do_update(
+        index_elements=[models.Book.isbn],
+        set_={
+            # status and available_copies follow the loans, see _resize_shelves
+            **{field: stmt.excluded[field] for field in _BOOK_FIELDS if field not in ("isbn", "status")},
+            "updated_at": func.now(),
+        },
+    )
+
+
+class ImportResult:
+    def __init__(self):
+        self.processed = 0
+        self.inserted = 0
+        self.updated = 0
+        self.skipped = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, row: int, isbn: Optional[str], error: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "isbn": isbn, "error": error})
+
+    def as_dict(self) -> dict:
+        return {
+            "processed": self.processed,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+def _resize_shelves(db: Session, isbns: list):
+    # Overwritten titles: copies minus open loans on the shelf, and the
+    # status that goes with it
+    shelf = models.available_copies_after_resize(models.Book.copies)
+    db.execute(update(models.Book).where(models.Book.isbn.in_(isbns)).values(
+        available_copies=shelf,
+        status=models.status_for_shelf(shelf),
+    ))
+
+
+def _counted_rows(db: Session, isbns: list, lock: bool = False):
+    # The columns behind the stats counters, for the books with these ISBNs
+    query = select(
+        models.Book.isbn, models.Book.status, models.Book.copies, models.Book.available_copies, models.Book.category
+    ).where(models.Book.isbn.in_(isbns))
+    return db.execute(query.with_for_update() if lock else query).all()
+
+
+def _write_batch(db: Session, batch: list, on_duplicate: str, result: ImportResult):
+    isbns = [book["isbn"] for _, book in batch]
+    before = _counted_rows(db, isbns, lock=on_duplicate == "update")
+    existing = {row.isbn for row in before}
+    new_books = [book for _, book in batch if book["isbn"] not in existing]
+
+    deltas = {}
+    if on_duplicate == "update":
+        db.execute(_upsert_statement(db), [book for _, book in batch])
+        if existing:
+            _resize_shelves(db, list(existing))
+        updated = len(batch) - len(new_books)
+        result.updated += updated
+        # Overwritten rows: counters move from the old values to the new ones
+        for row in before:
+            stats.merge_deltas(deltas, stats.book_deltas(*row[1:], sign=-1))
+        for row in _counted_rows(db, isbns):
+            stats.merge_deltas(deltas, stats.book_deltas(*row[1:]))
+    else:
+        updated = 0
+        result.skipped += len(batch) - len(new_books)
+        if new_books:
+            db.execute(insert(models.Book), new_books)
+        for book in new_books:
+            stats.merge_deltas(deltas, stats.book_deltas(book["status"], book["copies"], book["copies"], book["category"]))
+    result.inserted += len(new_books)
+    counters.apply(db, deltas)
+
+    if updated:
+        # Overwritten rows can change any counter; have live clients reload
+        emit(db, "resync", {"reason": "books_imported", "inserted": len(new_books), "updated": updated})
+    elif new_books:
+        emit(db, "books_imported", {"inserted": len(new_books)}, deltas=deltas)
+    db.commit()
+
+
+def _write_rows_individually(db: Session, batch: list, on_duplicate: str, result: ImportResult):
+    # Fallback when a batch hits a constraint (e.g. a concurrent insert of the same ISBN)
+    for row, book in batch:
+        try:
+            _write_batch(db, [(row, book)], on_duplicate, result)
+        except IntegrityError as e:
+            db.rollback()
+            result.add_error(row, book["isbn"], str(e.orig))
+
+
+def import_books(
+    db: Session,
+    rows: Iterable[Tuple[int, object]],
+    batch_size: int = 5000,
+    on_duplicate: str = "skip",
+    progress: Optional[Callable[[ImportResult], None]] = None,
+) -> dict:
+    """Validate and write `rows` in batches, returning an import summary."""
+    if on_duplicate not in DUPLICATE_MODES:
+        raise ValueError(f"on_duplicate must be one of {DUPLICATE_MODES}")
+
+    result = ImportResult()
+    batch = []
+    batch_isbns = set()
+
+    def flush():
+        if not batch:
+            return
+        try:
+            _write_batch(db, batch, on_duplicate, result)
+        except IntegrityError:
+            db.rollback()
+            _write_rows_individually(db, batch, on_duplicate, result)
+        batch.clear()
+        batch_isbns.clear()
+        if progress:
+            progress(result)
+
+    for row, record in rows:
+        result.processed += 1
+        try:
+            book = _validate(record)
+        except (ValidationError, ValueError, TypeError) as e:
+            isbn = record.get("isbn") if isinstance(record, dict) else None
+            result.add_error(row, isbn, str(e))
+            continue
+
+        # Duplicates inside the same batch would break the executemany
+        if book["isbn"] in batch_isbns:
+            flush()
+        batch.append((row, book))
+        batch_isbns.add(book["isbn"])
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+
+    if result.inserted or result.updated:
+        stats.invalidate_stats()
+    return result.as_dict()
+
+
+def log_progress(result: ImportResult):
+    logger.info(
+        "Book import: %d rows processed, %d inserted, %d updated, %d skipped, %d failed",
+        result.processed, result.inserted, result.updated, result.skipped, result.failed,
+    )
+
+
+def main():
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Import books from a CSV or JSON Lines file.")
+    parser.add_argument("path", help="File to import, or '-' for stdin")
+    parser.add_argument("--format", choices=FORMATS, help="Defaults to the file extension")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--on-duplicate", choices=DUPLICATE_MODES, default="skip")
+    args = parser.parse_args()
+
+    def report(result: ImportResult):
+        print(
+            f"\r{result.processed:,} rows: {result.inserted:,} inserted, {result.updated:,} updated, "
+            f"{result.skipped:,} skipped, {result.failed:,} failed",
+            end="", file=sys.stderr, flush=True,
+        )
+
+    fmt = args.format or detect_format(None if args.path == "-" else args.path)
+    stream = sys.stdin.buffer if args.path == "-" else open(args.path, "rb")
+    db = SessionLocal()
+    try:
+        summary = import_books(db, iter_rows(stream, fmt), args.batch_size, args.on_duplicate, report)
+    finally:
+        db.close()
+        stream.close()
+    print(file=sys.stderr)
+    for error in summary["errors"]:
+        print(f"row {error['row']}: {error['error']}", file=sys.stderr)
+    print(json.dumps({k: v for k, v in summary.items() if k != "errors"}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+from pathlib import Path
+import sys
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+import argparse
+from app.database import engine
+from app import schema
+
+def migrate(args):
+    schema.upgrade(engine, args.revision)
+    print(f"Database at revision {schema.current_revision(engine)}")
+
+def current(args):
+    revision = schema.current_revision(engine)
+    head = schema.head_revision()
+    print(f"current: {revision or 'none'}")
+    print(f"head:    {head}")
+    if revision != head:
+        sys.exit(1)
+
+def seed(args):
+    from app.seed_data import seed_database
+    seed_database()
+
+def generate(args):
+    from app import datagen
+    datagen.run(args)
+
+def reconcile_counters(args):
+    from app.counters import reconcile
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        drift = reconcile(db)
+    finally:
+        db.close()
+    for name, (stored, counted) in sorted(drift.items()):
+        print(f"{name}: {stored} -> {counted}")
+    print(f"{len(drift)} counter(s) repaired")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="perpus", description="Perpus backend management commands.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = commands.add_parser("migrate", help="Upgrade the database schema")
+    migrate_parser.add_argument("revision", nargs="?", default="head")
+    migrate_parser.set_defaults(func=migrate)
+
+    commands.add_parser("current", help="Show the schema revision, exit 1 if not at head").set_defaults(func=current)
+    commands.add_parser("seed", help="Migrate and load the sample data").set_defaults(func=seed)
+
+    generate_parser = commands.add_parser("generate", help="Migrate and fill an empty database with synthetic data")
+    # Imported lazily above; the arguments are declared next to the generator
+    from app.datagen import add_arguments
+    add_arguments(generate_parser)
+    generate_parser.set_defaults(func=generate)
+
+    commands.add_parser(
+        "reconcile-counters", help="Recount the stats counters and repair any drift"
+    ).set_defaults(func=reconcile_counters)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,56 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 
 class Settings(BaseSettings):
     SECRET_KEY: str = "your-secret-key-here-change-in-production"
     ALGORITHM: str = "HS256"
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = 480  # 8 hours for development
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 15  # validated without database I/O, so kept short
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 7  # a login's session; refreshing doesn't extend it
+    TOKEN_REVOCATION_STORE: str = "memory"  # memory (per process) or database (shared by all workers)
+    TOKEN_REVOCATION_SYNC_SECONDS: float = 5.0  # database store only
     DATABASE_URL: str = "sqlite:///./perpus.db"
+    DATABASE_REPLICA_URLS: List[str] = []  # read-only copies for safe GET handlers, e.g. '["postgresql://..."]'
+    REPLICA_STICKY_SECONDS: float = 5.0  # reads go to the primary this long after a caller's write
+    DB_ASYNC: bool = False  # serve the API routers with async handlers and an async engine
+    ASYNC_DATABASE_URL: Optional[str] = None  # derived from DATABASE_URL when unset
+    # Connection pool (ignored for in-memory SQLite)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE: int = 1800  # seconds
+    # SQLite tuning, applied to every new connection of a file database
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_CACHE_SIZE: int = -64000  # negative means KiB, so 64 MB
+    SQLITE_MMAP_SIZE: int = 268435456  # 256 MB
     ALLOWED_ORIGINS: List[str] = ["http://localhost:5173"]
+    # Password hashing (app.passwords)
+    PASSWORD_HASH_ROUNDS: int = 29000  # pbkdf2_sha256; other hashes are upgraded at next login
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_EXECUTOR: str = "thread"  # thread or process
+    PASSWORD_HASH_QUEUE_SIZE: int = 32  # hashes waiting or running before logins get a 503
+    LOGIN_ATTEMPTS_PER_WINDOW: int = 10  # per username, 0 disables the throttle
+    LOGIN_THROTTLE_WINDOW_SECONDS: float = 60.0
+    STATS_CACHE_TTL_SECONDS: float = 10.0  # 0 disables the dashboard stats cache
+    JSON_RESPONSE: str = "auto"  # auto (orjson when installed), orjson or json
+    GZIP_ENABLED: bool = True
+    GZIP_MINIMUM_SIZE: int = 1000  # bytes; smaller bodies are sent as is
+    GZIP_COMPRESS_LEVEL: int = 6
+    OPEN_LOANS_REFRESH_SECONDS: float = 60.0  # background reconcile of open_loans, 0 disables
+    COUNTERS_RECONCILE_SECONDS: float = 300.0  # background repair of the stats counters, 0 disables
+    # Live change events (/api/events/stream)
+    EVENT_BUS: str = "local"  # local (per process) or database (shared by all workers)
+    EVENT_QUEUE_SIZE: int = 1000  # events buffered per client before it is told to resync
+    EVENT_BUS_POLL_SECONDS: float = 0.5  # database bus only
+    EVENT_BUS_GAP_SECONDS: float = 5.0  # database bus only; how long to wait for an id that isn't committed yet
+    EVENT_RETENTION_SECONDS: int = 3600  # database bus only; how far back clients can resume
+    EVENT_KEEPALIVE_SECONDS: float = 15.0
+    # Request instrumentation (/api/metrics)
+    METRICS_ENABLED: bool = True
+    SERVER_TIMING_ENABLED: bool = False  # add a Server-Timing header with db time and query count
+    QUERY_BUDGET: int = 25  # SQL statements per request before an N+1 warning is logged, 0 disables
     
     class Config:
         env_file = ".env"
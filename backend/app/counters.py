@@ -0,0 +1,159 @@
+import asyncio
+import logging
+from typing import Dict, Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from app import models
+from app.config import settings
+
+# Denormalized catalog counters (the `counters` table, see `models.Counter`).
+#
+# Counters are named like the dashboard deltas of `app.stats`
+# ("books.available", "members.active", "loans.active_borrows"), plus one
+# "categories.<category>" per category with its number of titles. Write
+# handlers pass the deltas they already compute for live events to
+# `apply`, in the same transaction as the change, so the stats endpoints
+# read a few rows instead of counting whole tables.
+#
+# Writes that bypass the handlers (bulk scripts, raw SQL) make the stored
+# values drift. `reconcile` recounts the tables and repairs what differs; a
+# background task runs it every COUNTERS_RECONCILE_SECONDS and
+# `perpus reconcile-counters` runs it on demand.
+
+logger = logging.getLogger(__name__)
+
+_counters = models.Counter.__table__
+_books = models.Book.__table__
+_members = models.Member.__table__
+_loans = models.Transaction.__table__
+
+CATEGORY_PREFIX = "categories."
+
+# Relative to the current time, so they can't be stored; counted per request
+# from the open-loan due date index instead (`stats.loan_counts`)
+TIME_RELATIVE = {"loans.overdue", "loans.due_today"}
+
+
+def _insert(db: Session):
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        raise ValueError(f"Counters are not supported on {dialect}")
+    return dialect_insert(_counters)
+
+
+def category_counter(category: str) -> str:
+    return f"{CATEGORY_PREFIX}{category}"
+
+
+def apply(db: Session, deltas: Dict[str, int]):
+    """Add `deltas` to the stored counters, creating missing ones."""
+    # Sorted, so concurrent writers lock the counter rows in the same order
+    rows = [
+        {"name": name, "value": value} for name, value in sorted(deltas.items())
+        if value and name not in TIME_RELATIVE
+    ]
+    if rows:
+        stmt = _insert(db)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[_counters.c.name],
+            set_={"value": _counters.c.value + stmt.excluded.value},
+        ), rows)
+
+
+def read(db: Session, prefix: Optional[str] = None) -> Dict[str, int]:
+    """Stored counters, optionally only those whose name starts with `prefix`."""
+    query = select(_counters.c.name, _counters.c.value)
+    if prefix:
+        query = query.where(_counters.c.name.startswith(prefix, autoescape=True))
+    return dict(db.execute(query).all())
+
+
+def count(db: Session) -> Dict[str, int]:
+    """Every counter recounted from the tables, with one grouped query each."""
+    values = {f"books.{status.value}": 0 for status in models.BookStatus}
+    values.update({"books.total_books": 0, "books.total_copies": 0, "books.available_copies": 0})
+    for status, titles, copies, available in db.execute(
+        select(_books.c.status, func.count(), func.coalesce(func.sum(_books.c.copies), 0),
+               func.coalesce(func.sum(_books.c.available_copies), 0))
+        .group_by(_books.c.status)
+    ):
+        if status is not None:
+            values[f"books.{models.BookStatus(status).value}"] = titles
+        values["books.total_books"] += titles
+        values["books.total_copies"] += copies
+        values["books.available_copies"] += available
+
+    for category, titles in db.execute(select(_books.c.category, func.count()).group_by(_books.c.category)):
+        values[category_counter(category)] = titles
+
+    values.update({"members.total_members": 0, "members.active": 0, "members.expired": 0})
+    for status, members in db.execute(select(_members.c.status, func.count()).group_by(_members.c.status)):
+        values["members.total_members"] += members
+        if status in (models.MemberStatus.ACTIVE, models.MemberStatus.EXPIRED):
+            values[f"members.{models.MemberStatus(status).value}"] = members
+
+    values["loans.active_borrows"] = db.execute(
+        select(func.count()).select_from(_loans).where(*models.open_loan_filter())
+    ).scalar_one()
+    return values
+
+
+def reconcile(db: Session) -> Dict[str, tuple]:
+    """Repair counters that drifted from the tables in one transaction.
+
+    Returns {name: (stored, counted)} for every counter that was off.
+    """
+    # The counter rows are locked before counting, in the order `apply`
+    # takes them. A write committed before that is in the count; one still
+    # running waits for the lock and adds its delta to the repaired value.
+    # SQLite has one writer: if a write commits after this transaction's
+    # reads, its own write fails and the next run repairs the counters.
+    stored = dict(db.execute(
+        select(_counters.c.name, _counters.c.value).order_by(_counters.c.name).with_for_update()
+    ).all())
+    counted = count(db)
+    for name in stored.keys() - counted.keys():
+        counted[name] = 0  # categories with no titles left
+
+    drift = {name: (stored.get(name), value) for name, value in counted.items() if stored.get(name) != value}
+    for name, (before, value) in drift.items():
+        if before is None:
+            # A writer created it meanwhile: left for the next run
+            db.execute(_insert(db).values(name=name, value=value).on_conflict_do_nothing(index_elements=[_counters.c.name]))
+        else:
+            db.execute(update(_counters).where(_counters.c.name == name).values(value=value))
+
+    # Emptied categories don't need a row
+    db.execute(delete(_counters).where(_counters.c.name.startswith(CATEGORY_PREFIX), _counters.c.value == 0))
+    db.commit()
+    return drift
+
+
+async def run_reconciler(session_factory, interval: float = None):
+    """Reconcile forever, starting immediately. Cancel the task to stop it."""
+    interval = settings.COUNTERS_RECONCILE_SECONDS if interval is None else interval
+
+    def reconcile_once():
+        db = session_factory()
+        try:
+            return reconcile(db)
+        finally:
+            db.close()
+
+    while True:
+        try:
+            drift = await run_in_threadpool(reconcile_once)
+            if drift:
+                logger.warning("counters repaired: %s", ", ".join(
+                    f"{name} {before} -> {value}" for name, (before, value) in sorted(drift.items())
+                ))
+        except DBAPIError:
+            # Usually a race with a concurrent write; the next run catches up
+            logger.exception("counter reconciliation failed")
+        await asyncio.sleep(interval)
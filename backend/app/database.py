@@ -1,13 +1,62 @@
-from sqlalchemy import create_engine
+import itertools
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.config import settings
+from app.replicas import reads_primary
 
 DATABASE_URL = settings.DATABASE_URL
 
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
-)
+def _is_memory_sqlite(url) -> bool:
+    # Includes shared-cache URIs: sqlite:///file:name?mode=memory&cache=shared&uri=true
+    return url.get_backend_name() == "sqlite" and (
+        url.database in (None, "", ":memory:") or url.query.get("mode") == "memory"
+    )
+
+def engine_options(url) -> dict:
+    """Pool and driver options for `url`, taken from settings."""
+    url = make_url(url)
+    options = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+    # In-memory SQLite uses a single shared connection, not a sized pool
+    if not _is_memory_sqlite(url):
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+        )
+    if url.get_backend_name() == "sqlite" and url.get_driver_name() == "pysqlite":
+        options["connect_args"] = {"check_same_thread": False}
+    elif url.get_driver_name() == "aiosqlite" and not _is_memory_sqlite(url):
+        # aiosqlite defaults to NullPool; reuse connections (one thread each) instead
+        options["poolclass"] = AsyncAdaptedQueuePool
+    return options
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # busy_timeout first so the journal mode switch waits for other writers
+    cursor.execute(f"PRAGMA busy_timeout = {int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.execute(f"PRAGMA journal_mode = {settings.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous = {settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA cache_size = {int(settings.SQLITE_CACHE_SIZE)}")
+    cursor.execute(f"PRAGMA mmap_size = {int(settings.SQLITE_MMAP_SIZE)}")
+    cursor.close()
+
+def configure_engine(engine):
+    """Apply per-connection tuning to a sync engine (or an async engine's sync_engine)."""
+    if engine.dialect.name == "sqlite" and not _is_memory_sqlite(engine.url):
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+def create_db_engine(url: str = DATABASE_URL):
+    return configure_engine(create_engine(url, **engine_options(url)))
+
+engine = create_db_engine()
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -18,4 +67,84 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Read replicas (DATABASE_REPLICA_URLS). Safe GET handlers take their session
+# from get_read_db, which picks a replica in turn unless the caller has just
+# written (app.replicas); everything else uses the primary through get_db.
+# Sessions on a replica have info["replica"] set.
+replica_engines = [create_db_engine(url) for url in settings.DATABASE_REPLICA_URLS]
+_next_replica = itertools.cycle(range(len(replica_engines))) if replica_engines else None
+
+def read_session(request: Request):
+    """A session for a read-only request: a replica, or the primary after a write."""
+    if not replica_engines or reads_primary(request.headers):
+        return SessionLocal()
+    db = SessionLocal(bind=replica_engines[next(_next_replica)])
+    db.info["replica"] = True
+    return db
+
+def get_read_db(request: Request):
+    db = read_session(request)
+    try:
+        yield db
+    finally:
+        db.close()
+
+# Optional async engine, used when settings.DB_ASYNC is enabled
+_ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+def _async_url(url: str) -> str:
+    scheme, sep, rest = url.partition("://")
+    driver = _ASYNC_DRIVERS.get(scheme)
+    if driver is None:
+        raise ValueError(f"No async driver known for {scheme!r}; set ASYNC_DATABASE_URL")
+    return f"{driver}{sep}{rest}"
+
+def get_async_database_url() -> str:
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    return _async_url(DATABASE_URL)
+
+def _create_async_engine(url: str):
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    engine = create_async_engine(url, **engine_options(url))
+    configure_engine(engine.sync_engine)
+    return engine
+
+_async_engine = None
+_AsyncSessionLocal = None
+_async_replica_engines = None
+
+def get_async_engine():
+    global _async_engine, _AsyncSessionLocal, _async_replica_engines
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        _async_engine = _create_async_engine(get_async_database_url())
+        _async_replica_engines = [_create_async_engine(_async_url(url)) for url in settings.DATABASE_REPLICA_URLS]
+        # Objects stay loaded after commit so responses can be serialized
+        # outside the session's greenlet context
+        _AsyncSessionLocal = async_sessionmaker(
+            _async_engine, autoflush=False, expire_on_commit=False
+        )
+    return _async_engine
+
+async def get_async_db():
+    get_async_engine()
+    async with _AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_read_db(request: Request):
+    get_async_engine()
+    if not _async_replica_engines or reads_primary(request.headers):
+        async with _AsyncSessionLocal() as db:
+            yield db
+        return
+    async with _AsyncSessionLocal(bind=_async_replica_engines[next(_next_replica)]) as db:
+        db.info["replica"] = True
+        yield db
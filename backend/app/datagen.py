@@ -0,0 +1,286 @@
+from pathlib import Path
+import sys
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+import argparse
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Iterator, List
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.engine import Engine
+from app import models
+from app.auth import get_password_hash
+
+# Synthetic datasets at production scale, for reproducing slow queries.
+#
+# Everything is drawn from one `random.Random(seed)`, so the same arguments
+# produce the same rows (dates are relative to the day it runs). Rows are
+# built in chunks and written with Core executemany inserts (no ORM
+# objects), so memory stays bounded by the chunk size. The loan history is
+# consistent with the catalog: every closed loan has its RETURN row, open
+# loans never exceed a title's copies, and the shelf counts, member loan
+# counts, open_loans table and stats counters are derived at the end.
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 10_000
+LOAN_DAYS = 14
+HISTORY_DAYS = 3 * 365
+
+CATEGORIES = [
+    "Fiction", "Fantasy", "Romance", "Science Fiction", "Non-Fiction", "Mystery", "Thriller",
+    "Biography", "History", "Science", "Children", "Poetry", "Travel", "Cooking", "Technology",
+]
+TITLE_ADJECTIVES = [
+    "Silent", "Hidden", "Lost", "Golden", "Broken", "Last", "Forgotten", "Crimson", "Endless", "Secret",
+    "Distant", "Wild", "Burning", "Frozen", "Quiet", "Ancient", "Little", "Bright", "Hollow", "Northern",
+]
+TITLE_NOUNS = [
+    "River", "Garden", "Kingdom", "Harbor", "Library", "Mountain", "Letter", "Island", "Promise", "Shadow",
+    "City", "Orchard", "Voyage", "Lantern", "Winter", "Forest", "Archive", "Bridge", "Storm", "Compass",
+]
+FIRST_NAMES = [
+    "Ayu", "Budi", "Citra", "Dewi", "Eko", "Fitri", "Gilang", "Hana", "Indra", "Joko", "Kartika", "Lestari",
+    "Maya", "Nanda", "Oki", "Putri", "Rizky", "Sari", "Taufik", "Wulan", "Yusuf", "Zahra", "Anna", "James",
+]
+LAST_NAMES = [
+    "Santoso", "Wijaya", "Pratama", "Hidayat", "Saputra", "Kurniawan", "Lestari", "Nugroho", "Setiawan",
+    "Rahman", "Siregar", "Utami", "Halim", "Tan", "Smith", "Garcia", "Chen", "Okafor", "Silva", "Novak",
+]
+SEARCH_TERMS = TITLE_ADJECTIVES + TITLE_NOUNS + LAST_NAMES
+
+
+def _chunks(total: int, size: int = CHUNK_SIZE) -> Iterator[range]:
+    for start in range(0, total, size):
+        yield range(start, min(start + size, total))
+
+
+def _person(rng: random.Random) -> str:
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def _book_rows(rng: random.Random, ids: range) -> List[dict]:
+    rows = []
+    for i in ids:
+        book_id = i + 1
+        # A few bestsellers carry many copies, most titles one or two
+        copies = rng.choice((1, 1, 1, 2, 2, 3, 5)) if rng.random() > 0.01 else rng.randint(6, 20)
+        rows.append({
+            "id": book_id,
+            "title": f"The {rng.choice(TITLE_ADJECTIVES)} {rng.choice(TITLE_NOUNS)} {book_id}",
+            "author": _person(rng),
+            "isbn": f"979{book_id:010d}",
+            "category": rng.choice(CATEGORIES),
+            "status": models.BookStatus.AVAILABLE,
+            "copies": copies,
+            "available_copies": copies,
+        })
+    return rows
+
+
+def _member_rows(rng: random.Random, ids: range, now: datetime) -> List[dict]:
+    rows = []
+    for i in ids:
+        member_id = i + 1
+        roll = rng.random()
+        status = (
+            models.MemberStatus.ACTIVE if roll < 0.9
+            else models.MemberStatus.EXPIRED if roll < 0.97
+            else models.MemberStatus.INACTIVE
+        )
+        rows.append({
+            "id": member_id,
+            "name": _person(rng),
+            "email": f"member{member_id}@example.com",
+            "phone": f"08{rng.randrange(10 ** 9, 10 ** 10)}",
+            "membership_type": rng.choices(list(models.MembershipType), weights=(70, 25, 5))[0],
+            "status": status,
+            "books_count": 0,
+            "join_date": now - timedelta(days=rng.randint(0, HISTORY_DAYS)),
+        })
+    return rows
+
+
+def _insert(engine: Engine, model, rows: List[dict]):
+    with engine.begin() as conn:
+        conn.execute(insert(model), rows)
+
+
+def _open_loan_slots(rng: random.Random, copies: List[int], count: int) -> List[int]:
+    """Book ids for `count` open loans, never more than a title's copies."""
+    slots = [book_id for book_id, n in enumerate(copies, start=1) for _ in range(n)]
+    count = min(count, len(slots))
+    return rng.sample(slots, count)
+
+
+def generate(
+    engine: Engine,
+    books: int,
+    members: int,
+    transactions: int,
+    open_loans: int = None,
+    seed: int = 42,
+    progress=None,
+) -> dict:
+    """Fill an empty, migrated database; returns the row counts written.
+
+    `transactions` counts rows: each closed loan is a BORROW plus a RETURN
+    row, each open loan a single BORROW. `open_loans` defaults to 2% of the
+    transactions, capped by the copies in the catalog.
+    """
+    from app.database import SessionLocal
+    from app.counters import reconcile
+    from app.open_loans import refresh_open_loans
+
+    with engine.connect() as conn:
+        if conn.scalar(select(func.count()).select_from(models.Book)):
+            raise ValueError("The database already has books; generate into an empty database")
+
+    rng = random.Random(seed)
+    # Dates are relative to the start of today (UTC), so open loans are
+    # overdue or due soon whenever the dataset is generated; the same seed
+    # on the same day gives the same rows
+    now = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    started = time.perf_counter()
+
+    def report(stage: str, done: int, total: int):
+        if progress:
+            progress(stage, done, total, time.perf_counter() - started)
+
+    with engine.begin() as conn:
+        if not conn.scalar(select(func.count()).select_from(models.User)):
+            conn.execute(insert(models.User), [
+                {"username": "admin", "email": "admin@perpus.com", "hashed_password": get_password_hash("admin123")},
+            ])
+
+    copies = []
+    for ids in _chunks(books):
+        rows = _book_rows(rng, ids)
+        copies.extend(row["copies"] for row in rows)
+        _insert(engine, models.Book, rows)
+        report("books", ids.stop, books)
+
+    active_members = []
+    for ids in _chunks(members):
+        rows = _member_rows(rng, ids, now)
+        active_members.extend(row["id"] for row in rows if row["status"] == models.MemberStatus.ACTIVE)
+        _insert(engine, models.Member, rows)
+        report("members", ids.stop, members)
+
+    if open_loans is None:
+        open_loans = transactions // 50
+    open_books = _open_loan_slots(rng, copies, min(open_loans, transactions))
+    closed = (transactions - len(open_books)) // 2
+
+    # Closed loans spread over the history in date order, then the open ones
+    span = timedelta(days=HISTORY_DAYS).total_seconds()
+    written = 0
+    for ids in _chunks(closed, CHUNK_SIZE // 2):
+        rows = []
+        for i in ids:
+            borrowed = now - timedelta(seconds=span * (1 - i / max(closed, 1)) + rng.random() * 3600)
+            returned = min(borrowed + timedelta(days=rng.choices((3, 10, 14, 21, 40), weights=(20, 40, 25, 10, 5))[0],
+                                                hours=rng.random() * 24), now)
+            book_id = rng.randint(1, books)
+            member_id = rng.randint(1, members)
+            rows.append({
+                "book_id": book_id, "member_id": member_id, "transaction_type": models.TransactionType.BORROW,
+                "transaction_date": borrowed, "due_date": borrowed + timedelta(days=LOAN_DAYS),
+                "return_date": returned, "created_at": borrowed,
+            })
+            rows.append({
+                "book_id": book_id, "member_id": member_id, "transaction_type": models.TransactionType.RETURN,
+                "transaction_date": returned, "due_date": None, "return_date": None, "created_at": returned,
+            })
+        _insert(engine, models.Transaction, rows)
+        written += len(rows)
+        report("transactions", written, transactions)
+
+    borrowers = active_members or list(range(1, members + 1))
+    for ids in _chunks(len(open_books)):
+        rows = []
+        for i in ids:
+            # Mostly recent, with a tail (about one in six) past the due date
+            borrowed = now - timedelta(days=min(rng.expovariate(1 / 8), 120))
+            rows.append({
+                "book_id": open_books[i], "member_id": rng.choice(borrowers),
+                "transaction_type": models.TransactionType.BORROW,
+                "transaction_date": borrowed, "due_date": borrowed + timedelta(days=LOAN_DAYS),
+                "return_date": None, "created_at": borrowed,
+            })
+        _insert(engine, models.Transaction, rows)
+        written += len(rows)
+        report("transactions", written, transactions)
+
+    # Derive shelf and member counters from the open loans in one pass each
+    open_by_book = (
+        select(models.Transaction.book_id, func.count().label("n"))
+        .where(*models.open_loan_filter()).group_by(models.Transaction.book_id).subquery()
+    )
+    open_by_member = (
+        select(models.Transaction.member_id, func.count().label("n"))
+        .where(*models.open_loan_filter()).group_by(models.Transaction.member_id).subquery()
+    )
+    with engine.begin() as conn:
+        conn.execute(
+            update(models.Book).where(models.Book.id == open_by_book.c.book_id)
+            .values(available_copies=models.Book.copies - open_by_book.c.n)
+        )
+        conn.execute(
+            update(models.Book).where(models.Book.available_copies == 0)
+            .values(status=models.BookStatus.BORROWED)
+        )
+        conn.execute(
+            update(models.Member).where(models.Member.id == open_by_member.c.member_id)
+            .values(books_count=open_by_member.c.n)
+        )
+
+    db = SessionLocal()
+    try:
+        refresh_open_loans(db)
+        reconcile(db)
+    finally:
+        db.close()
+    report("open loans", len(open_books), len(open_books))
+
+    return {"books": books, "members": members, "transactions": written, "open_loans": len(open_books)}
+
+
+def log_progress(stage: str, done: int, total: int, elapsed: float):
+    logger.info("%s: %d/%d (%.0fs)", stage, done, total, elapsed)
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--books", type=int, default=500_000)
+    parser.add_argument("--members", type=int, default=100_000)
+    parser.add_argument("--transactions", type=int, default=10_000_000)
+    parser.add_argument("--open-loans", type=int, default=None, help="Open loans (default 2%% of transactions)")
+    parser.add_argument("--seed", type=int, default=42)
+
+
+def run(args):
+    from app import schema
+    from app.database import engine
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    schema.upgrade(engine)
+    started = time.perf_counter()
+    counts = generate(engine, args.books, args.members, args.transactions, args.open_loans, args.seed,
+                      progress=log_progress)
+    print(", ".join(f"{value:,} {name.replace('_', ' ')}" for name, value in counts.items())
+          + f" in {time.perf_counter() - started:.0f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a large deterministic dataset into an empty database.")
+    add_arguments(parser)
+    run(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    main()
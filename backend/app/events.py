@@ -0,0 +1,320 @@
+import asyncio
+import itertools
+import json
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, event, func, insert, select
+from sqlalchemy.orm import Session
+from app import models
+from app.config import settings
+
+# Change events for live dashboards (streamed by app.routers.events).
+#
+# Handlers call `emit(db, ...)` while they write. Events are queued on the
+# session and only reach the bus when that session commits, so a rolled
+# back borrow never shows up on a dashboard. Each event carries `deltas`
+# keyed like the /api/stats/dashboard payload ("loans.active_borrows": 1),
+# so clients load the full stats once and then apply deltas. A "resync"
+# event means the deltas can't be trusted and the client should reload.
+#
+# The bus is pluggable through EVENT_BUS:
+#   "local"    - in-process fan-out; each worker only sees its own events
+#   "database" - events go through the `events` table in the same
+#                transaction as the change and every worker polls it, so
+#                all workers see every event
+# Other backends (e.g. Redis pub/sub) subclass `EventBus` and are added with
+# `register_backend`.
+
+logger = logging.getLogger(__name__)
+
+_PENDING = "pending_events"
+
+
+def emit(db: Session, type: str, data: Optional[dict] = None, deltas: Optional[Dict[str, int]] = None):
+    """Queue an event to be published when `db` commits."""
+    payload = dict(data or {})
+    payload["deltas"] = {key: value for key, value in (deltas or {}).items() if value}
+    payload["at"] = datetime.now(timezone.utc).isoformat()
+    db.info.setdefault(_PENDING, []).append({"type": type, "data": payload})
+
+
+@event.listens_for(Session, "before_commit")
+def _stage_pending(session):
+    pending = session.info.get(_PENDING)
+    if pending:
+        get_bus().stage(session, pending)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending(session):
+    pending = session.info.pop(_PENDING, None)
+    if pending:
+        get_bus().committed(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop(_PENDING, None)
+
+
+def resync_event(event_id: Optional[int] = None) -> dict:
+    return {"id": event_id, "type": "resync", "data": {"deltas": {}, "at": datetime.now(timezone.utc).isoformat()}}
+
+
+class Subscription:
+    """One client's queue of events, filled from any thread.
+
+    A subscription that resumes after `after` holds live events back until
+    its backlog has been replayed, then drops anything it already sent.
+    """
+
+    def __init__(self, bus: "EventBus", after: Optional[int]):
+        self.bus = bus
+        self.last_id = after
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=settings.EVENT_QUEUE_SIZE)
+        self._held = [] if after is not None else None
+
+    def deliver(self, events: List[dict]):
+        self._loop.call_soon_threadsafe(self._live, events)
+
+    def replay(self, backlog: Optional[List[dict]]):
+        """Send the backlog (None if it is unavailable), then the held events."""
+        self._loop.call_soon_threadsafe(self._finish_replay, backlog)
+
+    def _live(self, events: List[dict]):
+        if self._held is not None:
+            self._held.extend(events)
+        else:
+            self._put(events)
+
+    def _finish_replay(self, backlog: Optional[List[dict]]):
+        if backlog is None:
+            self.last_id = None
+            self._put([resync_event()])
+        else:
+            self._put(backlog)
+        held, self._held = self._held, None
+        self._put(held)
+
+    def _put(self, events: List[dict]):
+        for item in events:
+            if item["id"] is not None and self.last_id is not None and item["id"] <= self.last_id:
+                continue  # already sent (replay and live delivery overlap)
+            if self._queue.full():
+                # A slow client lost events; tell it to reload instead
+                while not self._queue.empty():
+                    self._queue.get_nowait()
+                self._queue.put_nowait(resync_event(item["id"]))
+            else:
+                self._queue.put_nowait(item)
+            if item["id"] is not None:
+                self.last_id = item["id"]
+
+    async def get(self) -> dict:
+        return await self._queue.get()
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+
+class EventBus:
+    """Base class for bus backends.
+
+    `stage` runs inside the committing transaction and `committed` after it;
+    backends hand numbered events to `_fan_out`. `_backlog` returns the
+    events after an id for reconnecting clients, or None if it can't.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = set()
+
+    def stage(self, session: Session, events: List[dict]):
+        pass
+
+    def committed(self, events: List[dict]):
+        pass
+
+    async def _backlog(self, after: int) -> Optional[List[dict]]:
+        return None
+
+    async def subscribe(self, after: Optional[int] = None) -> Subscription:
+        subscription = Subscription(self, after)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        if after is not None:
+            subscription.replay(await self._backlog(after))
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def _fan_out(self, events: List[dict]):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            subscription.deliver(events)
+
+    async def close(self):
+        pass
+
+
+class LocalEventBus(EventBus):
+    """In-process bus with a short replay buffer for reconnecting clients."""
+
+    def __init__(self, history: int = 1000):
+        super().__init__()
+        self._ids = itertools.count(1)
+        self._latest = 0
+        self._history = deque(maxlen=history)
+
+    def committed(self, events: List[dict]):
+        with self._lock:
+            numbered = [{"id": next(self._ids), **item} for item in events]
+            self._latest = numbered[-1]["id"]
+            self._history.extend(numbered)
+        self._fan_out(numbered)
+
+    async def _backlog(self, after: int) -> Optional[List[dict]]:
+        with self._lock:
+            history = list(self._history)
+            latest = self._latest
+        oldest = history[0]["id"] if history else latest + 1
+        if after > latest or after < oldest - 1:
+            # Fell out of the buffer, or the id came from another process
+            return None
+        return [item for item in history if item["id"] > after]
+
+
+class DatabaseEventBus(EventBus):
+    """Bus shared by all workers through the `events` table.
+
+    Events are inserted in the transaction that made the change. A poller
+    per process reads new rows every EVENT_BUS_POLL_SECONDS once anyone has
+    subscribed, and deletes rows older than EVENT_RETENTION_SECONDS.
+
+    Ids are taken at insert but rows appear at commit, so on PostgreSQL a
+    higher id can be read before a lower one. The poller delivers in id
+    order and waits at a missing id for EVENT_BUS_GAP_SECONDS before it
+    gives up on it (its transaction failed, or it is still running).
+    """
+
+    def __init__(self, session_factory=None):
+        super().__init__()
+        if session_factory is None:
+            from app.database import SessionLocal
+            session_factory = SessionLocal
+        self.session_factory = session_factory
+        self._poller = None
+        self._position = 0  # last id handed to subscribers
+
+    def stage(self, session: Session, events: List[dict]):
+        session.execute(insert(models.Event), [
+            {"type": item["type"], "payload": json.dumps(item["data"])} for item in events
+        ])
+
+    def _latest_id(self) -> int:
+        db = self.session_factory()
+        try:
+            return db.scalar(select(func.max(models.Event.id))) or 0
+        finally:
+            db.close()
+
+    def _read(self, after: int, limit: int, until: Optional[int] = None) -> List[dict]:
+        db = self.session_factory()
+        try:
+            query = select(models.Event.id, models.Event.type, models.Event.payload).where(models.Event.id > after)
+            if until is not None:
+                query = query.where(models.Event.id <= until)
+            rows = db.execute(query.order_by(models.Event.id).limit(limit)).all()
+            return [{"id": id, "type": type, "data": json.loads(payload)} for id, type, payload in rows]
+        finally:
+            db.close()
+
+    def _prune(self):
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.EVENT_RETENTION_SECONDS)
+        db = self.session_factory()
+        try:
+            db.execute(delete(models.Event).where(models.Event.created_at < cutoff))
+            db.commit()
+        finally:
+            db.close()
+
+    def _in_order(self, events: List[dict], gap_since: Optional[float]):
+        """The events that follow `_position` without a gap, and when the
+        poller started waiting at the current gap (None if there is none)."""
+        ready, position = [], self._position
+        for item in events:
+            if item["id"] != position + 1:
+                gap_since = gap_since or time.monotonic()
+                if time.monotonic() - gap_since < settings.EVENT_BUS_GAP_SECONDS:
+                    break
+                logger.warning("event ids %d-%d not committed in time, skipped", position + 1, item["id"] - 1)
+            gap_since = None
+            ready.append(item)
+            position = item["id"]
+        return ready, gap_since
+
+    async def _poll(self):
+        last_prune = time.monotonic()
+        gap_since = None
+        while True:
+            try:
+                events = await run_in_threadpool(self._read, self._position, 500)
+                ready, gap_since = self._in_order(events, gap_since)
+                if ready:
+                    self._position = ready[-1]["id"]
+                    self._fan_out(ready)
+                if time.monotonic() - last_prune > 60:
+                    last_prune = time.monotonic()
+                    await run_in_threadpool(self._prune)
+            except Exception:
+                logger.exception("event poll failed")
+            await asyncio.sleep(settings.EVENT_BUS_POLL_SECONDS)
+
+    async def _backlog(self, after: int) -> Optional[List[dict]]:
+        limit = settings.EVENT_QUEUE_SIZE
+        # Only what the poller has delivered; later events come live, in order
+        backlog = await run_in_threadpool(self._read, after, limit, self._position)
+        if len(backlog) >= limit or (backlog and backlog[0]["id"] > after + 1):
+            return None  # too far behind, or pruned
+        if not backlog and after > await run_in_threadpool(self._latest_id):
+            return None
+        return backlog
+
+    async def subscribe(self, after: Optional[int] = None) -> Subscription:
+        if self._poller is None or self._poller.done():
+            # Start from the current end before anyone can miss an event
+            self._position = await run_in_threadpool(self._latest_id)
+            self._poller = asyncio.create_task(self._poll())
+        return await super().subscribe(after)
+
+    async def close(self):
+        if self._poller is not None:
+            self._poller.cancel()
+            self._poller = None
+
+
+_BACKENDS = {"local": LocalEventBus, "database": DatabaseEventBus}
+_bus: Optional[EventBus] = None
+
+
+def register_backend(name: str, factory):
+    """Make `factory()` available as EVENT_BUS=<name>."""
+    _BACKENDS[name] = factory
+
+
+def get_bus() -> EventBus:
+    global _bus
+    if _bus is None:
+        if settings.EVENT_BUS not in _BACKENDS:
+            raise ValueError(f"Unknown EVENT_BUS {settings.EVENT_BUS!r}, expected one of {sorted(_BACKENDS)}")
+        _bus = _BACKENDS[settings.EVENT_BUS]()
+    return _bus
@@ -0,0 +1,92 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterable, Optional
+from fastapi import Request, Response
+from sqlalchemy.orm import Session
+from app import models
+
+# HTTP validators (ETag / Last-Modified) for cacheable reads.
+#
+# ETags are derived from the `table_versions` counters, which database
+# triggers bump on every write, so they are consistent across worker
+# processes and write paths. Handlers compare them with If-None-Match /
+# If-Modified-Since before querying or serializing anything and answer 304
+# when the client's copy is current. Responses carry `Cache-Control:
+# private, no-cache`: clients may keep them but must revalidate each time.
+
+CACHE_CONTROL = "private, no-cache"
+
+
+class Validators:
+    def __init__(self, etag: str, last_modified: Optional[datetime] = None):
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def headers(self) -> dict:
+        headers = {"ETag": self.etag, "Cache-Control": CACHE_CONTROL}
+        if self.last_modified is not None:
+            headers["Last-Modified"] = http_date(self.last_modified)
+        return headers
+
+
+def http_date(value: datetime) -> str:
+    # SQLite hands back naive datetimes; they are stored in UTC
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def table_validators(db: Session, tables: Iterable[str], extra: Iterable = (), last_modified: bool = True) -> Validators:
+    """Validators for a response built from `tables`.
+
+    `extra` distinguishes responses over the same tables (e.g. the book id);
+    pass `last_modified=False` when the body also depends on the clock.
+    Read this before the data, so a concurrent write can only make the ETag
+    older than the body, never newer.
+    """
+    rows = db.query(models.TableVersion.name, models.TableVersion.version, models.TableVersion.updated_at).filter(
+        models.TableVersion.name.in_(list(tables))
+    ).all()
+    key = ";".join(sorted(f"{name}:{version}" for name, version, _ in rows) + [str(part) for part in extra])
+    etag = f'W/"{hashlib.sha1(key.encode()).hexdigest()[:20]}"'
+    changed = [updated_at for _, _, updated_at in rows if updated_at is not None]
+    return Validators(etag, max(changed) if changed and last_modified else None)
+
+
+def _opaque(tag: str) -> str:
+    # If-None-Match uses the weak comparison: W/"x" matches "x"
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def is_fresh(request: Request, validators: Validators) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match takes precedence over If-Modified-Since
+        tags = [_opaque(tag) for tag in if_none_match.split(",")]
+        return "*" in tags or _opaque(validators.etag) in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and validators.last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        modified = validators.last_modified
+        if modified.tzinfo is None:
+            modified = modified.replace(tzinfo=timezone.utc)
+        return modified.replace(microsecond=0) <= since
+    return False
+
+
+def check(request: Request, response: Response, validators: Validators) -> Optional[Response]:
+    """Return a 304 response if the client's copy is current.
+
+    Otherwise set the validators on `response` and return None, and the
+    handler builds the body as usual.
+    """
+    if is_fresh(request, validators):
+        return Response(status_code=304, headers=validators.headers())
+    response.headers.update(validators.headers())
+    return None
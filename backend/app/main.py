@@ -1,13 +1,24 @@
+import asyncio
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import engine, Base
-from app.routers import auth, books, members, transactions
+from app.database import engine, SessionLocal
+from app.routers import auth, books, members, transactions, stats, exports, events
 from app.config import settings
+from app.schema import check_schema
+from app.open_loans import run_refresher
+from app.counters import run_reconciler
+from app.events import get_bus
+from app.metrics import MetricsMiddleware, registry
+from app.passwords import hash_pool
+from app.revocation import run_sync as run_revocation_sync
+from app.replicas import ReadYourWritesMiddleware
+from app.responses import DefaultJSONResponse, StreamingAwareGZipMiddleware
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Tables are created by `perpus migrate`; refuse to start on an old schema
+check_schema(engine)
 
-app = FastAPI(title="Perpus Library Management API")
+app = FastAPI(title="Perpus Library Management API", default_response_class=DefaultJSONResponse)
 
 # Configure CORS
 app.add_middleware(
@@ -16,13 +27,95 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let the client read validators for conditional requests, and the
+    # primary-read deadline it echoes back after a write
+    expose_headers=["ETag", "Last-Modified", "X-Read-Primary-Until"],
 )
 
+# Pin callers to the primary after their writes, when reads go to replicas
+if settings.DATABASE_REPLICA_URLS:
+    app.add_middleware(ReadYourWritesMiddleware)
+
+# Compress large list payloads for clients that accept gzip (not the event stream)
+if settings.GZIP_ENABLED:
+    app.add_middleware(
+        StreamingAwareGZipMiddleware,
+        exclude_paths=["/api/events"],
+        minimum_size=settings.GZIP_MINIMUM_SIZE,
+        compresslevel=settings.GZIP_COMPRESS_LEVEL,
+    )
+
+# Outermost, so timings include compression
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, server_timing=settings.SERVER_TIMING_ENABLED)
+
 # Include routers
-app.include_router(auth.router, prefix="/api/auth", tags=["authentication"])
-app.include_router(books.router, prefix="/api/books", tags=["books"])
-app.include_router(members.router, prefix="/api/members", tags=["members"])
-app.include_router(transactions.router, prefix="/api/transactions", tags=["transactions"])
+if settings.DB_ASYNC:
+    from app.routers.aio import AUTH_OVERRIDES, make_async_router
+
+    auth_router = make_async_router(auth.router, overrides=AUTH_OVERRIDES)
+    books_router = make_async_router(books.router)
+    members_router = make_async_router(members.router)
+    transactions_router = make_async_router(transactions.router)
+    stats_router = make_async_router(stats.router)
+else:
+    auth_router = auth.router
+    books_router = books.router
+    members_router = members.router
+    transactions_router = transactions.router
+    stats_router = stats.router
+
+app.include_router(auth_router, prefix="/api/auth", tags=["authentication"])
+app.include_router(books_router, prefix="/api/books", tags=["books"])
+app.include_router(members_router, prefix="/api/members", tags=["members"])
+app.include_router(transactions_router, prefix="/api/transactions", tags=["transactions"])
+app.include_router(stats_router, prefix="/api/stats", tags=["stats"])
+# Exports stream from their own session and stay sync in both modes
+app.include_router(exports.router, prefix="/api/exports", tags=["exports"])
+# The event stream is async already and holds no session while open
+app.include_router(events.router, prefix="/api/events", tags=["events"])
+
+@app.on_event("startup")
+async def start_open_loans_refresher():
+    if settings.OPEN_LOANS_REFRESH_SECONDS > 0:
+        app.state.open_loans_refresher = asyncio.create_task(run_refresher(SessionLocal))
+
+@app.on_event("shutdown")
+async def stop_open_loans_refresher():
+    task = getattr(app.state, "open_loans_refresher", None)
+    if task:
+        task.cancel()
+
+@app.on_event("startup")
+async def start_counter_reconciler():
+    if settings.COUNTERS_RECONCILE_SECONDS > 0:
+        app.state.counter_reconciler = asyncio.create_task(run_reconciler(SessionLocal))
+
+@app.on_event("shutdown")
+async def stop_counter_reconciler():
+    task = getattr(app.state, "counter_reconciler", None)
+    if task:
+        task.cancel()
+
+@app.on_event("startup")
+async def start_revocation_sync():
+    # Revocations written by any worker, applied to this one's in-memory list
+    if settings.TOKEN_REVOCATION_STORE == "database":
+        app.state.revocation_sync = asyncio.create_task(run_revocation_sync(engine))
+
+@app.on_event("shutdown")
+async def stop_revocation_sync():
+    task = getattr(app.state, "revocation_sync", None)
+    if task:
+        task.cancel()
+
+@app.on_event("shutdown")
+async def close_event_bus():
+    await get_bus().close()
+
+@app.on_event("shutdown")
+async def stop_password_hash_pool():
+    hash_pool.shutdown()
 
 @app.get("/")
 async def root():
@@ -30,4 +123,10 @@ async def root():
 
 @app.get("/api/health")
 async def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+if settings.METRICS_ENABLED:
+    @app.get("/api/metrics", include_in_schema=False)
+    async def metrics():
+        # Prometheus scrape target; per process, unauthenticated like /api/health
+        return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
\ No newline at end of file
@@ -0,0 +1,210 @@
+import logging
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.config import settings
+
+# Request timing and SQL query instrumentation.
+#
+# `MetricsMiddleware` times every request and opens a `RequestStats` for it
+# in a context variable; engine-wide cursor hooks add each statement and its
+# duration to the current request's stats. Totals are kept per route
+# template (e.g. /api/books/{book_id}) and rendered in the Prometheus text
+# format by /api/metrics. Counters are per process: with several workers,
+# each scrape sees the worker that answered it.
+#
+# A request running more than QUERY_BUDGET statements logs a warning with
+# its most repeated statement, which is usually a lazy load in a loop (N+1).
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+# Long-lived streams would skew the latency histograms
+UNTIMED_PATHS = ("/api/events",)
+
+
+class RequestStats:
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements = Counter()
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_stats() -> Optional[RequestStats]:
+    return _current.get()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None:
+        return
+    started = conn.info.get("query_start")
+    if started:
+        stats.db_seconds += time.perf_counter() - started.pop()
+    stats.queries += 1
+    stats.statements[statement] += 1
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += 1
+        self.sum += value
+
+
+class Registry:
+    """Per-route request and query totals, safe to update from any thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests: Dict[Tuple[str, str, int], int] = {}
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.queries: Dict[Tuple[str, str], Histogram] = {}
+        self.db_seconds: Dict[Tuple[str, str], float] = {}
+        self.budget_exceeded: Dict[Tuple[str, str], int] = {}
+
+    def record(self, method: str, route: str, status: int, seconds: Optional[float], stats: RequestStats):
+        key = (method, route)
+        with self._lock:
+            self.requests[(method, route, status)] = self.requests.get((method, route, status), 0) + 1
+            if seconds is not None:
+                self.latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(seconds)
+            self.queries.setdefault(key, Histogram(QUERY_BUCKETS)).observe(stats.queries)
+            self.db_seconds[key] = self.db_seconds.get(key, 0.0) + stats.db_seconds
+            if stats.queries > settings.QUERY_BUDGET > 0:
+                self.budget_exceeded[key] = self.budget_exceeded.get(key, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self.__init__()
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            lines = [
+                "# HELP perpus_http_requests_total Requests handled, by route and status.",
+                "# TYPE perpus_http_requests_total counter",
+            ]
+            for (method, route, status), count in sorted(self.requests.items()):
+                lines.append(f'perpus_http_requests_total{{method="{method}",route="{route}",status="{status}"}} {count}')
+            lines += _histogram_lines(
+                "perpus_http_request_duration_seconds", "Request latency in seconds.", self.latency
+            )
+            lines += _histogram_lines(
+                "perpus_db_queries_per_request", "SQL statements executed per request.", self.queries
+            )
+            lines += [
+                "# HELP perpus_db_query_seconds_total Time spent in SQL statements, by route.",
+                "# TYPE perpus_db_query_seconds_total counter",
+            ]
+            for (method, route), seconds in sorted(self.db_seconds.items()):
+                lines.append(f'perpus_db_query_seconds_total{{method="{method}",route="{route}"}} {seconds:.6f}')
+            lines += [
+                "# HELP perpus_db_query_budget_exceeded_total Requests that ran more than QUERY_BUDGET statements.",
+                "# TYPE perpus_db_query_budget_exceeded_total counter",
+            ]
+            for (method, route), count in sorted(self.budget_exceeded.items()):
+                lines.append(f'perpus_db_query_budget_exceeded_total{{method="{method}",route="{route}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+def _histogram_lines(name: str, help: str, histograms: Dict[Tuple[str, str], Histogram]):
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} histogram"]
+    for (method, route), histogram in sorted(histograms.items()):
+        labels = f'method="{method}",route="{route}"'
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.total}')
+        lines.append(f"{name}_sum{{{labels}}} {histogram.sum:.6f}")
+        lines.append(f"{name}_count{{{labels}}} {histogram.total}")
+    return lines
+
+
+registry = Registry()
+
+
+def _route_template(scope) -> str:
+    route = scope.get("route")
+    # Unmatched paths are grouped so stray URLs can't grow the label set
+    return getattr(route, "path", None) or "<unmatched>"
+
+
+def _warn_over_budget(method: str, route: str, stats: RequestStats):
+    statement, repeats = stats.statements.most_common(1)[0]
+    logger.warning(
+        "%s %s ran %d SQL statements (budget %d); most repeated (%dx), possible N+1: %s",
+        method, route, stats.queries, settings.QUERY_BUDGET, repeats, " ".join(statement.split())[:300],
+    )
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and query counts per route.
+
+    With `server_timing`, responses carry a Server-Timing header with the
+    database time and statement count so far and the total time to the
+    start of the response.
+    """
+
+    def __init__(self, app, server_timing: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    total_ms = (time.perf_counter() - started) * 1000
+                    timing = (
+                        f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries", '
+                        f"total;dur={total_ms:.1f}"
+                    )
+                    message["headers"] = list(message.get("headers", [])) + [(b"server-timing", timing.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            method = scope["method"]
+            route = _route_template(scope)
+            timed = not scope["path"].startswith(UNTIMED_PATHS)
+            registry.record(method, route, status, time.perf_counter() - started if timed else None, stats)
+            if stats.queries > settings.QUERY_BUDGET > 0:
+                _warn_over_budget(method, route, stats)
@@ -1,7 +1,7 @@
-from sqlalchemy import Boolean, Column, Integer, String, DateTime, Enum, ForeignKey
+from sqlalchemy import Boolean, Column, Integer, String, Text, DateTime, Enum, ForeignKey, Index, case, literal_column, select, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
-from datetime import datetime
+from datetime import datetime, timezone
 import enum
 from app.database import Base
 
@@ -20,6 +20,14 @@ class MemberStatus(str, enum.Enum):
     INACTIVE = "inactive"
     EXPIRED = "expired"
 
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+def _default_available_copies(context):
+    # New titles start with every copy on the shelf
+    copies = context.get_current_parameters().get("copies")
+    return 1 if copies is None else copies
+
 class Book(Base):
     __tablename__ = "books"
 
@@ -30,9 +38,33 @@ class Book(Base):
     category = Column(String, nullable=False)
     status = Column(Enum(BookStatus), default=BookStatus.AVAILABLE)
     copies = Column(Integer, default=1)
+    # Copies on the shelf, kept in sync by borrow/return with atomic UPDATEs
+    available_copies = Column(Integer, nullable=False, default=_default_available_copies)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
+def available_copies_after_resize(new_copies):
+    """SQL expression for `available_copies` when a title's `copies` changes:
+    the new copies minus those still on loan, counted in the same UPDATE
+    (the subquery doesn't correlate inside INSERT ... ON CONFLICT)."""
+    on_loan = (
+        select(func.count()).select_from(Transaction)
+        .where(Transaction.book_id == Book.id, *open_loan_filter())
+        .scalar_subquery()
+    )
+    shelf = new_copies - on_loan
+    return case((shelf < 0, 0), else_=shelf)
+
+def status_for_shelf(available_copies, status=None):
+    """SQL expression for `status` matching a shelf count: borrowed when no
+    copy is left, available otherwise. Reserved titles stay reserved."""
+    status = Book.status if status is None else status
+    return case(
+        (status == BookStatus.RESERVED, BookStatus.RESERVED.name),
+        (available_copies <= 0, BookStatus.BORROWED.name),
+        else_=BookStatus.AVAILABLE.name,
+    )
+
 class Member(Base):
     __tablename__ = "members"
 
@@ -61,6 +93,10 @@ class TransactionType(str, enum.Enum):
     BORROW = "borrow"
     RETURN = "return"
 
+# Predicate of the open-loan partial indexes. Queries must repeat it with
+# literal values (see `open_loan_filter`) for the planner to match the index.
+OPEN_LOAN_CLAUSE = text("transaction_type = 'BORROW' AND return_date IS NULL")
+
 class Transaction(Base):
     __tablename__ = "transactions"
 
@@ -68,11 +104,111 @@ class Transaction(Base):
     book_id = Column(Integer, ForeignKey('books.id'), nullable=False, index=True)
     member_id = Column(Integer, ForeignKey('members.id'), nullable=False, index=True)
     transaction_type = Column(Enum(TransactionType), nullable=False)
-    transaction_date = Column(DateTime(timezone=True), server_default=func.now())
+    # Set in Python: SQLite's CURRENT_TIMESTAMP has no fractional seconds, so
+    # it wouldn't compare equal to the same instant bound as a keyset cursor
+    transaction_date = Column(DateTime(timezone=True), default=_utcnow, server_default=func.now())
     due_date = Column(DateTime(timezone=True), nullable=True)
     return_date = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
     book = relationship("Book")
-    member = relationship("Member")
\ No newline at end of file
+    member = relationship("Member")
+
+    __table_args__ = (
+        # Sort key for keyset pagination of the transaction history
+        Index("ix_transactions_date_id", "transaction_date", "id"),
+        # Loan lookups by book and member, including the return_date IS NULL test
+        Index("ix_transactions_book_member_return", "book_id", "member_id", "return_date"),
+        # Partial indexes covering only open loans, which stay small as history grows
+        Index(
+            "ix_transactions_open_member_book", "member_id", "book_id",
+            sqlite_where=OPEN_LOAN_CLAUSE, postgresql_where=OPEN_LOAN_CLAUSE,
+        ),
+        Index(
+            "ix_transactions_open_due", "due_date", "id",
+            sqlite_where=OPEN_LOAN_CLAUSE, postgresql_where=OPEN_LOAN_CLAUSE,
+        ),
+    )
+
+def open_loan_filter():
+    """Filter terms for open loans that match the partial index predicate."""
+    return (
+        Transaction.transaction_type == literal_column(f"'{TransactionType.BORROW.name}'"),
+        Transaction.return_date == None,
+    )
+
+class OpenLoan(Base):
+    """Denormalized copy of the open loans, maintained by `app.open_loans`.
+
+    Serves the active-borrows and overdue listings from one narrow table
+    instead of joining transactions, books and members on every request.
+    """
+    __tablename__ = "open_loans"
+
+    transaction_id = Column(Integer, ForeignKey('transactions.id'), primary_key=True)
+    book_id = Column(Integer, nullable=False, index=True)
+    member_id = Column(Integer, nullable=False, index=True)
+    book_title = Column(String, nullable=False)
+    member_name = Column(String, nullable=False)
+    borrow_date = Column(DateTime(timezone=True), nullable=True)
+    due_date = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Overdue and due-soon listings are range scans on this index
+        Index("ix_open_loans_due_transaction", "due_date", "transaction_id"),
+    )
+
+class TableVersion(Base):
+    """Change counter per table, bumped by database triggers (migrations 0005, 0010).
+
+    Used to build ETags for cached reads; see `app.http_cache`.
+    """
+    __tablename__ = "table_versions"
+
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, server_default="1")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class Event(Base):
+    """Change event for live dashboards, written by the database event bus.
+
+    Rows are pruned after EVENT_RETENTION_SECONDS; see `app.events`.
+    """
+    __tablename__ = "events"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    type = Column(String, nullable=False)
+    payload = Column(Text, nullable=False)  # JSON
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+    # Never reuse the ids of pruned rows; clients resume from the last id they saw
+    __table_args__ = {"sqlite_autoincrement": True}
+
+class RevokedToken(Base):
+    """A revoked login session or user, written when TOKEN_REVOCATION_STORE=database.
+
+    Every worker loads new rows into its in-memory revocation list; rows are
+    deleted once `expires_at` passes. See `app.revocation`.
+    """
+    __tablename__ = "revoked_tokens"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    kind = Column(String, nullable=False)  # "session" or "user"
+    key = Column(String, nullable=False)  # session id or user id
+    revoked_at = Column(DateTime(timezone=True), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    # Ids only grow, so workers can resume from the last one they applied
+    __table_args__ = {"sqlite_autoincrement": True}
+
+class Counter(Base):
+    """Denormalized count, e.g. "books.available" or "categories.Fiction".
+
+    Write handlers update it in the same transaction as the change, and a
+    background job repairs drift; see `app.counters`.
+    """
+    __tablename__ = "counters"
+
+    name = Column(String, primary_key=True)
+    value = Column(Integer, nullable=False, server_default="0")
\ No newline at end of file
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+from typing import Iterable
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, exists, func, insert, select, update
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from app import models
+from app.config import settings
+
+# Maintenance of the `open_loans` table (see `models.OpenLoan`).
+#
+# Borrow and return write their rows in the same transaction as the loan, so
+# listings reflect a desk's own changes immediately. A background task runs
+# `refresh_open_loans` every OPEN_LOANS_REFRESH_SECONDS to reconcile the
+# table with `transactions` (rows written outside the API, renamed titles or
+# members). Whether a loan is overdue is decided from `due_date` at query
+# time, so it never lags behind the refresher.
+
+logger = logging.getLogger(__name__)
+
+_loans = models.Transaction.__table__
+_books = models.Book.__table__
+_members = models.Member.__table__
+_open = models.OpenLoan.__table__
+
+_COLUMNS = ["transaction_id", "book_id", "member_id", "book_title", "member_name", "borrow_date", "due_date"]
+
+
+def _open_loan_rows():
+    return select(
+        _loans.c.id.label("transaction_id"),
+        _loans.c.book_id,
+        _loans.c.member_id,
+        func.coalesce(_books.c.title, "Unknown").label("book_title"),
+        func.coalesce(_members.c.name, "Unknown").label("member_name"),
+        _loans.c.transaction_date.label("borrow_date"),
+        _loans.c.due_date,
+    ).select_from(
+        _loans.outerjoin(_books, _books.c.id == _loans.c.book_id)
+        .outerjoin(_members, _members.c.id == _loans.c.member_id)
+    ).where(*models.open_loan_filter())
+
+
+def record_loans(db: Session, transaction_ids: Iterable[int]):
+    """Add freshly created borrow transactions to the table."""
+    ids = list(transaction_ids)
+    if ids:
+        db.execute(insert(_open).from_select(_COLUMNS, _open_loan_rows().where(_loans.c.id.in_(ids))))
+
+
+def drop_loans(db: Session, transaction_ids: Iterable[int]):
+    ids = list(transaction_ids)
+    if ids:
+        db.execute(delete(_open).where(_open.c.transaction_id.in_(ids)))
+
+
+def rename_book(db: Session, book_id: int, title: str):
+    db.execute(update(_open).where(_open.c.book_id == book_id).values(book_title=title))
+
+
+def rename_member(db: Session, member_id: int, name: str):
+    db.execute(update(_open).where(_open.c.member_id == member_id).values(member_name=name))
+
+
+def refresh_open_loans(db: Session) -> dict:
+    """Reconcile `open_loans` with the transactions table in one transaction."""
+    current = _open_loan_rows().subquery()
+
+    # Loans that were closed (or deleted) since they were recorded
+    removed = db.execute(delete(_open).where(~exists().where(
+        _loans.c.id == _open.c.transaction_id, *models.open_loan_filter()
+    ))).rowcount
+
+    # Titles, names or due dates that changed behind our back
+    changed = db.execute(update(_open).where(
+        _open.c.transaction_id == current.c.transaction_id,
+        (_open.c.book_title != current.c.book_title)
+        | (_open.c.member_name != current.c.member_name)
+        | _open.c.due_date.is_distinct_from(current.c.due_date)
+    ).values(
+        book_title=current.c.book_title,
+        member_name=current.c.member_name,
+        due_date=current.c.due_date,
+    )).rowcount
+
+    # Open loans the table doesn't know about yet
+    added = db.execute(insert(_open).from_select(
+        _COLUMNS,
+        _open_loan_rows().where(~exists().where(_open.c.transaction_id == _loans.c.id)),
+    )).rowcount
+
+    db.commit()
+    return {"added": added, "removed": removed, "updated": changed}
+
+
+async def run_refresher(session_factory, interval: float = None):
+    """Refresh forever, starting immediately. Cancel the task to stop it."""
+    interval = settings.OPEN_LOANS_REFRESH_SECONDS if interval is None else interval
+
+    def refresh_once():
+        db = session_factory()
+        try:
+            return refresh_open_loans(db)
+        finally:
+            db.close()
+
+    while True:
+        try:
+            counts = await run_in_threadpool(refresh_once)
+            if any(counts.values()):
+                logger.info("open_loans refreshed: %(added)d added, %(removed)d removed, %(updated)d updated", counts)
+        except DBAPIError:
+            # Usually a race with a concurrent borrow/return; the next run catches up
+            logger.exception("open_loans refresh failed")
+        await asyncio.sleep(interval)
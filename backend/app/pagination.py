@@ -0,0 +1,65 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+
+# Keyset (cursor) pagination.
+#
+# A cursor is the sort key of the last row of the previous page, encoded as
+# url-safe base64 JSON so clients treat it as opaque. Each page is a range
+# scan on an index starting right after that key, so deep pages cost the
+# same as the first one (unlike OFFSET, which reads and discards rows).
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: Sequence[Any]) -> List[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError("cursor shape mismatch")
+        # Restore datetimes for DateTime sort keys
+        return [
+            datetime.fromisoformat(v) if column.type.python_type is datetime else v
+            for v, column in zip(values, columns)
+        ]
+    except (ValueError, TypeError, NotImplementedError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate(
+    query: Query,
+    columns: Sequence[Any],
+    cursor: str,
+    limit: int,
+    descending: bool = False,
+):
+    """Return one keyset page of `query` ordered by `columns`.
+
+    `columns` must be a unique, indexed sort key (e.g. `(transaction_date, id)`).
+    An empty `cursor` starts at the first page. Returns `(rows, next_cursor)`,
+    where `next_cursor` is None on the last page.
+    """
+    if cursor:
+        after = decode_cursor(cursor, columns)
+        key = tuple_(*columns)
+        query = query.filter(key < tuple_(*after) if descending else key > tuple_(*after))
+
+    order = [c.desc() for c in columns] if descending else list(columns)
+    # Fetch one extra row to know whether another page exists
+    rows = query.order_by(*order).limit(limit + 1).all()
+
+    next_cursor: Optional[str] = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, c.key) for c in columns])
+    return rows, next_cursor
@@ -0,0 +1,164 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional, Tuple
+from passlib.context import CryptContext
+from app.config import settings
+
+# Password hashing, kept off the request threads.
+#
+# pbkdf2 is deliberately slow, so a burst of logins at shift change would
+# otherwise occupy the threadpool that serves every sync route. Hashes are
+# computed in a small dedicated pool (PASSWORD_HASH_WORKERS); when more than
+# PASSWORD_HASH_QUEUE_SIZE are waiting, new logins are refused with a 503
+# instead of queueing without bound. Each username may attempt
+# LOGIN_ATTEMPTS_PER_WINDOW logins per LOGIN_THROTTLE_WINDOW_SECONDS, so a
+# script retrying one account can't fill the pool either.
+#
+# Hashes are stored with PASSWORD_HASH_ROUNDS. Hashes made with other rounds
+# still verify, and are replaced by a hash with the configured rounds at the
+# user's next successful login.
+
+pwd_context = CryptContext(
+    schemes=["pbkdf2_sha256"],
+    deprecated="auto",
+    pbkdf2_sha256__default_rounds=settings.PASSWORD_HASH_ROUNDS,
+    # Any other round count makes a hash "need update"
+    pbkdf2_sha256__min_rounds=settings.PASSWORD_HASH_ROUNDS,
+    pbkdf2_sha256__max_rounds=settings.PASSWORD_HASH_ROUNDS,
+)
+
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def verify_and_update(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """(matches, replacement hash when the stored one uses other rounds)."""
+    return pwd_context.verify_and_update(password, hashed_password)
+
+
+class HashPoolBusy(Exception):
+    pass
+
+
+class LoginThrottled(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__(f"Too many login attempts, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class HashPool:
+    """A bounded executor for hashing, refusing work past `max_pending`.
+
+    Threads suit pbkdf2, since hashlib releases the GIL while it runs;
+    `kind="process"` uses worker processes instead.
+    """
+
+    def __init__(self, workers: int, max_pending: int, kind: str = "thread"):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.kind = kind
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Executor:
+        # Created on first use, so importing the app never starts workers
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    def _done(self, future: Future):
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+
+    def submit(self, fn, *args) -> Future:
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HashPoolBusy()
+            self.pending += 1
+            executor = self._get_executor()
+        try:
+            future = executor.submit(fn, *args)
+        except BaseException:
+            with self._lock:
+                self.pending -= 1
+            raise
+        future.add_done_callback(self._done)
+        return future
+
+    async def run(self, fn, *args):
+        """Await `fn(*args)` in the pool without blocking a request thread."""
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def call(self, fn, *args):
+        return self.submit(fn, *args).result()
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "kind": self.kind,
+                "pending": self.pending,
+                "max_pending": self.max_pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+
+class LoginThrottle:
+    """Sliding-window limit on login attempts per username.
+
+    Only the `maxsize` most recently seen usernames are tracked, so random
+    usernames can't grow it without bound.
+    """
+
+    def __init__(self, attempts: int, window: float, maxsize: int = 10000):
+        self.attempts = attempts
+        self.window = window
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._attempts = OrderedDict()
+
+    def hit(self, username: str):
+        """Record an attempt, raising LoginThrottled if over the limit."""
+        if self.attempts <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            recent = self._attempts.get(username)
+            if recent is None:
+                recent = self._attempts[username] = deque()
+                while len(self._attempts) > self.maxsize:
+                    self._attempts.popitem(last=False)
+            self._attempts.move_to_end(username)
+            while recent and recent[0] <= now - self.window:
+                recent.popleft()
+            if len(recent) >= self.attempts:
+                raise LoginThrottled(recent[0] + self.window - now)
+            recent.append(now)
+
+    def reset(self, username: str):
+        with self._lock:
+            self._attempts.pop(username, None)
+
+
+hash_pool = HashPool(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_QUEUE_SIZE,
+                     settings.PASSWORD_HASH_EXECUTOR)
+login_throttle = LoginThrottle(settings.LOGIN_ATTEMPTS_PER_WINDOW, settings.LOGIN_THROTTLE_WINDOW_SECONDS)
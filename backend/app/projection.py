@@ -0,0 +1,37 @@
+from typing import List, Optional, Sequence, Type
+from fastapi import HTTPException
+from fastapi.responses import Response
+from pydantic import BaseModel
+from app.responses import dumps
+
+# Column projection for the list endpoints (`?fields=id,title,author`).
+#
+# The query selects only the requested columns, so rows come back as plain
+# tuples without ORM entities or identity-map bookkeeping, and they are
+# written straight to JSON without building a Pydantic model per row. The
+# primary key is always included so rows can be told apart, and so is any
+# keyset sort key.
+
+
+def parse_fields(fields: Optional[str], model, schema: Type[BaseModel], always: Sequence[str] = ("id",)) -> Optional[List]:
+    """Columns of `model` named in `fields`, or None to return full objects.
+
+    Only fields that the full `schema` exposes can be requested. `always`
+    names columns added when missing (the primary key and any sort key).
+    """
+    if not fields:
+        return None
+    names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in schema.model_fields or name not in model.__table__.c]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    names = [name for name in always if name not in names] + names
+    return [getattr(model, name) for name in names]
+
+
+def rows_response(rows: Sequence, columns: Sequence, paged: bool = False, next_cursor: Optional[str] = None) -> Response:
+    """Serialize projected rows as a list, or as a page when `paged`."""
+    names = [column.key for column in columns]
+    items = [dict(zip(names, row)) for row in rows]
+    body = {"items": items, "next_cursor": next_cursor} if paged else items
+    return Response(dumps(body), media_type="application/json")
@@ -0,0 +1,76 @@
+import threading
+import time
+from typing import Dict, Optional
+from app.config import settings
+
+# Read-your-writes for replica routing (see `database.get_read_db`).
+#
+# Replicas lag the primary, so a client that has just written should read
+# from the primary until the write has surely replicated. After a successful
+# write request, `ReadYourWritesMiddleware` answers with an
+# X-Read-Primary-Until header (epoch seconds, REPLICA_STICKY_SECONDS ahead)
+# and remembers the caller's Authorization header until then. A read goes to
+# the primary while either the caller sends a still-valid
+# X-Read-Primary-Until back (works across workers; the frontend does this)
+# or this process saw the caller write recently.
+
+HEADER = "x-read-primary-until"
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+class StickyClients:
+    """Callers (by Authorization header) pinned to the primary, with expiry."""
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._until: Dict[str, float] = {}
+
+    def pin(self, key: str, until: float):
+        with self._lock:
+            self._until[key] = until
+            if len(self._until) > self.maxsize:
+                now = time.time()
+                self._until = {k: v for k, v in self._until.items() if v > now}
+
+    def pinned(self, key: Optional[str]) -> bool:
+        return key is not None and self._until.get(key, 0.0) > time.time()
+
+
+sticky_clients = StickyClients()
+
+
+def reads_primary(headers) -> bool:
+    """Whether a read with these request headers must see the primary."""
+    until = headers.get(HEADER)
+    if until:
+        try:
+            # Capped, so a client can't pin itself to the primary for long
+            if time.time() < float(until) <= time.time() + settings.REPLICA_STICKY_SECONDS:
+                return True
+        except ValueError:
+            pass
+    return sticky_clients.pinned(headers.get("authorization"))
+
+
+class ReadYourWritesMiddleware:
+    """ASGI middleware pinning callers to the primary after a successful write."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in WRITE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                until = time.time() + settings.REPLICA_STICKY_SECONDS
+                for name, value in scope["headers"]:
+                    if name == b"authorization":
+                        sticky_clients.pin(value.decode("latin-1"), until)
+                message["headers"] = list(message.get("headers", [])) + [(HEADER.encode(), f"{until:.3f}".encode())]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
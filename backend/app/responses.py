@@ -0,0 +1,85 @@
+import json
+from datetime import date, datetime
+from typing import Any, Iterable, Type
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse
+from app.config import settings
+
+# JSON encoding for API responses.
+#
+# orjson is several times faster than the stdlib encoder on large list
+# payloads and handles datetimes and enums natively. It is optional: when it
+# is not installed (or JSON_RESPONSE=json) everything falls back to `json`.
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _stdlib_dumps(content: Any) -> bytes:
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+        default=_default,
+    ).encode("utf-8")
+
+
+def _orjson_dumps(content: Any) -> bytes:
+    return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+class StdJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return _stdlib_dumps(content)
+
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return _orjson_dumps(content)
+
+
+def json_backend() -> str:
+    """The encoder selected by settings.JSON_RESPONSE ("auto", "orjson" or "json")."""
+    choice = settings.JSON_RESPONSE.lower()
+    if choice not in ("auto", "orjson", "json"):
+        raise ValueError(f"JSON_RESPONSE must be auto, orjson or json, not {settings.JSON_RESPONSE!r}")
+    if choice == "orjson" and orjson is None:
+        raise RuntimeError("JSON_RESPONSE=orjson but orjson is not installed")
+    if choice == "json" or orjson is None:
+        return "json"
+    return "orjson"
+
+
+_BACKEND = json_backend()
+
+# Used for every route through FastAPI(default_response_class=...)
+DefaultJSONResponse: Type[JSONResponse] = ORJSONResponse if _BACKEND == "orjson" else StdJSONResponse
+dumps = _orjson_dumps if _BACKEND == "orjson" else _stdlib_dumps
+
+
+class StreamingAwareGZipMiddleware(GZipMiddleware):
+    """GZip for everything except `exclude_paths`.
+
+    Starlette's GZip keeps compressed output in its buffer until enough has
+    accumulated, which would hold server-sent events back indefinitely.
+    """
+
+    def __init__(self, app, exclude_paths: Iterable[str] = (), **kwargs):
+        super().__init__(app, **kwargs)
+        self.exclude_paths = tuple(exclude_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith(self.exclude_paths):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
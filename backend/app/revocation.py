@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, event, insert, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from app import models
+from app.config import settings
+
+# Revoked login sessions and users, checked on every request without
+# database I/O.
+#
+# A login starts a session whose id (`sid`) is carried by its access and
+# refresh tokens. Logging out revokes the session; deactivating or deleting a
+# user revokes every token issued to them until then. An entry is only kept
+# until the last token it could match has expired, so the lists stay as small
+# as the number of recent logouts.
+#
+# With TOKEN_REVOCATION_STORE=database, revocations are also written to the
+# `revoked_tokens` table, in the transaction that causes them, and each
+# worker applies new rows every TOKEN_REVOCATION_SYNC_SECONDS. Revocations
+# made in a session's transaction reach the in-memory lists when it commits
+# and are dropped if it rolls back, like app.events. The default
+# "memory" store is per process: with several workers, a revoked session
+# stays usable on the others until its access token expires, and its refresh
+# token until the user is deactivated.
+
+logger = logging.getLogger(__name__)
+
+SESSION = "session"
+USER = "user"
+
+_revoked = models.RevokedToken.__table__
+
+_PENDING = "pending_revocations"
+
+
+class RevocationList:
+    """Revoked session ids and per-user cutoffs, each with an expiry time."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.sessions: Dict[str, float] = {}  # sid -> expires at
+        self.users: Dict[str, Tuple[float, float]] = {}  # user id -> (revoked at, expires at)
+        self.last_id = 0  # newest revoked_tokens row applied
+        self._next_prune = 0.0
+
+    def add(self, kind: str, key: str, revoked_at: float, expires_at: float):
+        with self._lock:
+            if kind == SESSION:
+                self.sessions[key] = max(expires_at, self.sessions.get(key, 0.0))
+            else:
+                previous = self.users.get(key, (0.0, 0.0))
+                self.users[key] = (max(revoked_at, previous[0]), max(expires_at, previous[1]))
+            if time.time() >= self._next_prune:
+                self._prune()
+
+    def is_revoked(self, sid: Optional[str], user_id: str, issued_at: float) -> bool:
+        # Plain dict reads, no lock needed on the hot path
+        if sid is not None and sid in self.sessions:
+            return True
+        user = self.users.get(user_id)
+        return user is not None and issued_at <= user[0]
+
+    def _prune(self):
+        now = time.time()
+        self.sessions = {sid: expires for sid, expires in self.sessions.items() if expires > now}
+        self.users = {key: entry for key, entry in self.users.items() if entry[1] > now}
+        self._next_prune = now + 60
+
+    def clear(self):
+        with self._lock:
+            self.sessions = {}
+            self.users = {}
+            self.last_id = 0
+
+    def stats(self) -> dict:
+        return {
+            "store": settings.TOKEN_REVOCATION_STORE,
+            "sessions": len(self.sessions),
+            "users": len(self.users),
+        }
+
+
+revocations = RevocationList()
+
+
+def _timestamp(value: datetime) -> float:
+    # SQLite hands back naive datetimes; they are stored in UTC
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def revoke(kind: str, key, expires_at: float, connection: Optional[Connection] = None,
+           session: Optional[Session] = None):
+    """Revoke a session (key = sid) or every token of a user issued until now.
+
+    With the database store the row is written on `connection` when given,
+    so it commits or rolls back with the change that caused it. With
+    `session`, the in-memory entry waits for that session to commit.
+    """
+    revoked_at = time.time()
+    if session is not None:
+        session.info.setdefault(_PENDING, []).append((kind, str(key), revoked_at, expires_at))
+    else:
+        revocations.add(kind, str(key), revoked_at, expires_at)
+    if settings.TOKEN_REVOCATION_STORE != "database":
+        return
+    row = {
+        "kind": kind,
+        "key": str(key),
+        "revoked_at": datetime.fromtimestamp(revoked_at, timezone.utc),
+        "expires_at": datetime.fromtimestamp(expires_at, timezone.utc),
+    }
+    if connection is not None:
+        connection.execute(insert(_revoked), row)
+    else:
+        from app.database import engine
+
+        with engine.begin() as conn:
+            conn.execute(insert(_revoked), row)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending(session):
+    for entry in session.info.pop(_PENDING, ()):
+        revocations.add(*entry)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop(_PENDING, None)
+
+
+def sync(connection: Connection) -> int:
+    """Apply rows written since the last sync (by any worker); returns how many."""
+    now = datetime.now(timezone.utc)
+    rows = connection.execute(
+        select(_revoked).where(_revoked.c.id > revocations.last_id, _revoked.c.expires_at > now)
+        .order_by(_revoked.c.id)
+    ).all()
+    for row in rows:
+        revocations.add(row.kind, row.key, _timestamp(row.revoked_at), _timestamp(row.expires_at))
+        revocations.last_id = row.id
+    return len(rows)
+
+
+def prune(connection: Connection) -> int:
+    return connection.execute(delete(_revoked).where(_revoked.c.expires_at <= datetime.now(timezone.utc))).rowcount
+
+
+async def run_sync(engine, interval: float = None):
+    """Sync forever, starting immediately. Cancel the task to stop it."""
+    interval = settings.TOKEN_REVOCATION_SYNC_SECONDS if interval is None else interval
+    next_prune = 0.0
+
+    def sync_once():
+        nonlocal next_prune
+        with engine.begin() as conn:
+            applied = sync(conn)
+            if time.monotonic() >= next_prune:
+                prune(conn)
+                next_prune = time.monotonic() + 3600
+        return applied
+
+    while True:
+        try:
+            await run_in_threadpool(sync_once)
+        except DBAPIError:
+            logger.exception("revoked token sync failed")
+        await asyncio.sleep(interval)
@@ -0,0 +1,155 @@
+import inspect
+from fastapi import APIRouter, Depends, HTTPException, params, status
+from fastapi.routing import APIRoute
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db, get_async_read_db, get_db, get_read_db
+from app import models, schemas, auth
+
+# Async versions of the API routers, used when settings.DB_ASYNC is enabled.
+#
+# Each route of a sync router is re-registered with an `async def` endpoint
+# that takes an AsyncSession and runs the original handler through
+# `AsyncSession.run_sync`. Database I/O then goes through the async driver on
+# the event loop instead of occupying a threadpool worker, and the handler
+# logic stays in one place. Handlers with CPU-heavy work (password hashing)
+# are written natively below so that work is pushed off the event loop.
+
+# Sync dependency -> async replacement
+_DEPENDENCY_SWAPS = {
+    get_db: get_async_db,
+    get_read_db: get_async_read_db,
+}
+
+
+def _async_endpoint(endpoint):
+    signature = inspect.signature(endpoint)
+    session_params = []
+    parameters = []
+    for param in signature.parameters.values():
+        default = param.default
+        if isinstance(default, params.Depends) and default.dependency in _DEPENDENCY_SWAPS:
+            # Every swapped dependency is a session
+            session_params.append(param.name)
+            param = param.replace(
+                default=Depends(_DEPENDENCY_SWAPS[default.dependency]),
+                annotation=AsyncSession,
+            )
+        parameters.append(param)
+
+    if session_params:
+        async def wrapper(**kwargs):
+            db: AsyncSession = kwargs[session_params[0]]
+
+            def call(sync_db):
+                return endpoint(**{**kwargs, **{name: sync_db for name in session_params}})
+
+            return await db.run_sync(call)
+    else:
+        # No database access of its own, only swapped dependencies
+        async def wrapper(**kwargs):
+            return endpoint(**kwargs)
+
+    wrapper.__name__ = endpoint.__name__
+    wrapper.__doc__ = endpoint.__doc__
+    wrapper.__signature__ = signature.replace(parameters=parameters)
+    return wrapper
+
+
+def make_async_router(sync_router: APIRouter, overrides: dict = None) -> APIRouter:
+    """Build an async copy of `sync_router`.
+
+    `overrides` maps endpoint names to hand-written async endpoints that
+    replace the generated wrapper.
+    """
+    overrides = overrides or {}
+    router = APIRouter()
+    for route in sync_router.routes:
+        if not isinstance(route, APIRoute):
+            router.routes.append(route)
+            continue
+        endpoint = overrides.get(route.name) or _async_endpoint(route.endpoint)
+        router.add_api_route(
+            route.path,
+            endpoint,
+            response_model=route.response_model,
+            status_code=route.status_code,
+            methods=route.methods,
+            name=route.name,
+            response_class=route.response_class,
+            summary=route.summary,
+            description=route.description,
+        )
+    return router
+
+
+async def register(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(models.User).where(models.User.username == user.username))
+    if result.scalars().first():
+        raise HTTPException(status_code=400, detail="Username already registered")
+
+    result = await db.execute(select(models.User).where(models.User.email == user.email))
+    if result.scalars().first():
+        raise HTTPException(status_code=400, detail="Email already registered")
+    # Give the connection back before waiting on the hash pool
+    await db.close()
+
+    hashed_password = await auth.get_password_hash_pooled(user.password)
+    db_user = models.User(
+        username=user.username,
+        email=user.email,
+        hashed_password=hashed_password
+    )
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
+
+
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    auth.throttle_login(form_data.username)
+    result = await db.execute(select(models.User).where(models.User.username == form_data.username))
+    user = result.scalars().first()
+    # Give the connection back before waiting on the hash pool
+    await db.close()
+
+    # Demo mode: allow any username/password if no users exist
+    if not user:
+        user_count = (await db.execute(select(func.count(models.User.id)))).scalar_one()
+        if user_count == 0:
+            hashed_password = await auth.get_password_hash_pooled(form_data.password)
+            user = models.User(
+                username=form_data.username,
+                email=f"{form_data.username}@demo.com",
+                hashed_password=hashed_password
+            )
+            db.add(user)
+            await db.commit()
+            await db.refresh(user)
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Incorrect username or password"
+            )
+    else:
+        verified, new_hash = await auth.verify_password_pooled(form_data.password, user.hashed_password)
+        if not verified:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Incorrect username or password"
+            )
+        if new_hash:
+            (await db.get(models.User, user.id)).hashed_password = new_hash
+            await db.commit()
+    auth.login_throttle.reset(form_data.username)
+
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect username or password"
+        )
+    return auth.create_tokens(user)
+
+
+AUTH_OVERRIDES = {"register": register, "login": login}
@@ -1,15 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from datetime import timedelta
+from datetime import datetime, timezone
 from app.database import get_db
 from app import models, schemas, auth
-from app.config import settings
+from app.revocation import SESSION, revocations, revoke
 
 router = APIRouter()
 
-@router.post("/register", response_model=schemas.User)
-def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
+def _check_new_user(db: Session, user: schemas.UserCreate):
     # Check if username exists
     db_user = db.query(models.User).filter(models.User.username == user.username).first()
     if db_user:
@@ -19,9 +19,10 @@ def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
     db_user = db.query(models.User).filter(models.User.email == user.email).first()
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    
-    # Create new user
-    hashed_password = auth.get_password_hash(user.password)
+    # Give the connection back before waiting on the hash pool
+    db.close()
+
+def _create_user(db: Session, user: schemas.UserCreate, hashed_password: str):
     db_user = models.User(
         username=user.username,
         email=user.email,
@@ -32,45 +33,98 @@ def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
     db.refresh(db_user)
     return db_user
 
+@router.post("/register", response_model=schemas.User)
+async def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
+    # Async like login: hashing waits on the password hash pool, not on a
+    # threadpool worker
+    await run_in_threadpool(_check_new_user, db, user)
+    hashed_password = await auth.get_password_hash_pooled(user.password)
+    return await run_in_threadpool(_create_user, db, user, hashed_password)
+
+def _find_user(db: Session, username: str):
+    user = db.query(models.User).filter(models.User.username == username).first()
+    # Give the connection back before waiting on the hash pool; the user
+    # stays loaded, detached
+    db.close()
+    return user
+
+def _create_demo_user(db: Session, username: str, hashed_password: str):
+    user = models.User(
+        username=username,
+        email=f"{username}@demo.com",
+        hashed_password=hashed_password
+    )
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+def _store_rehash(db: Session, user_id: int, hashed_password: str):
+    db.get(models.User, user_id).hashed_password = hashed_password
+    db.commit()
+
 @router.post("/login", response_model=schemas.Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    # Find user
-    user = db.query(models.User).filter(models.User.username == form_data.username).first()
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    # Async so that waiting on the password hash pool holds no threadpool
+    # worker; the queries themselves still run on the threadpool
+    auth.throttle_login(form_data.username)
+    user = await run_in_threadpool(_find_user, db, form_data.username)
     
     # Demo mode: allow any username/password if no users exist
     if not user:
-        user_count = db.query(models.User).count()
+        user_count = await run_in_threadpool(db.query(models.User).count)
         if user_count == 0:
             # Create demo user on the fly
-            hashed_password = auth.get_password_hash(form_data.password)
-            user = models.User(
-                username=form_data.username,
-                email=f"{form_data.username}@demo.com",
-                hashed_password=hashed_password
-            )
-            db.add(user)
-            db.commit()
-            db.refresh(user)
+            hashed_password = await auth.get_password_hash_pooled(form_data.password)
+            user = await run_in_threadpool(_create_demo_user, db, form_data.username, hashed_password)
         else:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect username or password"
             )
     else:
-        # Verify password
-        if not auth.verify_password(form_data.password, user.hashed_password):
+        # Verify password, upgrading hashes made with other rounds
+        verified, new_hash = await auth.verify_password_pooled(form_data.password, user.hashed_password)
+        if not verified:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect username or password"
             )
+        if new_hash:
+            await run_in_threadpool(_store_rehash, db, user.id, new_hash)
+    auth.login_throttle.reset(form_data.username)
     
-    # Create access token
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = auth.create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
-    )
-    return {"access_token": access_token, "token_type": "bearer"}
+    # Tokens are not checked against the users table, so refuse them here
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect username or password"
+        )
+    return auth.create_tokens(user)
 
 @router.get("/me", response_model=schemas.User)
 def get_current_user_info(current_user: models.User = Depends(auth.get_current_user)):
-    return current_user
\ No newline at end of file
+    return current_user
+
+@router.post("/refresh", response_model=schemas.Token)
+def refresh(body: schemas.RefreshRequest, db: Session = Depends(get_db)):
+    claims = auth.decode_token(body.refresh_token, auth.REFRESH)
+    # The one place a token is checked against the users table
+    user = db.query(models.User).filter(models.User.id == claims["uid"]).first()
+    if user is None or not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return auth.create_tokens(user, claims["sid"], datetime.fromtimestamp(claims["exp"], timezone.utc))
+
+@router.post("/logout")
+def logout(claims: dict = Depends(auth.get_current_claims)):
+    # Ends the session: its access and refresh tokens are both rejected
+    revoke(SESSION, claims["sid"], claims["sexp"])
+    return {"message": "Logged out successfully"}
+
+@router.get("/revocations/stats")
+def get_revocation_stats(current_user: models.User = Depends(auth.get_current_user)):
+    return revocations.stats()
\ No newline at end of file
@@ -1,21 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import csv
+from fastapi import APIRouter, Depends, File, HTTPException, Request, Response, UploadFile, status
 from sqlalchemy.orm import Session
-from typing import List
-from app.database import get_db
-from app import models, schemas, auth
+from typing import List, Optional, Union
+from app.database import get_db, get_read_db
+from app.events import emit
+from app import models, schemas, auth, stats, counters, catalog_import, http_cache, open_loans, search as catalog_search
+from app.pagination import paginate
+from app.projection import parse_fields, rows_response
 
 router = APIRouter()
 
-@router.get("/", response_model=List[schemas.Book])
+@router.get("/", response_model=Union[List[schemas.Book], schemas.BookPage])
 def get_books(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     category: str = None,
     status: str = None,
     search: str = None,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_read_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
+    # Only the requested columns, serialized without per-row models
+    columns = parse_fields(fields, models.Book, schemas.Book)
+    
+    # 304 before running the query when the catalog hasn't changed
+    not_modified = http_cache.check(request, response, http_cache.table_validators(db, ["books"]))
+    if not_modified is not None:
+        return not_modified
+    
     query = db.query(models.Book)
     
     if category:
@@ -25,24 +41,47 @@ def get_books(
         query = query.filter(models.Book.status == status)
     
     if search:
-        query = query.filter(
-            (models.Book.title.ilike(f"%{search}%")) |
-            (models.Book.author.ilike(f"%{search}%")) |
-            (models.Book.isbn.ilike(f"%{search}%"))
-        )
+        # Indexed full-text match, ordered by relevance
+        query = catalog_search.apply_book_search(query, search)
+    
+    if columns:
+        query = query.with_entities(*columns)
     
+    if cursor is not None:
+        # Keyset mode: pass an empty cursor for the first page, then next_cursor
+        if search:
+            raise HTTPException(status_code=400, detail="Cursor pagination is not supported with search")
+        books, next_cursor = paginate(query, [models.Book.id], cursor, limit)
+        if columns:
+            return rows_response(books, columns, paged=True, next_cursor=next_cursor)
+        return {"items": books, "next_cursor": next_cursor}
+    
+    if columns and not search:
+        # A covering index may otherwise change the row order between pages
+        query = query.order_by(models.Book.id)
     books = query.offset(skip).limit(limit).all()
+    if columns:
+        return rows_response(books, columns)
     return books
 
 @router.get("/{book_id}", response_model=schemas.Book)
 def get_book(
     book_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
+    validators = http_cache.table_validators(db, ["books"], extra=[book_id])
+    not_modified = http_cache.check(request, response, validators)
+    if not_modified is not None:
+        return not_modified
+    
     book = db.query(models.Book).filter(models.Book.id == book_id).first()
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
+    if book.updated_at:
+        response.headers["Last-Modified"] = http_cache.http_date(book.updated_at)
     return book
 
 @router.post("/", response_model=schemas.Book, status_code=status.HTTP_201_CREATED)
@@ -58,10 +97,44 @@ def create_book(
     
     db_book = models.Book(**book.dict())
     db.add(db_book)
+    db.flush()
+    deltas = stats.book_deltas(db_book.status, db_book.copies, db_book.available_copies, db_book.category)
+    counters.apply(db, deltas)
+    emit(db, "book_created", {"book_id": db_book.id}, deltas=deltas)
     db.commit()
+    stats.invalidate_stats()
     db.refresh(db_book)
     return db_book
 
+@router.post("/bulk", response_model=schemas.BulkImportResult)
+def bulk_import_books(
+    file: UploadFile = File(...),
+    format: Optional[str] = None,
+    on_duplicate: str = "skip",
+    batch_size: int = 5000,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    fmt = format or catalog_import.detect_format(file.filename)
+    if fmt not in catalog_import.FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format, expected one of {catalog_import.FORMATS}")
+    if on_duplicate not in catalog_import.DUPLICATE_MODES:
+        raise HTTPException(status_code=400, detail=f"on_duplicate must be one of {catalog_import.DUPLICATE_MODES}")
+    if batch_size < 1:
+        raise HTTPException(status_code=400, detail="batch_size must be positive")
+    
+    # The upload is spooled to disk and parsed row by row
+    try:
+        return catalog_import.import_books(
+            db,
+            catalog_import.iter_rows(file.file, fmt),
+            batch_size=batch_size,
+            on_duplicate=on_duplicate,
+            progress=catalog_import.log_progress,
+        )
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Could not parse file: {e}")
+
 @router.put("/{book_id}", response_model=schemas.Book)
 def update_book(
     book_id: int,
@@ -69,15 +142,34 @@ def update_book(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
-    db_book = db.query(models.Book).filter(models.Book.id == book_id).first()
+    # Locked, so a borrow of this title commits before or after the resize
+    db_book = db.query(models.Book).filter(models.Book.id == book_id).with_for_update().first()
     if not db_book:
         raise HTTPException(status_code=404, detail="Book not found")
     
+    before = (db_book.status, db_book.copies, db_book.available_copies, db_book.category)
     update_data = book.dict(exclude_unset=True)
+    if update_data.get("copies") is not None:
+        # The shelf holds the new copies minus the open loans, counted in SQL
+        shelf = models.available_copies_after_resize(update_data["copies"])
+        db_book.available_copies = shelf
+        if update_data.get("status") is None:
+            db_book.status = models.status_for_shelf(shelf)
     for field, value in update_data.items():
         setattr(db_book, field, value)
+    if update_data.get("title") is not None:
+        open_loans.rename_book(db, book_id, update_data["title"])
     
+    # Read back the resized shelf count for the event
+    db.flush()
+    db.refresh(db_book)
+    deltas = stats.book_change_deltas(
+        before, (db_book.status, db_book.copies, db_book.available_copies, db_book.category)
+    )
+    counters.apply(db, deltas)
+    emit(db, "book_updated", {"book_id": book_id, "fields": sorted(update_data)}, deltas=deltas)
     db.commit()
+    stats.invalidate_stats()
     db.refresh(db_book)
     return db_book
 
@@ -91,23 +183,24 @@ def delete_book(
     if not db_book:
         raise HTTPException(status_code=404, detail="Book not found")
     
+    deltas = stats.book_deltas(db_book.status, db_book.copies, db_book.available_copies, db_book.category, sign=-1)
+    counters.apply(db, deltas)
+    emit(db, "book_deleted", {"book_id": book_id}, deltas=deltas)
     db.delete(db_book)
     db.commit()
+    stats.invalidate_stats()
     return {"message": "Book deleted successfully"}
 
 @router.get("/stats/summary")
 def get_books_stats(
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
-    total_books = db.query(models.Book).count()
-    available = db.query(models.Book).filter(models.Book.status == models.BookStatus.AVAILABLE).count()
-    borrowed = db.query(models.Book).filter(models.Book.status == models.BookStatus.BORROWED).count()
-    reserved = db.query(models.Book).filter(models.Book.status == models.BookStatus.RESERVED).count()
+    not_modified = http_cache.check(request, response, http_cache.table_validators(db, ["books"]))
+    if not_modified is not None:
+        return not_modified
     
-    return {
-        "total_books": total_books,
-        "available": available,
-        "borrowed": borrowed,
-        "reserved": reserved
-    }
\ No newline at end of file
+    # Stored counters instead of counting the catalog
+    return stats.book_counts(db)
\ No newline at end of file
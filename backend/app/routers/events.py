@@ -0,0 +1,60 @@
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, Request
+from fastapi.responses import StreamingResponse
+from app import models, auth
+from app.config import settings
+from app.events import get_bus
+from app.responses import dumps
+
+# Server-sent events stream of library changes.
+#
+# Clients load /api/stats/dashboard once, then apply the `deltas` of each
+# event (see app.events). EventSource reconnects by itself and sends the
+# last id it saw as Last-Event-ID; the bus replays what it missed, or sends
+# a "resync" event when it can't.
+
+router = APIRouter()
+
+RETRY_MS = 3000
+
+def _frame(item: dict) -> bytes:
+    lines = []
+    if item["id"] is not None:
+        lines.append(f"id: {item['id']}")
+    lines.append(f"event: {item['type']}")
+    lines.append(f"data: {dumps(item['data']).decode()}")
+    return ("\n".join(lines) + "\n\n").encode()
+
+async def _stream(request: Request, after: Optional[int]):
+    subscription = await get_bus().subscribe(after)
+    try:
+        yield f"retry: {RETRY_MS}\n\n".encode()
+        while True:
+            try:
+                item = await asyncio.wait_for(subscription.get(), settings.EVENT_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                # Comment line; keeps proxies from closing an idle connection
+                yield b": keepalive\n\n"
+                continue
+            yield _frame(item)
+    finally:
+        subscription.close()
+
+@router.get("/stream")
+async def stream_events(
+    request: Request,
+    last_event_id: Optional[str] = Header(None),
+    current_user: models.User = Depends(auth.get_current_user_for_stream)
+):
+    try:
+        after = int(last_event_id) if last_event_id else None
+    except ValueError:
+        after = None
+    return StreamingResponse(
+        _stream(request, after),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
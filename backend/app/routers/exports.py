@@ -0,0 +1,125 @@
+import csv
+import enum
+import io
+import json
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from app.database import read_session
+from app import models, auth
+
+# Streaming CSV / NDJSON exports.
+#
+# Rows are read as plain column tuples (no ORM identity map, no Pydantic)
+# through a streaming cursor with `yield_per`, and written out in chunks, so
+# memory stays flat however many rows are exported. The generator owns its
+# own session because it outlives the request handler; like other reads, it
+# is on a replica when DATABASE_REPLICA_URLS are set.
+
+router = APIRouter()
+
+FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+YIELD_PER = 1000
+
+def _plain(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def _stream_rows(db, stmt, columns, fmt: str):
+    try:
+        result = db.execute(stmt.execution_options(yield_per=YIELD_PER))
+        buffer = io.StringIO()
+        writer = csv.writer(buffer) if fmt == "csv" else None
+        if writer:
+            writer.writerow(columns)
+
+        for partition in result.partitions():
+            for row in partition:
+                values = [_plain(v) for v in row]
+                if writer:
+                    writer.writerow(values)
+                else:
+                    buffer.write(json.dumps(dict(zip(columns, values))))
+                    buffer.write("\n")
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+    finally:
+        db.close()
+
+def _export(request: Request, table, stmt, fmt: str, filename: str):
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format, expected one of {list(FORMATS)}")
+    columns = [c.name for c in table.columns]
+    return StreamingResponse(
+        _stream_rows(read_session(request), stmt, columns, fmt),
+        media_type=FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
+
+def _date_range(stmt, column, start: Optional[datetime], end: Optional[datetime]):
+    if start:
+        stmt = stmt.where(column >= start)
+    if end:
+        stmt = stmt.where(column < end)
+    return stmt
+
+@router.get("/transactions")
+def export_transactions(
+    request: Request,
+    format: str = "csv",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    book_id: int = None,
+    member_id: int = None,
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    table = models.Transaction.__table__
+    stmt = _date_range(select(table), table.c.transaction_date, start, end)
+    if book_id:
+        stmt = stmt.where(table.c.book_id == book_id)
+    if member_id:
+        stmt = stmt.where(table.c.member_id == member_id)
+    # Same (transaction_date, id) order as the keyset-paginated listing
+    stmt = stmt.order_by(table.c.transaction_date, table.c.id)
+    return _export(request, table, stmt, format, "transactions")
+
+@router.get("/books")
+def export_books(
+    request: Request,
+    format: str = "csv",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    category: str = None,
+    status: str = None,
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    table = models.Book.__table__
+    stmt = _date_range(select(table), table.c.created_at, start, end)
+    if category:
+        stmt = stmt.where(table.c.category == category)
+    if status:
+        stmt = stmt.where(table.c.status == status)
+    return _export(request, table, stmt.order_by(table.c.id), format, "books")
+
+@router.get("/members")
+def export_members(
+    request: Request,
+    format: str = "csv",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    status: str = None,
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    table = models.Member.__table__
+    stmt = _date_range(select(table), table.c.created_at, start, end)
+    if status:
+        stmt = stmt.where(table.c.status == status)
+    return _export(request, table, stmt.order_by(table.c.id), format, "members")
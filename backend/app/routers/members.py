@@ -1,20 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
-from typing import List
-from app.database import get_db
-from app import models, schemas, auth
+from typing import List, Optional, Union
+from app.database import get_db, get_read_db
+from app.events import emit
+from app import models, schemas, auth, stats, counters, http_cache, open_loans
+from app.pagination import paginate
+from app.projection import parse_fields, rows_response
 
 router = APIRouter()
 
-@router.get("/", response_model=List[schemas.Member])
+@router.get("/", response_model=Union[List[schemas.Member], schemas.MemberPage])
 def get_members(
     skip: int = 0,
     limit: int = 100,
     status: str = None,
     search: str = None,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_read_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
+    # Only the requested columns, serialized without per-row models
+    columns = parse_fields(fields, models.Member, schemas.Member)
     query = db.query(models.Member)
     
     if status:
@@ -26,13 +33,28 @@ def get_members(
             (models.Member.email.ilike(f"%{search}%"))
         )
     
+    if columns:
+        query = query.with_entities(*columns)
+    
+    if cursor is not None:
+        # Keyset mode: pass an empty cursor for the first page, then next_cursor
+        members, next_cursor = paginate(query, [models.Member.id], cursor, limit)
+        if columns:
+            return rows_response(members, columns, paged=True, next_cursor=next_cursor)
+        return {"items": members, "next_cursor": next_cursor}
+    
+    if columns:
+        # A covering index may otherwise change the row order between pages
+        query = query.order_by(models.Member.id)
     members = query.offset(skip).limit(limit).all()
+    if columns:
+        return rows_response(members, columns)
     return members
 
 @router.get("/{member_id}", response_model=schemas.Member)
 def get_member(
     member_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
     member = db.query(models.Member).filter(models.Member.id == member_id).first()
@@ -53,7 +75,12 @@ def create_member(
     
     db_member = models.Member(**member.dict())
     db.add(db_member)
+    db.flush()
+    deltas = stats.member_deltas(db_member.status)
+    counters.apply(db, deltas)
+    emit(db, "member_created", {"member_id": db_member.id}, deltas=deltas)
     db.commit()
+    stats.invalidate_stats()
     db.refresh(db_member)
     return db_member
 
@@ -68,11 +95,20 @@ def update_member(
     if not db_member:
         raise HTTPException(status_code=404, detail="Member not found")
     
+    old_status = db_member.status
     update_data = member.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_member, field, value)
+    if update_data.get("name") is not None:
+        open_loans.rename_member(db, member_id, update_data["name"])
     
+    deltas = {}
+    if update_data.get("status") is not None:
+        deltas = stats.merge_deltas(stats.member_deltas(old_status, sign=-1), stats.member_deltas(db_member.status))
+    counters.apply(db, deltas)
+    emit(db, "member_updated", {"member_id": member_id, "fields": sorted(update_data)}, deltas=deltas)
     db.commit()
+    stats.invalidate_stats()
     db.refresh(db_member)
     return db_member
 
@@ -86,21 +122,24 @@ def delete_member(
     if not db_member:
         raise HTTPException(status_code=404, detail="Member not found")
     
+    deltas = stats.member_deltas(db_member.status, sign=-1)
+    counters.apply(db, deltas)
+    emit(db, "member_deleted", {"member_id": member_id}, deltas=deltas)
     db.delete(db_member)
     db.commit()
+    stats.invalidate_stats()
     return {"message": "Member deleted successfully"}
 
 @router.get("/stats/summary")
 def get_members_stats(
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
-    total_members = db.query(models.Member).count()
-    active = db.query(models.Member).filter(models.Member.status == models.MemberStatus.ACTIVE).count()
-    expired = db.query(models.Member).filter(models.Member.status == models.MemberStatus.EXPIRED).count()
+    not_modified = http_cache.check(request, response, http_cache.table_validators(db, ["members"]))
+    if not_modified is not None:
+        return not_modified
     
-    return {
-        "total_members": total_members,
-        "active": active,
-        "expired": expired
-    }
\ No newline at end of file
+    # Stored counters instead of counting the members
+    return stats.member_counts(db)
\ No newline at end of file
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends, Request, Response
+from sqlalchemy.orm import Session
+from app.database import get_read_db
+from app import models, auth, http_cache, stats
+
+router = APIRouter()
+
+@router.get("/dashboard")
+def get_dashboard_stats(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    # Overdue and due-today counts move with the clock, so the ETag also
+    # changes every cache period
+    validators = http_cache.table_validators(
+        db, ["books", "members", "transactions"], extra=[stats.cache_period()], last_modified=False
+    )
+    not_modified = http_cache.check(request, response, validators)
+    if not_modified is not None:
+        return not_modified
+    return stats.dashboard_stats(db)
@@ -1,33 +1,138 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import case, func, insert, update
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta, timezone
-from typing import List
-from app.database import get_db
-from app import models, schemas, auth
+from typing import Dict, List, Optional, Union
+from app.database import get_db, get_read_db
+from app import models, schemas, auth, stats, counters, open_loans
+from app.events import emit
+from app.pagination import paginate
+from app.projection import parse_fields, rows_response
 
 router = APIRouter()
 
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite hands back naive datetimes; they are stored in UTC
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+# Borrow/return state changes are conditional UPDATEs checked by rowcount, so
+# two desks (or worker processes) racing on the same copy cannot both win and
+# counters are never read-modify-written in Python.
+
+def _claim_book(db: Session, book_id: int) -> int:
+    # Take one copy off the shelf; the last copy out marks the title borrowed.
+    # Returns the copies left on the shelf.
+    available = db.execute(
+        update(models.Book).where(
+            models.Book.id == book_id,
+            models.Book.available_copies > 0,
+            models.Book.status != models.BookStatus.RESERVED
+        ).values({
+            models.Book.available_copies: models.Book.available_copies - 1,
+            models.Book.status: case(
+                (models.Book.available_copies <= 1, models.BookStatus.BORROWED.name),
+                else_=models.Book.status
+            ),
+        }).returning(models.Book.available_copies).execution_options(synchronize_session=False)
+    ).scalar()
+    if available is None:
+        if not db.query(models.Book.id).filter(models.Book.id == book_id).first():
+            raise HTTPException(status_code=404, detail="Book not found")
+        raise HTTPException(status_code=400, detail="Book is not available")
+    return available
+
+def _claim_books(db: Session, book_ids: List[int]) -> Dict[int, int]:
+    # `_claim_book` for a whole stack in one UPDATE. Returns the copies left
+    # per claimed book; ids missing from it were not on the shelf.
+    if not book_ids:
+        return {}
+    return dict(db.execute(
+        update(models.Book).where(
+            models.Book.id.in_(book_ids),
+            models.Book.available_copies > 0,
+            models.Book.status != models.BookStatus.RESERVED
+        ).values({
+            models.Book.available_copies: models.Book.available_copies - 1,
+            models.Book.status: case(
+                (models.Book.available_copies <= 1, models.BookStatus.BORROWED.name),
+                else_=models.Book.status
+            ),
+        }).returning(models.Book.id, models.Book.available_copies).execution_options(synchronize_session=False)
+    ).all())
+
+def _claim_deltas(remaining: List[int]) -> dict:
+    # Dashboard counter changes for claims that left `remaining` copies
+    flips = sum(1 for available in remaining if available == 0)
+    return {"books.available_copies": -len(remaining), "books.available": -flips, "books.borrowed": flips}
+
+def _release_books(db: Session, book_ids: List[int]) -> dict:
+    # Put one copy of each book back (never more than it owns). Returns the
+    # dashboard counter changes.
+    before = db.query(models.Book.status, models.Book.copies, models.Book.available_copies).filter(
+        models.Book.id.in_(book_ids)
+    ).with_for_update().all()
+    returned = models.Book.available_copies + 1
+    db.query(models.Book).filter(models.Book.id.in_(book_ids)).update({
+        models.Book.available_copies: case(
+            (returned > models.Book.copies, models.Book.copies), else_=returned
+        ),
+        models.Book.status: models.BookStatus.AVAILABLE,
+    }, synchronize_session=False)
+    deltas = {}
+    for status, copies, available in before:
+        after = (models.BookStatus.AVAILABLE, copies, min((available or 0) + 1, copies or 0))
+        stats.merge_deltas(deltas, stats.book_change_deltas((status, copies, available), after))
+    return deltas
+
+def _add_member_loans(db: Session, member_id: int, delta: int):
+    count = func.coalesce(models.Member.books_count, 0) + delta
+    query = db.query(models.Member).filter(models.Member.id == member_id)
+    if delta > 0:
+        # Only active members may borrow; checked in the same statement
+        query = query.filter(models.Member.status == models.MemberStatus.ACTIVE)
+    else:
+        count = case((count > 0, count), else_=0)
+    if not query.update({models.Member.books_count: count}, synchronize_session=False):
+        if not db.query(models.Member.id).filter(models.Member.id == member_id).first():
+            raise HTTPException(status_code=404, detail="Member not found")
+        raise HTTPException(status_code=400, detail="Member is not active")
+
+def _close_borrow(db: Session, transaction_id: int, return_date: datetime) -> bool:
+    closed = db.query(models.Transaction).filter(
+        models.Transaction.id == transaction_id,
+        models.Transaction.return_date == None
+    ).update({models.Transaction.return_date: return_date}, synchronize_session=False)
+    return closed == 1
+
+def _close_borrows(db: Session, transaction_ids: List[int], return_date: datetime) -> set:
+    # `_close_borrow` for a whole stack in one UPDATE; returns the ids it closed
+    if not transaction_ids:
+        return set()
+    return set(db.execute(
+        update(models.Transaction).where(
+            models.Transaction.id.in_(transaction_ids),
+            models.Transaction.return_date == None
+        ).values({models.Transaction.return_date: return_date})
+        .returning(models.Transaction.id).execution_options(synchronize_session=False)
+    ).scalars())
+
 @router.post("/borrow")
 def borrow_book(
     request: schemas.BorrowBookRequest,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
-    # Check if book exists and is available
-    book = db.query(models.Book).filter(models.Book.id == request.book_id).first()
-    if not book:
-        raise HTTPException(status_code=404, detail="Book not found")
-    
-    if book.status != models.BookStatus.AVAILABLE:
-        raise HTTPException(status_code=400, detail="Book is not available")
-    
-    # Check if member exists
-    member = db.query(models.Member).filter(models.Member.id == request.member_id).first()
-    if not member:
-        raise HTTPException(status_code=404, detail="Member not found")
-    
-    if member.status != models.MemberStatus.ACTIVE:
-        raise HTTPException(status_code=400, detail="Member is not active")
+    try:
+        # Flip the book to borrowed only if it is still available
+        remaining = _claim_book(db, request.book_id)
+        
+        # Update member books count (fails if the member is missing or inactive)
+        _add_member_loans(db, request.member_id, 1)
+    except HTTPException:
+        db.rollback()
+        raise
     
     # Create transaction
     due_date = datetime.now(timezone.utc) + timedelta(days=request.due_days)
@@ -38,19 +143,21 @@ def borrow_book(
         due_date=due_date
     )
     db.add(transaction)
-    
-    # Update book status
-    book.status = models.BookStatus.BORROWED
-    
-    # Update member books count
-    member.books_count += 1
+    db.flush()
+    transaction_id = transaction.id
+    open_loans.record_loans(db, [transaction_id])
+    deltas = stats.merge_deltas(_claim_deltas([remaining]), stats.loan_deltas([due_date]))
+    counters.apply(db, deltas)
+    emit(db, "borrow", {
+        "member_id": request.member_id, "book_ids": [request.book_id], "transaction_ids": [transaction_id]
+    }, deltas=deltas)
     
     db.commit()
-    db.refresh(transaction)
+    stats.invalidate_stats()
     
     return {
         "message": "Book borrowed successfully",
-        "transaction_id": transaction.id,
+        "transaction_id": transaction_id,
         "due_date": due_date.isoformat()
     }
 
@@ -60,26 +167,28 @@ def return_book(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
-    # Check if book exists
-    book = db.query(models.Book).filter(models.Book.id == request.book_id).first()
-    if not book:
-        raise HTTPException(status_code=404, detail="Book not found")
-    
-    # Check if member exists
-    member = db.query(models.Member).filter(models.Member.id == request.member_id).first()
-    if not member:
-        raise HTTPException(status_code=404, detail="Member not found")
-    
     # Find the borrow transaction
     borrow_transaction = db.query(models.Transaction).filter(
         models.Transaction.book_id == request.book_id,
         models.Transaction.member_id == request.member_id,
-        models.Transaction.transaction_type == models.TransactionType.BORROW,
-        models.Transaction.return_date == None
+        *models.open_loan_filter()
     ).first()
     
     if not borrow_transaction:
+        if not db.query(models.Book.id).filter(models.Book.id == request.book_id).first():
+            raise HTTPException(status_code=404, detail="Book not found")
+        if not db.query(models.Member.id).filter(models.Member.id == request.member_id).first():
+            raise HTTPException(status_code=404, detail="Member not found")
+        raise HTTPException(status_code=400, detail="No active borrow record found")
+    
+    due_date = _as_utc(borrow_transaction.due_date)
+    now = datetime.now(timezone.utc)
+    
+    # Close the loan; a concurrent return of the same loan gets rowcount 0
+    if not _close_borrow(db, borrow_transaction.id, now):
+        db.rollback()
         raise HTTPException(status_code=400, detail="No active borrow record found")
+    open_loans.drop_loans(db, [borrow_transaction.id])
     
     # Create return transaction
     return_transaction = models.Transaction(
@@ -89,21 +198,20 @@ def return_book(
     )
     db.add(return_transaction)
     
-    # Update borrow transaction with return date
-    borrow_transaction.return_date = datetime.now(timezone.utc)
-    
-    # Update book status to available
-    book.status = models.BookStatus.AVAILABLE
-    
-    # Update member books count
-    if member.books_count > 0:
-        member.books_count -= 1
+    deltas = stats.merge_deltas(_release_books(db, [request.book_id]), stats.loan_deltas([due_date], -1))
+    _add_member_loans(db, request.member_id, -1)
+    db.flush()
+    counters.apply(db, deltas)
+    emit(db, "return", {
+        "member_id": request.member_id, "book_ids": [request.book_id], "transaction_ids": [return_transaction.id]
+    }, deltas=deltas)
     
     db.commit()
+    stats.invalidate_stats()
     db.refresh(return_transaction)
     
     # Check if returned late
-    is_late = datetime.now(timezone.utc) > borrow_transaction.due_date if borrow_transaction.due_date else False
+    is_late = now > due_date if due_date else False
     
     return {
         "message": "Book returned successfully",
@@ -112,15 +220,186 @@ def return_book(
         "return_date": return_transaction.transaction_date.isoformat()
     }
 
-@router.get("/", response_model=List[schemas.Transaction])
+def _batch_member(db: Session, member_id: int) -> models.Member:
+    member = db.query(models.Member).filter(models.Member.id == member_id).first()
+    if not member:
+        raise HTTPException(status_code=404, detail="Member not found")
+    return member
+
+def _insert_transactions(db: Session, member_id: int, book_ids: List[int],
+                         transaction_type: models.TransactionType, due_date: Optional[datetime] = None) -> Dict[int, int]:
+    # One INSERT for a batch's transactions; returns their ids by book
+    rows = db.execute(
+        insert(models.Transaction).returning(models.Transaction.book_id, models.Transaction.id),
+        [
+            {"book_id": book_id, "member_id": member_id, "transaction_type": transaction_type, "due_date": due_date}
+            for book_id in book_ids
+        ],
+    ).all()
+    return dict(rows)
+
+def _batch_result(member_id: int, results: List[dict], atomic: bool) -> dict:
+    failed = sum(1 for r in results if not r["ok"])
+    if atomic and failed:
+        # Nothing was written; report every item so the desk can fix the stack
+        for r in results:
+            if r["ok"]:
+                r.update(ok=False, transaction_id=None, due_date=None, is_late=None, error="Not applied: batch rejected")
+        raise HTTPException(
+            status_code=400,
+            detail={"message": "Batch rejected", "member_id": member_id, "results": results},
+        )
+    return {
+        "member_id": member_id,
+        "succeeded": len(results) - failed,
+        "failed": failed,
+        "results": results,
+    }
+
+@router.post("/borrow/batch", response_model=schemas.BatchResult)
+def borrow_books_batch(
+    request: schemas.BatchBorrowRequest,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    member = _batch_member(db, request.member_id)
+    if member.status != models.MemberStatus.ACTIVE:
+        raise HTTPException(status_code=400, detail="Member is not active")
+    
+    # One query for every book in the batch
+    known_ids = {
+        book_id for (book_id,) in
+        db.query(models.Book.id).filter(models.Book.id.in_(set(request.book_ids)))
+    }
+    
+    # One UPDATE for the whole stack
+    claimed = _claim_books(db, [book_id for book_id in dict.fromkeys(request.book_ids) if book_id in known_ids])
+    
+    results = []
+    accepted = []
+    seen = set()
+    for book_id in request.book_ids:
+        if book_id in seen:
+            error = "Duplicate book in batch"
+        elif book_id not in known_ids:
+            error = "Book not found"
+        elif book_id not in claimed:
+            error = "Book is not available"
+        else:
+            error = None
+            accepted.append(book_id)
+        seen.add(book_id)
+        results.append({"book_id": book_id, "ok": error is None, "error": error})
+    remaining = [claimed[book_id] for book_id in accepted]
+    
+    if (request.atomic and len(accepted) < len(request.book_ids)) or not accepted:
+        db.rollback()
+        return _batch_result(member.id, results, atomic=request.atomic)
+    
+    try:
+        _add_member_loans(db, member.id, len(accepted))
+    except HTTPException:
+        db.rollback()
+        raise
+    
+    due_date = datetime.now(timezone.utc) + timedelta(days=request.due_days)
+    transactions = _insert_transactions(db, member.id, accepted, models.TransactionType.BORROW, due_date)
+    open_loans.record_loans(db, [transactions[b] for b in accepted])
+    for result in results:
+        if result["ok"]:
+            result.update(transaction_id=transactions[result["book_id"]], due_date=due_date)
+    deltas = stats.merge_deltas(_claim_deltas(remaining), stats.loan_deltas([due_date] * len(accepted)))
+    counters.apply(db, deltas)
+    emit(db, "borrow", {
+        "member_id": member.id, "book_ids": accepted, "transaction_ids": [transactions[b] for b in accepted]
+    }, deltas=deltas)
+    
+    # Single transaction for the whole stack
+    db.commit()
+    stats.invalidate_stats()
+    return _batch_result(request.member_id, results, atomic=request.atomic)
+
+@router.post("/return/batch", response_model=schemas.BatchResult)
+def return_books_batch(
+    request: schemas.BatchReturnRequest,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    member = _batch_member(db, request.member_id)
+    book_ids = set(request.book_ids)
+    
+    known_ids = {
+        book_id for (book_id,) in
+        db.query(models.Book.id).filter(models.Book.id.in_(book_ids))
+    }
+    open_borrows = {}
+    for transaction in db.query(models.Transaction).filter(
+        models.Transaction.member_id == member.id,
+        models.Transaction.book_id.in_(book_ids),
+        *models.open_loan_filter()
+    ):
+        open_borrows.setdefault(transaction.book_id, transaction)
+    
+    now = datetime.now(timezone.utc)
+    # One UPDATE for the whole stack; a concurrent return leaves its loan out
+    closed = _close_borrows(db, [transaction.id for transaction in open_borrows.values()], now)
+    results = []
+    accepted = []
+    seen = set()
+    for book_id in request.book_ids:
+        if book_id in seen:
+            error = "Duplicate book in batch"
+        elif book_id not in known_ids:
+            error = "Book not found"
+        elif book_id not in open_borrows or open_borrows[book_id].id not in closed:
+            error = "No active borrow record found"
+        else:
+            error = None
+            accepted.append(book_id)
+        seen.add(book_id)
+        results.append({"book_id": book_id, "ok": error is None, "error": error})
+    
+    if (request.atomic and len(accepted) < len(request.book_ids)) or not accepted:
+        db.rollback()
+        return _batch_result(member.id, results, atomic=request.atomic)
+    
+    returns = _insert_transactions(db, member.id, accepted, models.TransactionType.RETURN)
+    deltas = stats.merge_deltas(
+        _release_books(db, accepted), stats.loan_deltas([open_borrows[b].due_date for b in accepted], -1)
+    )
+    _add_member_loans(db, member.id, -len(accepted))
+    open_loans.drop_loans(db, [open_borrows[book_id].id for book_id in accepted])
+    
+    for result in results:
+        if result["ok"]:
+            due_date = _as_utc(open_borrows[result["book_id"]].due_date)
+            result.update(
+                transaction_id=returns[result["book_id"]],
+                is_late=now > due_date if due_date else False,
+            )
+    counters.apply(db, deltas)
+    emit(db, "return", {
+        "member_id": member.id, "book_ids": accepted, "transaction_ids": [returns[b] for b in accepted]
+    }, deltas=deltas)
+    
+    db.commit()
+    stats.invalidate_stats()
+    return _batch_result(request.member_id, results, atomic=request.atomic)
+
+@router.get("/", response_model=Union[List[schemas.Transaction], schemas.TransactionPage])
 def get_transactions(
     skip: int = 0,
     limit: int = 100,
     book_id: int = None,
     member_id: int = None,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_read_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
+    # Keyset pages need the sort key in every projected row
+    always = ("id", "transaction_date") if cursor is not None else ("id",)
+    columns = parse_fields(fields, models.Transaction, schemas.Transaction, always)
     query = db.query(models.Transaction)
     
     if book_id:
@@ -129,38 +408,102 @@ def get_transactions(
     if member_id:
         query = query.filter(models.Transaction.member_id == member_id)
     
+    if columns:
+        query = query.with_entities(*columns)
+    
+    if cursor is not None:
+        # Keyset mode on (transaction_date, id), newest first
+        transactions, next_cursor = paginate(
+            query,
+            [models.Transaction.transaction_date, models.Transaction.id],
+            cursor,
+            limit,
+            descending=True,
+        )
+        if columns:
+            return rows_response(transactions, columns, paged=True, next_cursor=next_cursor)
+        return {"items": transactions, "next_cursor": next_cursor}
+    
     transactions = query.order_by(models.Transaction.transaction_date.desc()).offset(skip).limit(limit).all()
+    if columns:
+        return rows_response(transactions, columns)
     return transactions
 
-@router.get("/active-borrows")
+def _loan_listing(query, columns, skip: int, limit: int, cursor: Optional[str]):
+    if cursor is not None:
+        loans, next_cursor = paginate(query, columns, cursor, limit)
+    else:
+        loans = query.order_by(*columns).offset(skip).limit(limit).all()
+    
+    # One clock reading for the whole page
+    now = datetime.now(timezone.utc)
+    items = [
+        {
+            "transaction_id": loan.transaction_id,
+            "book_id": loan.book_id,
+            "book_title": loan.book_title,
+            "member_id": loan.member_id,
+            "member_name": loan.member_name,
+            "borrow_date": loan.borrow_date,
+            "due_date": loan.due_date,
+            "is_overdue": loan.due_date is not None and now > _as_utc(loan.due_date),
+        }
+        for loan in loans
+    ]
+    if cursor is not None:
+        return {"items": items, "next_cursor": next_cursor}
+    return items
+
+def _open_loans_query(db: Session, book_id: Optional[int], member_id: Optional[int]):
+    query = db.query(models.OpenLoan)
+    if book_id:
+        query = query.filter(models.OpenLoan.book_id == book_id)
+    if member_id:
+        query = query.filter(models.OpenLoan.member_id == member_id)
+    return query
+
+@router.get("/active-borrows", response_model=Union[List[schemas.ActiveBorrow], schemas.ActiveBorrowPage])
 def get_active_borrows(
-    db: Session = Depends(get_db),
+    skip: int = 0,
+    limit: int = 100,
+    book_id: int = None,
+    member_id: int = None,
+    overdue: Optional[bool] = None,
+    due_within_days: Optional[int] = None,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
-    from sqlalchemy.orm import joinedload
-    
-    # Get all borrow transactions without a return date, with joined book and member data
-    active_borrows = db.query(models.Transaction).options(
-        joinedload(models.Transaction.book),
-        joinedload(models.Transaction.member)
-    ).filter(
-        models.Transaction.transaction_type == models.TransactionType.BORROW,
-        models.Transaction.return_date == None
-    ).all()
+    # Served from the open_loans table, in borrow order
+    query = _open_loans_query(db, book_id, member_id)
+    now = datetime.now(timezone.utc)
     
-    result = []
-    for transaction in active_borrows:
-        is_overdue = datetime.now(timezone.utc) > transaction.due_date if transaction.due_date else False
-        
-        result.append({
-            "transaction_id": transaction.id,
-            "book_id": transaction.book_id,
-            "book_title": transaction.book.title if transaction.book else "Unknown",
-            "member_id": transaction.member_id,
-            "member_name": transaction.member.name if transaction.member else "Unknown",
-            "borrow_date": transaction.transaction_date.isoformat(),
-            "due_date": transaction.due_date.isoformat() if transaction.due_date else None,
-            "is_overdue": is_overdue
-        })
-    
-    return result
\ No newline at end of file
+    if overdue is True:
+        query = query.filter(models.OpenLoan.due_date < now)
+    elif overdue is False:
+        query = query.filter((models.OpenLoan.due_date == None) | (models.OpenLoan.due_date >= now))
+    
+    if due_within_days is not None:
+        # Due soon: not yet overdue, due before the cutoff
+        query = query.filter(
+            models.OpenLoan.due_date >= now,
+            models.OpenLoan.due_date < now + timedelta(days=due_within_days)
+        )
+    
+    return _loan_listing(query, [models.OpenLoan.transaction_id], skip, limit, cursor)
+
+@router.get("/overdue", response_model=Union[List[schemas.ActiveBorrow], schemas.ActiveBorrowPage])
+def get_overdue(
+    skip: int = 0,
+    limit: int = 100,
+    book_id: int = None,
+    member_id: int = None,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    # Most overdue first, a range scan on (due_date, transaction_id)
+    query = _open_loans_query(db, book_id, member_id).filter(
+        models.OpenLoan.due_date < datetime.now(timezone.utc)
+    )
+    return _loan_listing(query, [models.OpenLoan.due_date, models.OpenLoan.transaction_id], skip, limit, cursor)
\ No newline at end of file
@@ -0,0 +1,61 @@
+from pathlib import Path
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+from app.config import settings
+
+# Schema management through the Alembic migrations in backend/migrations.
+#
+# The API no longer creates tables at import time: `perpus migrate` brings
+# the database to the latest revision, and startup only checks that it is
+# there, so several workers starting together never race on DDL.
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+ALEMBIC_INI = ROOT_DIR / "alembic.ini"
+
+# Schema the app shipped with before migrations existed
+BASELINE_REVISION = "0001"
+BASELINE_TABLES = {"books", "members", "users", "transactions"}
+
+
+def alembic_config(url: str = None) -> Config:
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("script_location", str(ROOT_DIR / "migrations"))
+    config.set_main_option("sqlalchemy.url", (url or settings.DATABASE_URL).replace("%", "%%"))
+    return config
+
+
+def head_revision() -> str:
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+
+def current_revision(engine: Engine):
+    with engine.connect() as conn:
+        return MigrationContext.configure(conn).get_current_revision()
+
+
+def upgrade(engine: Engine, revision: str = "head"):
+    """Migrate the database behind `engine` to `revision`.
+
+    Databases created by the old `create_all` startup have the tables but
+    no version table; they are stamped at the baseline first so only the
+    later revisions run against them.
+    """
+    config = alembic_config(engine.url.render_as_string(hide_password=False))
+    tables = set(inspect(engine).get_table_names())
+    if "alembic_version" not in tables and BASELINE_TABLES <= tables:
+        command.stamp(config, BASELINE_REVISION)
+    command.upgrade(config, revision)
+
+
+def check_schema(engine: Engine):
+    current = current_revision(engine)
+    head = head_revision()
+    if current != head:
+        raise RuntimeError(
+            f"Database schema is at revision {current or 'none'}, expected {head}. "
+            "Run `./perpus migrate` (or `python -m app.cli migrate`) first."
+        )
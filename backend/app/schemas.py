@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from app.models import BookStatus, MembershipType, MemberStatus, TransactionType
 
 # Book schemas
@@ -25,12 +25,31 @@ class BookUpdate(BaseModel):
 
 class Book(BookBase):
     id: int
+    available_copies: int
     created_at: datetime
     updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
 
+class BookPage(BaseModel):
+    items: List[Book]
+    next_cursor: Optional[str] = None
+
+class BulkImportError(BaseModel):
+    row: int
+    isbn: Optional[str] = None
+    error: str
+
+class BulkImportResult(BaseModel):
+    processed: int
+    inserted: int
+    updated: int
+    skipped: int
+    failed: int
+    errors: List[BulkImportError]
+    errors_truncated: bool
+
 # Member schemas
 class MemberBase(BaseModel):
     name: str
@@ -60,6 +79,10 @@ class Member(MemberBase):
     class Config:
         from_attributes = True
 
+class MemberPage(BaseModel):
+    items: List[Member]
+    next_cursor: Optional[str] = None
+
 # Auth schemas
 class UserCreate(BaseModel):
     username: str
@@ -73,6 +96,11 @@ class UserLogin(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None  # seconds until access_token expires
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 class User(BaseModel):
     id: int
@@ -93,6 +121,31 @@ class ReturnBookRequest(BaseModel):
     book_id: int
     member_id: int
 
+class BatchBorrowRequest(BaseModel):
+    member_id: int
+    book_ids: List[int] = Field(..., min_length=1, max_length=100)
+    due_days: int = 14
+    atomic: bool = True  # all-or-nothing; False applies the valid items only
+
+class BatchReturnRequest(BaseModel):
+    member_id: int
+    book_ids: List[int] = Field(..., min_length=1, max_length=100)
+    atomic: bool = True
+
+class BatchItemResult(BaseModel):
+    book_id: int
+    ok: bool
+    transaction_id: Optional[int] = None
+    due_date: Optional[datetime] = None
+    is_late: Optional[bool] = None
+    error: Optional[str] = None
+
+class BatchResult(BaseModel):
+    member_id: int
+    succeeded: int
+    failed: int
+    results: List[BatchItemResult]
+
 class Transaction(BaseModel):
     id: int
     book_id: int
@@ -104,4 +157,22 @@ class Transaction(BaseModel):
     created_at: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class TransactionPage(BaseModel):
+    items: List[Transaction]
+    next_cursor: Optional[str] = None
+
+class ActiveBorrow(BaseModel):
+    transaction_id: int
+    book_id: int
+    book_title: str
+    member_id: int
+    member_name: str
+    borrow_date: Optional[datetime] = None
+    due_date: Optional[datetime] = None
+    is_overdue: bool
+
+class ActiveBorrowPage(BaseModel):
+    items: List[ActiveBorrow]
+    next_cursor: Optional[str] = None
\ No newline at end of file
@@ -0,0 +1,88 @@
+import re
+from sqlalchemy import Float, Integer, text
+from sqlalchemy.orm import Query
+from app import models
+
+# Full-text search for the book catalog.
+#
+# SQLite uses an external-content FTS5 table kept in sync with `books` by
+# triggers, so every insert/update/delete (ORM or raw SQL) is indexed. FTS
+# only matches whole tokens by prefix, so searches with digits (ISBN
+# fragments) and searches FTS finds nothing for also match substrings, as the
+# old ILIKE search did.
+# PostgreSQL uses a GIN expression index on a tsvector plus trigram indexes
+# so substring matches on title/author/isbn stay indexed as well. Both are
+# created by migration 0002.
+
+FTS_TABLE = "books_fts"
+
+# The expression must match the index in migration 0002 exactly,
+# otherwise the planner will not pick the GIN index.
+_PG_TSVECTOR = (
+    "to_tsvector('simple', coalesce(title, '') || ' ' || "
+    "coalesce(author, '') || ' ' || coalesce(isbn, ''))"
+)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _tokens(search: str):
+    return _TOKEN_RE.findall(search.lower())
+
+
+def _sqlite_search(query: Query, search: str, tokens) -> Query:
+    # Prefix match on every term so search-as-you-type works ("orw 198")
+    match = " ".join(f'"{token}"*' for token in tokens)
+    fts_hits = (
+        f"SELECT rowid AS book_id, bm25({FTS_TABLE}, 10.0, 5.0, 1.0) AS rank "
+        f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match"
+    )
+    substring = any(char.isdigit() for char in search) or query.session.execute(
+        text(f"SELECT 1 FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match LIMIT 1"), {"match": match}
+    ).first() is None
+    if substring:
+        # Substring matches rank after every full-text hit (bm25 is negative)
+        hits = text(
+            f"SELECT book_id, min(rank) AS rank FROM ({fts_hits} UNION ALL "
+            "SELECT id, 0.0 FROM books WHERE lower(title) LIKE lower(:pattern) "
+            "OR lower(author) LIKE lower(:pattern) OR lower(isbn) LIKE lower(:pattern)) GROUP BY book_id"
+        ).bindparams(match=match, pattern=f"%{search}%")
+    else:
+        hits = text(fts_hits).bindparams(match=match)
+    hits = hits.columns(book_id=Integer, rank=Float).subquery("search_hits")
+
+    return query.join(hits, models.Book.id == hits.c.book_id).order_by(hits.c.rank, models.Book.id)
+
+
+def _postgres_search(query: Query, search: str, tokens) -> Query:
+    tsquery = " & ".join(f"{token}:*" for token in tokens)
+    pattern = f"%{search}%"
+    matches = text(
+        f"({_PG_TSVECTOR} @@ to_tsquery('simple', :tsquery) "
+        "OR title ILIKE :pattern OR author ILIKE :pattern OR isbn ILIKE :pattern)"
+    ).bindparams(tsquery=tsquery, pattern=pattern)
+    rank = text(
+        f"ts_rank({_PG_TSVECTOR}, to_tsquery('simple', :tsquery)) + similarity(title, :search) DESC"
+    ).bindparams(tsquery=tsquery, search=search)
+
+    return query.filter(matches).order_by(rank, models.Book.id)
+
+
+def apply_book_search(query: Query, search: str) -> Query:
+    """Filter a `models.Book` query by `search` and order it by relevance."""
+    tokens = _tokens(search)
+    if not tokens:
+        return query
+
+    dialect = query.session.get_bind().dialect.name
+    if dialect == "sqlite":
+        return _sqlite_search(query, search, tokens)
+    if dialect == "postgresql":
+        return _postgres_search(query, search, tokens)
+
+    # Other databases: unindexed substring match, as before
+    return query.filter(
+        (models.Book.title.ilike(f"%{search}%")) |
+        (models.Book.author.ilike(f"%{search}%")) |
+        (models.Book.isbn.ilike(f"%{search}%"))
+    )
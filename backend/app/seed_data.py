@@ -6,16 +6,19 @@ if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
 from app.database import SessionLocal, engine
-from app.models import Base, Book, Member, User, BookStatus, MembershipType, MemberStatus, Transaction, TransactionType
+from app.models import Book, Member, User, BookStatus, MembershipType, MemberStatus, Transaction, TransactionType
 from app.auth import get_password_hash
+from app.schema import upgrade
+from app.open_loans import refresh_open_loans
+from app.counters import reconcile
 from datetime import datetime, timedelta
 import random
 
 def seed_database():
     """Seed the database with sample data for development and testing."""
 
-    # Create tables
-    Base.metadata.create_all(bind=engine)
+    # Bring the schema up to date
+    upgrade(engine)
 
     db = SessionLocal()
 
@@ -100,7 +103,8 @@ def seed_database():
                 isbn=book_data["isbn"],
                 category=book_data["category"],
                 status=status,
-                copies=book_data["copies"]
+                copies=book_data["copies"],
+                available_copies=0 if status == BookStatus.BORROWED else book_data["copies"]
             )
             books.append(book)
             db.add(book)
@@ -177,6 +181,8 @@ def seed_database():
                     db.add(return_transaction)
 
         db.commit()
+        refresh_open_loans(db)
+        reconcile(db)
         print("✅ Database seeded successfully!")
         print(f"📚 Created {len(books)} books across {len(set(b['category'] for b in books_data))} categories")
         print(f"👥 Created {len(members)} members with various membership types")
@@ -0,0 +1,177 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+from app import counters, models
+from app.config import settings
+
+# Aggregated counters for the dashboard.
+#
+# Catalog and member totals come from the `counters` table (app.counters),
+# so reading them costs the same however large the tables grow; only the
+# time-dependent loan counts are queried. The combined result is cached in
+# process for STATS_CACHE_TTL_SECONDS. Write handlers call
+# `invalidate_stats()` so the next read recomputes.
+#
+# The `*_deltas` helpers describe a write as changes to these counters,
+# keyed "<section>.<counter>". Handlers store them with `counters.apply`
+# and send them on the live event stream (app.events).
+
+
+class TTLCache:
+    """A single-value cache that expires after `ttl` seconds."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._value = None
+        self._expires_at = 0.0
+        self._generation = 0
+
+    def get_or_compute(self, compute):
+        with self._lock:
+            if self._value is not None and time.monotonic() < self._expires_at:
+                return self._value
+            generation = self._generation
+
+        value = compute()
+
+        with self._lock:
+            # Don't store a result that an invalidation raced with
+            if generation == self._generation and self.ttl > 0:
+                self._value = value
+                self._expires_at = time.monotonic() + self.ttl
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._value = None
+            self._expires_at = 0.0
+
+
+dashboard_cache = TTLCache(settings.STATS_CACHE_TTL_SECONDS)
+# Filled from replicas, which may lag; kept apart so that a caller reading
+# the primary after its own write never gets counts from before it
+replica_dashboard_cache = TTLCache(settings.STATS_CACHE_TTL_SECONDS)
+
+
+def invalidate_stats():
+    dashboard_cache.invalidate()
+    replica_dashboard_cache.invalidate()
+
+
+def cache_period() -> int:
+    """Index of the current STATS_CACHE_TTL_SECONDS window (at least 1s)."""
+    return int(time.time() // max(settings.STATS_CACHE_TTL_SECONDS, 1))
+
+
+BOOK_COUNTERS = ("total_books", "available", "borrowed", "reserved", "total_copies", "available_copies")
+MEMBER_COUNTERS = ("total_members", "active", "expired")
+
+
+def _section(values: dict, section: str, names: tuple) -> dict:
+    return {name: values.get(f"{section}.{name}", 0) for name in names}
+
+
+def _categories(values: dict) -> dict:
+    prefix = counters.CATEGORY_PREFIX
+    return {name[len(prefix):]: value for name, value in sorted(values.items()) if name.startswith(prefix) and value}
+
+
+def book_counts(db: Session) -> dict:
+    return _section(counters.read(db, "books."), "books", BOOK_COUNTERS)
+
+def member_counts(db: Session) -> dict:
+    return _section(counters.read(db, "members."), "members", MEMBER_COUNTERS)
+
+
+def _today(now: datetime):
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return today_start, today_start + timedelta(days=1)
+
+
+def loan_counts(db: Session, values: dict = None) -> dict:
+    """Open loans from the counters; overdue and due today from the due date index."""
+    values = counters.read(db, "loans.") if values is None else values
+    now = datetime.now(timezone.utc)
+    today_start, today_end = _today(now)
+    due_date = models.Transaction.due_date
+
+    # Both are due before the end of today: a range scan of the open-loan
+    # due date index, however long the history
+    overdue, due_today = db.query(
+        func.coalesce(func.sum(case((due_date < now, 1), else_=0)), 0),
+        func.coalesce(func.sum(case((due_date >= today_start, 1), else_=0)), 0),
+    ).filter(
+        *models.open_loan_filter(), due_date < today_end
+    ).one()
+
+    return {"active_borrows": values.get("loans.active_borrows", 0), "overdue": overdue, "due_today": due_today}
+
+
+def merge_deltas(target: dict, deltas: dict) -> dict:
+    for key, value in deltas.items():
+        target[key] = target.get(key, 0) + value
+    return target
+
+
+def book_deltas(status, copies: int, available: int, category: str = None, sign: int = 1) -> dict:
+    """Counter changes for adding (sign=1) or removing (sign=-1) a book."""
+    deltas = {
+        "books.total_books": sign,
+        f"books.{models.BookStatus(status).value}": sign,
+        "books.total_copies": sign * (copies or 0),
+        "books.available_copies": sign * (available or 0),
+    }
+    if category is not None:
+        deltas[counters.category_counter(category)] = sign
+    return deltas
+
+
+def book_change_deltas(before: tuple, after: tuple) -> dict:
+    """Counter changes for a book going from `before` to `after`, each a
+    (status, copies, available_copies) or (..., category) tuple."""
+    return merge_deltas(book_deltas(*before, sign=-1), book_deltas(*after))
+
+
+def member_deltas(status, sign: int = 1) -> dict:
+    deltas = {"members.total_members": sign}
+    status = models.MemberStatus(status)
+    if status in (models.MemberStatus.ACTIVE, models.MemberStatus.EXPIRED):
+        deltas[f"members.{status.value}"] = sign
+    return deltas
+
+
+def loan_deltas(due_dates, sign: int = 1) -> dict:
+    """Counter changes for opening (sign=1) or closing (sign=-1) loans."""
+    now = datetime.now(timezone.utc)
+    today_start, today_end = _today(now)
+    deltas = {"loans.active_borrows": 0, "loans.overdue": 0, "loans.due_today": 0}
+    for due_date in due_dates:
+        deltas["loans.active_borrows"] += sign
+        if due_date is None:
+            continue
+        if due_date.tzinfo is None:
+            due_date = due_date.replace(tzinfo=timezone.utc)
+        if due_date < now:
+            deltas["loans.overdue"] += sign
+        if today_start <= due_date < today_end:
+            deltas["loans.due_today"] += sign
+    return deltas
+
+
+def dashboard_stats(db: Session) -> dict:
+    def compute():
+        values = counters.read(db)
+        return {
+            "books": _section(values, "books", BOOK_COUNTERS),
+            "members": _section(values, "members", MEMBER_COUNTERS),
+            "loans": loan_counts(db, values),
+            "categories": _categories(values),
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+        }
+
+    cache = replica_dashboard_cache if db.info.get("replica") else dashboard_cache
+    return cache.get_or_compute(compute)
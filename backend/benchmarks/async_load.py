@@ -0,0 +1,99 @@
+"""Compare API throughput with DB_ASYNC off and on.
+
+Starts a uvicorn server in each mode against the same seeded SQLite
+database, replays a mix of read requests at a fixed concurrency and
+reports requests per second. Requires httpx (`pip install httpx`).
+
+Run from the backend directory:
+
+    python -m benchmarks.async_load --requests 5000 --concurrency 200
+"""
+from pathlib import Path
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+import httpx
+
+PATHS = [
+    "/api/books/?limit=20",
+    "/api/books/1",
+    "/api/members/?limit=20",
+    "/api/transactions/?limit=20",
+    "/api/stats/dashboard",
+]
+
+
+def seed(env: dict):
+    subprocess.run([sys.executable, "-m", "app.seed_data"], cwd=ROOT_DIR, env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+
+
+def start_server(env: dict, port: int, workers: int = 1) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning",
+         "--workers", str(workers)],
+        cwd=ROOT_DIR, env=env,
+    )
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/api/health", timeout=0.5)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("server did not start")
+
+
+async def run_load(base_url: str, total: int, concurrency: int) -> tuple:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        response = await client.post("/api/auth/login", data={"username": "admin", "password": "admin123"})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        counter = iter(range(total))
+        errors = 0
+
+        async def worker():
+            nonlocal errors
+            for i in counter:
+                response = await client.get(PATHS[i % len(PATHS)], headers=headers)
+                if response.status_code != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return total / elapsed, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, "DATABASE_URL": f"sqlite:///{tmp}/load.db", "STATS_CACHE_TTL_SECONDS": "0"}
+        seed(env)
+
+        for mode in ("false", "true"):
+            process = start_server({**env, "DB_ASYNC": mode}, args.port)
+            try:
+                rps, errors = asyncio.run(run_load(f"http://127.0.0.1:{args.port}", args.requests, args.concurrency))
+            finally:
+                process.terminate()
+                process.wait()
+            label = "async" if mode == "true" else "sync"
+            print(f"{label:>6}: {rps:8.1f} req/s  ({errors} errors)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Concurrency stress check for borrow/return.
+
+Starts uvicorn with several worker processes on a fresh SQLite database,
+fires hundreds of parallel borrows and returns at a handful of books, then
+checks the inventory invariants directly in the database:
+
+- a book never has more open loans than copies;
+- available_copies equals copies minus open loans;
+- a book is borrowed if and only if no copy is on the shelf;
+- every member's books_count equals their number of open loans.
+
+Exits with status 1 if any invariant is violated. Requires httpx.
+
+Run from the backend directory:
+
+    python -m benchmarks.borrow_stress --workers 4 --requests 400
+"""
+from pathlib import Path
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+import httpx
+from sqlalchemy import create_engine, text
+from benchmarks.async_load import seed, start_server
+
+
+async def hammer(base_url: str, book_ids: list, member_ids: list, total: int) -> dict:
+    outcomes = {}
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        response = await client.post("/api/auth/login", data={"username": "admin", "password": "admin123"})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        async def one(i: int):
+            rng = random.Random(i)
+            payload = {"book_id": rng.choice(book_ids), "member_id": rng.choice(member_ids)}
+            path = "/api/transactions/borrow" if rng.random() < 0.6 else "/api/transactions/return"
+            response = await client.post(path, json=payload, headers=headers)
+            key = f"{path.rsplit('/', 1)[-1]} {response.status_code}"
+            outcomes[key] = outcomes.get(key, 0) + 1
+
+        await asyncio.gather(*(one(i) for i in range(total)))
+    return outcomes
+
+
+def check_invariants(url: str) -> list:
+    engine = create_engine(url)
+    violations = []
+    with engine.connect() as conn:
+        for book_id, copies, open_loans in conn.execute(text(
+            "SELECT b.id, b.copies, COUNT(t.id) FROM books b JOIN transactions t "
+            "ON t.book_id = b.id AND t.transaction_type = 'BORROW' AND t.return_date IS NULL "
+            "GROUP BY b.id, b.copies HAVING COUNT(t.id) > b.copies"
+        )):
+            violations.append(f"book {book_id} has {open_loans} open loans for {copies} copies")
+        for book_id, status, copies, available, open_loans in conn.execute(text(
+            "SELECT b.id, b.status, b.copies, b.available_copies, COUNT(t.id) FROM books b "
+            "LEFT JOIN transactions t "
+            "ON t.book_id = b.id AND t.transaction_type = 'BORROW' AND t.return_date IS NULL "
+            "WHERE b.status != 'RESERVED' GROUP BY b.id, b.status, b.copies, b.available_copies"
+        )):
+            if available != copies - open_loans:
+                violations.append(f"book {book_id} has {available} of {copies} copies with {open_loans} open loans")
+            if (status == "BORROWED") != (available == 0):
+                violations.append(f"book {book_id} is {status} with {available} copies on the shelf")
+        for member_id, books_count, open_loans in conn.execute(text(
+            "SELECT m.id, m.books_count, COUNT(t.id) FROM members m LEFT JOIN transactions t "
+            "ON t.member_id = m.id AND t.transaction_type = 'BORROW' AND t.return_date IS NULL "
+            "GROUP BY m.id, m.books_count"
+        )):
+            if books_count != open_loans:
+                violations.append(f"member {member_id} has books_count {books_count} but {open_loans} open loans")
+    engine.dispose()
+    return violations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--books", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{tmp}/stress.db"
+        env = {**os.environ, "DATABASE_URL": url}
+        seed(env)
+
+        # Start from a consistent state: no open loans, counters at zero
+        engine = create_engine(url)
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM transactions"))
+            conn.execute(text(
+                "UPDATE books SET status = 'AVAILABLE', available_copies = copies WHERE status != 'RESERVED'"
+            ))
+            conn.execute(text("UPDATE members SET books_count = 0, status = 'ACTIVE'"))
+            book_ids = [r[0] for r in conn.execute(
+                text("SELECT id FROM books WHERE status = 'AVAILABLE' ORDER BY id LIMIT :n"), {"n": args.books}
+            )]
+            member_ids = [r[0] for r in conn.execute(text("SELECT id FROM members"))]
+        engine.dispose()
+
+        process = start_server(env, args.port, workers=args.workers)
+        try:
+            outcomes = asyncio.run(hammer(f"http://127.0.0.1:{args.port}", book_ids, member_ids, args.requests))
+        finally:
+            process.terminate()
+            process.wait()
+
+        for key in sorted(outcomes):
+            print(f"{key:>12}: {outcomes[key]}")
+        violations = check_invariants(url)
+        for violation in violations:
+            print(f"VIOLATION: {violation}")
+        if violations:
+            sys.exit(1)
+        print("All invariants hold.")
+
+
+if __name__ == "__main__":
+    main()
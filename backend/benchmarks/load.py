@@ -0,0 +1,223 @@
+"""Replay a realistic request mix and report latency percentiles per endpoint.
+
+Sends a weighted mix of catalog search, list pages, loan listings, stats,
+borrows and returns at a fixed concurrency, then prints p50/p95/p99 latency,
+throughput and status codes for each endpoint. Borrows and returns act on
+real loans: returns close loans that were open at the start or borrowed
+during the run, so the write paths see contention as they would at a desk.
+
+Targets `--url` if given. Otherwise it starts uvicorn (`--workers`) on
+`--database-url`, or on a temporary database filled by `app.datagen` at
+`--books`/`--members`/`--transactions`. Generate a large dataset once and
+reuse it (the run writes loans into it):
+
+    ./perpus generate --books 500000 --members 100000 --transactions 10000000
+    python -m benchmarks.load --database-url sqlite:///./perpus.db --requests 20000 --concurrency 50
+
+Requires httpx. Run from the backend directory:
+
+    python -m benchmarks.load --requests 5000 --concurrency 50
+"""
+from pathlib import Path
+import argparse
+import asyncio
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+import httpx
+from app.datagen import SEARCH_TERMS
+from benchmarks.async_load import start_server
+
+# endpoint -> weight in the mix
+MIX = {
+    "search books": 20,
+    "list books": 10,
+    "get book": 10,
+    "list members": 5,
+    "member history": 10,
+    "active borrows": 5,
+    "overdue": 5,
+    "dashboard stats": 10,
+    "books stats": 5,
+    "borrow": 10,
+    "return": 10,
+}
+
+
+class Dataset:
+    """Id ranges to draw from and the loans the run can return."""
+
+    def __init__(self, books: int, members: int, loans: list):
+        self.books = books
+        self.members = members
+        self.loans = loans
+
+
+def _request(rng: random.Random, endpoint: str, data: Dataset):
+    """(method, url, json body) for one call to `endpoint`."""
+    book = rng.randint(1, data.books)
+    member = rng.randint(1, data.members)
+    if endpoint == "search books":
+        return "GET", f"/api/books/?search={rng.choice(SEARCH_TERMS)}&limit=20", None
+    if endpoint == "list books":
+        return "GET", "/api/books/?cursor=&limit=50&category=Fiction", None
+    if endpoint == "get book":
+        return "GET", f"/api/books/{book}", None
+    if endpoint == "list members":
+        return "GET", "/api/members/?cursor=&limit=20", None
+    if endpoint == "member history":
+        return "GET", f"/api/transactions/?member_id={member}&cursor=&limit=20", None
+    if endpoint == "active borrows":
+        return "GET", f"/api/transactions/active-borrows?cursor=&limit=50&member_id={member}", None
+    if endpoint == "overdue":
+        return "GET", "/api/transactions/overdue?cursor=&limit=50", None
+    if endpoint == "dashboard stats":
+        return "GET", "/api/stats/dashboard", None
+    if endpoint == "books stats":
+        return "GET", "/api/books/stats/summary", None
+    if endpoint == "borrow":
+        return "POST", "/api/transactions/borrow", {"book_id": book, "member_id": member}
+    if endpoint == "return":
+        if not data.loans:
+            return None
+        book, member = data.loans.pop(rng.randrange(len(data.loans)))
+        return "POST", "/api/transactions/return", {"book_id": book, "member_id": member}
+    raise ValueError(endpoint)
+
+
+async def _open_loans(client: httpx.AsyncClient, headers: dict, limit: int) -> list:
+    loans, cursor = [], ""
+    while len(loans) < limit:
+        page = (await client.get(f"/api/transactions/active-borrows?cursor={cursor}&limit=500", headers=headers)).json()
+        loans += [(loan["book_id"], loan["member_id"]) for loan in page["items"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    return loans[:limit]
+
+
+async def run_load(base_url: str, total: int, concurrency: int, seed: int):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        response = await client.post("/api/auth/login", data={"username": "admin", "password": "admin123"})
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        stats = (await client.get("/api/stats/dashboard", headers=headers)).json()
+        data = Dataset(
+            stats["books"]["total_books"], stats["members"]["total_members"],
+            await _open_loans(client, headers, limit=max(total // 5, 100)),
+        )
+        print(f"Dataset: {data.books:,} books, {data.members:,} members, {len(data.loans):,} open loans loaded")
+
+        endpoints, weights = list(MIX), list(MIX.values())
+        latencies = defaultdict(list)
+        statuses = defaultdict(Counter)
+        counter = iter(range(total))
+
+        async def worker(index: int):
+            rng = random.Random(seed * 1000 + index)
+            for _ in counter:
+                endpoint = rng.choices(endpoints, weights)[0]
+                request = _request(rng, endpoint, data)
+                if request is None:  # nothing left to return
+                    endpoint = "borrow"
+                    request = _request(rng, endpoint, data)
+                method, url, body = request
+                started = time.perf_counter()
+                response = await client.request(method, url, json=body, headers=headers)
+                latencies[endpoint].append(time.perf_counter() - started)
+                statuses[endpoint][response.status_code] += 1
+                if endpoint == "borrow" and response.status_code == 200:
+                    data.loans.append((body["book_id"], body["member_id"]))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return latencies, statuses, elapsed
+
+
+def percentile(samples: list, p: float) -> float:
+    """Nearest-rank percentile of sorted `samples`."""
+    return samples[max(math.ceil(p / 100 * len(samples)) - 1, 0)]
+
+
+def report(latencies: dict, statuses: dict, elapsed: float):
+    header = f"{'endpoint':<16} {'count':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}  status"
+    print(header)
+    print("-" * len(header))
+    everything = []
+    for endpoint in MIX:
+        samples = sorted(latencies.get(endpoint, []))
+        if not samples:
+            continue
+        everything += samples
+        codes = " ".join(f"{code}:{count}" for code, count in sorted(statuses[endpoint].items()))
+        print(
+            f"{endpoint:<16} {len(samples):>7} {len(samples) / elapsed:>8.1f} "
+            f"{percentile(samples, 50) * 1000:>8.1f} {percentile(samples, 95) * 1000:>8.1f} "
+            f"{percentile(samples, 99) * 1000:>8.1f} {samples[-1] * 1000:>8.1f}  {codes}"
+        )
+    everything.sort()
+    print("-" * len(header))
+    print(
+        f"{'all':<16} {len(everything):>7} {len(everything) / elapsed:>8.1f} "
+        f"{percentile(everything, 50) * 1000:>8.1f} {percentile(everything, 95) * 1000:>8.1f} "
+        f"{percentile(everything, 99) * 1000:>8.1f} {everything[-1] * 1000:>8.1f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="Running server to test; skips starting one")
+    parser.add_argument("--database-url", help="Database for the started server (default: a generated one)")
+    parser.add_argument("--books", type=int, default=20_000)
+    parser.add_argument("--members", type=int, default=5_000)
+    parser.add_argument("--transactions", type=int, default=200_000)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.url:
+        latencies, statuses, elapsed = asyncio.run(run_load(args.url, args.requests, args.concurrency, args.seed))
+        report(latencies, statuses, elapsed)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, "OPEN_LOANS_REFRESH_SECONDS": "0"}
+        if args.database_url:
+            env["DATABASE_URL"] = args.database_url
+        else:
+            env["DATABASE_URL"] = f"sqlite:///{tmp}/load.db"
+            print(f"Generating {args.books:,} books, {args.members:,} members, {args.transactions:,} transactions...")
+            subprocess.run(
+                [sys.executable, "-m", "app.cli", "generate", "--books", str(args.books), "--members", str(args.members),
+                 "--transactions", str(args.transactions), "--seed", str(args.seed)],
+                cwd=ROOT_DIR, env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+        process = start_server(env, args.port, workers=args.workers)
+        try:
+            latencies, statuses, elapsed = asyncio.run(
+                run_load(f"http://127.0.0.1:{args.port}", args.requests, args.concurrency, args.seed)
+            )
+        finally:
+            process.terminate()
+            process.wait()
+    report(latencies, statuses, elapsed)
+
+
+if __name__ == "__main__":
+    main()
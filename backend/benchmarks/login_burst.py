@@ -0,0 +1,95 @@
+"""Measure catalog read latency while a burst of staff log in at once.
+
+Starts uvicorn on a seeded temporary database, then sends `--logins`
+concurrent logins (spread over `--users` accounts, so the per-username
+throttle doesn't refuse them) while another client keeps reading the book
+list. Prints the read latency percentiles with and without the burst and
+how the logins were answered (200, or 503 when the hash pool queue is full).
+
+Requires httpx. Run from the backend directory:
+
+    python -m benchmarks.login_burst --logins 200 --users 50
+"""
+from pathlib import Path
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+import httpx
+from benchmarks.async_load import seed, start_server
+from benchmarks.load import percentile
+
+
+async def _read_latencies(client: httpx.AsyncClient, headers: dict, stop: asyncio.Event) -> list:
+    samples = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        (await client.get("/api/books/?limit=20", headers=headers)).raise_for_status()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+async def run(base_url: str, logins: int, users: int):
+    limits = httpx.Limits(max_connections=logins + 10)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        token = (await client.post("/api/auth/login", data={"username": "admin", "password": "admin123"})).json()
+        headers = {"Authorization": f"Bearer {token['access_token']}"}
+        for i in range(users):
+            await client.post("/api/auth/register", json={
+                "username": f"staff{i}", "email": f"staff{i}@example.com", "password": "staff-pass",
+            })
+
+        async def measure(burst: bool):
+            stop = asyncio.Event()
+            reader = asyncio.create_task(_read_latencies(client, headers, stop))
+            statuses = Counter()
+            if burst:
+                responses = await asyncio.gather(*(
+                    client.post("/api/auth/login", data={"username": f"staff{i % users}", "password": "staff-pass"})
+                    for i in range(logins)
+                ))
+                statuses.update(response.status_code for response in responses)
+            else:
+                await asyncio.sleep(2)
+            stop.set()
+            return sorted(await reader), statuses
+
+        for label, burst in (("idle", False), ("login burst", True)):
+            samples, statuses = await measure(burst)
+            codes = " ".join(f"{code}:{count}" for code, count in sorted(statuses.items()))
+            print(
+                f"{label:<12} reads={len(samples):>5} p50={percentile(samples, 50) * 1000:7.1f}ms "
+                f"p95={percentile(samples, 95) * 1000:7.1f}ms p99={percentile(samples, 99) * 1000:7.1f}ms"
+                + (f"  logins {codes}" if codes else "")
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, "DATABASE_URL": f"sqlite:///{tmp}/login.db", "OPEN_LOANS_REFRESH_SECONDS": "0"}
+        seed(env)
+        process = start_server(env, args.port, workers=args.workers)
+        try:
+            asyncio.run(run(f"http://127.0.0.1:{args.port}", args.logins, args.users))
+        finally:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
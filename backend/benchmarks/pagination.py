@@ -0,0 +1,108 @@
+"""Compare OFFSET and keyset pagination cost on a large transaction history.
+
+Run from the backend directory:
+
+    python -m benchmarks.pagination --rows 1000000 --page-size 100
+
+The keyset time for page 10,000 should match page 1, while OFFSET grows
+with the page number.
+"""
+from pathlib import Path
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from app import models
+from app.database import Base, create_db_engine
+from app.pagination import encode_cursor, paginate
+
+
+def build_database(url: str, rows: int):
+    engine = create_db_engine(url)
+    Base.metadata.create_all(bind=engine)
+    start = datetime(2020, 1, 1)
+
+    with engine.begin() as conn:
+        conn.execute(insert(models.Book), [
+            {"id": 1, "title": "Bench", "author": "Bench", "isbn": "bench", "category": "Bench"}
+        ])
+        conn.execute(insert(models.Member), [
+            {"id": 1, "name": "Bench", "email": "bench@example.com", "phone": "0"}
+        ])
+        batch = []
+        for i in range(1, rows + 1):
+            batch.append({
+                "id": i,
+                "book_id": 1,
+                "member_id": 1,
+                "transaction_type": models.TransactionType.BORROW,
+                "transaction_date": start + timedelta(seconds=i),
+            })
+            if len(batch) == 50_000:
+                conn.execute(insert(models.Transaction), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(models.Transaction), batch)
+    return engine
+
+
+def timed(fn, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    pages = [1, 100, 1_000, args.rows // args.page_size]
+    columns = [models.Transaction.transaction_date, models.Transaction.id]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"Building {args.rows:,} transactions...")
+        engine = build_database(f"sqlite:///{tmp}/bench.db", args.rows)
+
+        with Session(engine) as db:
+            base = db.query(models.Transaction)
+            print(f"{'page':>8} {'offset ms':>12} {'keyset ms':>12}")
+            for page in pages:
+                skip = (page - 1) * args.page_size
+                offset_ms = timed(
+                    lambda: base.order_by(models.Transaction.transaction_date.desc())
+                    .offset(skip).limit(args.page_size).all(),
+                    args.repeat,
+                )
+
+                # The cursor for a page is the key of the last row of the previous one
+                cursor = ""
+                if skip:
+                    last = base.order_by(*[c.desc() for c in columns]).offset(skip - 1).first()
+                    cursor = encode_cursor([last.transaction_date, last.id])
+                keyset_ms = timed(
+                    lambda: paginate(base, columns, cursor, args.page_size, descending=True),
+                    args.repeat,
+                )
+                db.expunge_all()
+                print(f"{page:>8,} {offset_ms:>12.2f} {keyset_ms:>12.2f}")
+
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Follow next_cursor through every keyset listing over rows written by the API.
+
+Seeds a temporary database, borrows a stack of books in one batch (so many
+transactions share the same second) and returns a few, then pages through
+each cursor listing with a small page size. Every row must come back
+exactly once and the last page must end the walk. Exits with
+status 1 otherwise. Run from the backend directory:
+
+    python -m benchmarks.pagination_check
+"""
+from pathlib import Path
+import os
+import sys
+import tempfile
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp.name}/pagination.db"
+
+from fastapi.testclient import TestClient
+
+PAGE_SIZE = 3
+
+# Listing -> id field of its items
+LISTINGS = {
+    "/api/transactions/": "id",
+    "/api/books/": "id",
+    "/api/members/": "id",
+    "/api/transactions/active-borrows": "transaction_id",
+    "/api/transactions/overdue": "transaction_id",
+}
+
+failures = []
+
+
+def check(ok: bool, message: str):
+    print(f"{'ok  ' if ok else 'FAIL'} {message}")
+    if not ok:
+        failures.append(message)
+
+
+def walk(client: TestClient, headers: dict, path: str, key: str) -> list:
+    """Ids in page order, stopping once a cursor repeats or too many pages were read."""
+    ids, cursors, cursor = [], set(), ""
+    while cursor is not None and cursor not in cursors and len(cursors) < 1000:
+        cursors.add(cursor)
+        page = client.get(path, headers=headers, params={"cursor": cursor, "limit": PAGE_SIZE}).json()
+        ids.extend(item[key] for item in page["items"])
+        cursor = page["next_cursor"]
+    return ids
+
+
+def main():
+    from app.seed_data import seed_database
+    seed_database()
+
+    from app.main import app
+    client = TestClient(app)
+    token = client.post("/api/auth/login", data={"username": "admin", "password": "admin123"}).json()
+    headers = {"Authorization": f"Bearer {token['access_token']}"}
+
+    books = client.get("/api/books/", headers=headers, params={"limit": 1000}).json()
+    on_shelf = [book["id"] for book in books if book["available_copies"] > 0][:11]
+    member = next(m["id"] for m in client.get("/api/members/", headers=headers).json() if m["status"] == "active")
+    response = client.post("/api/transactions/borrow/batch", headers=headers,
+                           json={"member_id": member, "book_ids": on_shelf, "atomic": False})
+    borrowed = response.json()["succeeded"] if response.status_code == 200 else 0
+    check(borrowed > PAGE_SIZE, f"borrowed {borrowed} books in one batch")
+    client.post("/api/transactions/return/batch", headers=headers, json={"member_id": member, "book_ids": on_shelf[:4]})
+
+    for path, key in LISTINGS.items():
+        expected = {item[key] for item in client.get(path, headers=headers, params={"limit": 10000}).json()}
+        ids = walk(client, headers, path, key)
+        check(len(ids) == len(set(ids)), f"{path}: no row repeats ({len(ids)} read, {len(set(ids))} distinct)")
+        check(set(ids) == expected, f"{path}: all {len(expected)} rows reached")
+
+    if failures:
+        print(f"{len(failures)} check(s) failed")
+        sys.exit(1)
+    print("Keyset pagination visits every row once.")
+
+
+if __name__ == "__main__":
+    main()
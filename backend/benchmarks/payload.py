@@ -0,0 +1,128 @@
+"""Encoding time and wire size of large API payloads.
+
+Builds a temporary SQLite database with `--books` books and `--loans` open
+loans, then for a page of the book list and of active-borrows reports:
+
+- render time of the response body with the stdlib encoder and with orjson
+- body size uncompressed and gzipped (as sent by the app's GZip middleware)
+- estimated transfer time of each on a `--link-kbps` link
+
+Run from the backend directory:
+
+    python -m benchmarks.payload --books 20000 --loans 20000 --page-size 5000
+"""
+from pathlib import Path
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp.name}/payload.db"
+os.environ["OPEN_LOANS_REFRESH_SECONDS"] = "0"
+
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+from app import models, schema
+from app.auth import create_tokens
+from app.database import SessionLocal, engine
+from app.open_loans import refresh_open_loans
+from app.responses import ORJSONResponse, StdJSONResponse, orjson
+
+
+def build_database(books: int, loans: int):
+    schema.upgrade(engine)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [{"username": "bench", "email": "bench@example.com", "hashed_password": "-"}])
+        conn.execute(insert(models.Book), [
+            {
+                "id": i,
+                "title": f"Title {i}",
+                "author": f"Author {i % 997}",
+                "isbn": f"isbn-{i}",
+                "category": f"Category {i % 13}",
+                "copies": 1 + i % 3,
+            }
+            for i in range(1, books + 1)
+        ])
+        conn.execute(insert(models.Member), [
+            {"id": i, "name": f"Member {i}", "email": f"member{i}@example.com", "phone": "0"}
+            for i in range(1, 1001)
+        ])
+        conn.execute(insert(models.Transaction), [
+            {
+                "book_id": i % books + 1,
+                "member_id": i % 1000 + 1,
+                "transaction_type": models.TransactionType.BORROW,
+                "due_date": now + timedelta(days=i % 30 - 15),
+            }
+            for i in range(loans)
+        ])
+    db = SessionLocal()
+    try:
+        refresh_open_loans(db)
+    finally:
+        db.close()
+
+
+def median_ms(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--books", type=int, default=20_000)
+    parser.add_argument("--loans", type=int, default=20_000)
+    parser.add_argument("--page-size", type=int, default=5_000)
+    parser.add_argument("--link-kbps", type=int, default=1_000, help="Link speed for the transfer estimate")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"Building {args.books:,} books and {args.loans:,} open loans...")
+    build_database(args.books, args.loans)
+
+    from app.main import app
+    client = TestClient(app)
+    bench = models.User(id=1, username="bench", email="bench@example.com")
+    headers = {"Authorization": f"Bearer {create_tokens(bench)['access_token']}"}
+
+    def transfer_ms(size: int) -> float:
+        return size * 8 / args.link_kbps
+
+    for path in (f"/api/books/?limit={args.page_size}", f"/api/transactions/active-borrows?limit={args.page_size}"):
+        plain = client.get(path, headers={**headers, "Accept-Encoding": "identity"})
+        gzipped = client.get(path, headers={**headers, "Accept-Encoding": "gzip"})
+        content = plain.json()
+        raw_size = len(plain.content)
+        gzip_size = int(gzipped.headers["content-length"])
+
+        print(f"\nGET {path} ({len(content):,} rows)")
+        print(f"  render json   {median_ms(lambda: StdJSONResponse(content), args.repeat):8.1f} ms")
+        if orjson is not None:
+            print(f"  render orjson {median_ms(lambda: ORJSONResponse(content), args.repeat):8.1f} ms")
+        else:
+            print("  render orjson      n/a (orjson not installed)")
+        print(f"  body          {raw_size:>10,} bytes  ~{transfer_ms(raw_size):8.0f} ms at {args.link_kbps:,} kbps")
+        print(
+            f"  gzip          {gzip_size:>10,} bytes  ~{transfer_ms(gzip_size):8.0f} ms"
+            f"  ({raw_size / gzip_size:.1f}x smaller, "
+            f"request {median_ms(lambda: client.get(path, headers={**headers, 'Accept-Encoding': 'gzip'}), 3):.0f} ms"
+            f" vs {median_ms(lambda: client.get(path, headers={**headers, 'Accept-Encoding': 'identity'}), 3):.0f} ms uncompressed)"
+        )
+
+
+if __name__ == "__main__":
+    main()
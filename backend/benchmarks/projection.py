@@ -0,0 +1,93 @@
+"""Rows per second of the book list with and without `fields=` projection.
+
+Builds a catalog of `--rows` books in a temporary SQLite database and times
+`GET /api/books/` pages through the full stack (routing, auth, query,
+serialization), once returning full `schemas.Book` objects and once with
+a column projection.
+
+Run from the backend directory:
+
+    python -m benchmarks.projection --rows 50000 --page-size 5000
+"""
+from pathlib import Path
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp.name}/projection.db"
+os.environ["OPEN_LOANS_REFRESH_SECONDS"] = "0"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+from app import models, schema
+from app.auth import create_tokens
+from app.database import engine
+
+DEFAULT_FIELDS = "id,title,author,status"
+
+
+def build_catalog(rows: int):
+    schema.upgrade(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [{"username": "bench", "email": "bench@example.com", "hashed_password": "-"}])
+        conn.execute(insert(models.Book), [
+            {
+                "title": f"Title {i}",
+                "author": f"Author {i % 997}",
+                "isbn": f"isbn-{i}",
+                "category": f"Category {i % 13}",
+                "copies": 1 + i % 3,
+            }
+            for i in range(rows)
+        ])
+
+
+def rows_per_second(client, headers, url: str, rows: int, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        response = client.get(url, headers=headers)
+        samples.append(time.perf_counter() - t0)
+        assert response.status_code == 200, response.text
+    return rows / statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--page-size", type=int, default=5_000)
+    parser.add_argument("--fields", default=DEFAULT_FIELDS)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"Building {args.rows:,} books...")
+    build_catalog(args.rows)
+
+    from app.main import app
+    client = TestClient(app)
+    bench = models.User(id=1, username="bench", email="bench@example.com")
+    headers = {"Authorization": f"Bearer {create_tokens(bench)['access_token']}"}
+    # Warm the auth cache and the page cache
+    client.get("/api/books/?limit=1", headers=headers)
+
+    skip = args.rows // 2
+    base = f"/api/books/?skip={skip}&limit={args.page_size}"
+    full = rows_per_second(client, headers, base, args.page_size, args.repeat)
+    projected = rows_per_second(client, headers, f"{base}&fields={args.fields}", args.page_size, args.repeat)
+
+    print(f"{'response':<32} {'rows/s':>12}")
+    print(f"{'full schemas.Book':<32} {full:>12,.0f}")
+    print(f"{'fields=' + args.fields:<32} {projected:>12,.0f}")
+    print(f"speedup: {projected / full:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""Fail if an endpoint runs more SQL statements than its budget.
+
+Calls every endpoint of the auth, books, members and transactions routers
+against a seeded in-memory SQLite database and counts the statements each
+call executes. List endpoints are called with pages much larger than the
+seed so that a lazy load per row (N+1) shows up as a budget overrun rather
+than a constant. Exits with status 1 if a call goes over its budget, fails,
+or a route in those routers has no case here. tests/test_query_counts.py
+runs the same cases under pytest, in CI.
+
+After an intentional change in the number of queries, update BUDGETS with
+the counts this prints.
+
+Run from the backend directory:
+
+    python -m benchmarks.query_counts
+"""
+from pathlib import Path
+import io
+import os
+import sys
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+# Shared-cache in-memory database, so the threadpool's connections all see it
+os.environ["DATABASE_URL"] = "sqlite:///file:query_counts?mode=memory&cache=shared&uri=true"
+os.environ["STATS_CACHE_TTL_SECONDS"] = "0"
+os.environ["OPEN_LOANS_REFRESH_SECONDS"] = "0"
+os.environ["QUERY_BUDGET"] = "0"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, select
+from app import models
+from app.database import engine
+from app.routers import auth, books, members, transactions
+
+EXTRA_BOOKS = 60  # borrowed before measuring, so listings return many rows
+
+# (method, path, request kwargs) -> maximum statements. Paths are filled in
+# from the ids created along the way; cases run in this order.
+CASES = [
+    ("POST", "/api/auth/register", {"json": {"username": "qc", "email": "qc@example.com", "password": "qc-pass"}}),
+    ("POST", "/api/auth/login", {"data": {"username": "qc", "password": "qc-pass"}}),
+    ("GET", "/api/auth/me", {}),
+    ("POST", "/api/auth/refresh", {"json": {"refresh_token": "{refresh_token}"}}),
+    ("GET", "/api/auth/revocations/stats", {}),
+    ("GET", "/api/books/?limit=500", {}),
+    ("GET", "/api/books/?cursor=&limit=500", {}),
+    ("GET", "/api/books/?search=title&limit=500", {}),
+    ("GET", "/api/books/?fields=title,author&limit=500", {}),
+    ("POST", "/api/books/", {"json": {"title": "Query count", "author": "QC", "isbn": "qc-1", "category": "QC", "copies": 2}}),
+    ("GET", "/api/books/{new_book}", {}),
+    ("PUT", "/api/books/{new_book}", {"json": {"title": "Query count 2", "copies": 3}}),
+    ("POST", "/api/books/bulk", {"files": {"file": ("books.csv", "title,author,isbn,category\nA,B,qc-2,C\nA,B,qc-3,C\n")}}),
+    ("GET", "/api/books/stats/summary", {}),
+    ("GET", "/api/members/?limit=500", {}),
+    ("GET", "/api/members/?cursor=&limit=500", {}),
+    ("GET", "/api/members/?fields=name,status&limit=500", {}),
+    ("POST", "/api/members/", {"json": {"name": "Query count", "email": "qc-member@example.com", "phone": "1"}}),
+    ("GET", "/api/members/{new_member}", {}),
+    ("PUT", "/api/members/{new_member}", {"json": {"name": "Query count 2"}}),
+    ("GET", "/api/members/stats/summary", {}),
+    ("POST", "/api/transactions/borrow", {"json": {"book_id": "{new_book}", "member_id": "{new_member}"}}),
+    ("POST", "/api/transactions/return", {"json": {"book_id": "{new_book}", "member_id": "{new_member}"}}),
+    ("POST", "/api/transactions/borrow/batch", {"json": {"member_id": "{new_member}", "book_ids": "{batch_books}"}}),
+    ("POST", "/api/transactions/return/batch", {"json": {"member_id": "{new_member}", "book_ids": "{batch_books}"}}),
+    ("GET", "/api/transactions/?limit=500", {}),
+    ("GET", "/api/transactions/?cursor=&limit=500", {}),
+    ("GET", "/api/transactions/?member_id={loan_member}&fields=book_id,due_date", {}),
+    ("GET", "/api/transactions/active-borrows?limit=500", {}),
+    ("GET", "/api/transactions/active-borrows?cursor=&limit=500&overdue=true", {}),
+    ("GET", "/api/transactions/overdue?limit=500", {}),
+    ("DELETE", "/api/members/{new_member}", {}),
+    ("DELETE", "/api/books/{new_book}", {}),
+    ("POST", "/api/auth/logout", {"headers": "{qc_headers}"}),
+]
+
+# Statements per call; access tokens are checked without any. Writes that
+# change the catalog or loans include one upsert of the stats counters. The
+# batch endpoints use one statement per step whatever the batch size. Book
+# search on SQLite first checks whether full-text search finds anything.
+BUDGETS = {
+    "POST /api/auth/register": 4,
+    "POST /api/auth/login": 1,
+    "GET /api/auth/me": 0,
+    "POST /api/auth/refresh": 1,
+    "GET /api/auth/revocations/stats": 0,
+    "GET /api/books/?limit=500": 2,
+    "GET /api/books/?cursor=&limit=500": 2,
+    "GET /api/books/?search=title&limit=500": 3,
+    "GET /api/books/?fields=title,author&limit=500": 2,
+    "POST /api/books/": 4,
+    "GET /api/books/{new_book}": 2,
+    "PUT /api/books/{new_book}": 6,
+    "POST /api/books/bulk": 3,
+    "GET /api/books/stats/summary": 2,
+    "GET /api/members/?limit=500": 1,
+    "GET /api/members/?cursor=&limit=500": 1,
+    "GET /api/members/?fields=name,status&limit=500": 1,
+    "POST /api/members/": 4,
+    "GET /api/members/{new_member}": 1,
+    "PUT /api/members/{new_member}": 4,
+    "GET /api/members/stats/summary": 2,
+    "POST /api/transactions/borrow": 5,
+    "POST /api/transactions/return": 9,
+    "POST /api/transactions/borrow/batch": 7,
+    "POST /api/transactions/return/batch": 10,
+    "GET /api/transactions/?limit=500": 1,
+    "GET /api/transactions/?cursor=&limit=500": 1,
+    "GET /api/transactions/?member_id={loan_member}&fields=book_id,due_date": 1,
+    "GET /api/transactions/active-borrows?limit=500": 1,
+    "GET /api/transactions/active-borrows?cursor=&limit=500&overdue=true": 1,
+    "GET /api/transactions/overdue?limit=500": 1,
+    "DELETE /api/members/{new_member}": 3,
+    "DELETE /api/books/{new_book}": 3,
+    "POST /api/auth/logout": 0,
+}
+
+ROUTERS = {"/api/auth": auth.router, "/api/books": books.router, "/api/members": members.router,
+           "/api/transactions": transactions.router}
+
+
+def _fill(value, ids):
+    if isinstance(value, str):
+        if value.startswith("{") and value.endswith("}") and value[1:-1] in ids:
+            return ids[value[1:-1]]
+        return value.format(**ids) if "{" in value else value
+    if isinstance(value, dict):
+        return {k: _fill(v, ids) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return tuple(_fill(v, ids) for v in value)
+    return value
+
+
+def uncovered_routes():
+    """Routes of the measured routers that no case exercises."""
+    from starlette.routing import compile_path
+
+    covered = [(method, path.split("?")[0]) for method, path, _ in CASES]
+    missing = []
+    for prefix, router in ROUTERS.items():
+        for route in router.routes:
+            regex = compile_path(prefix + route.path)[0]
+            for method in route.methods:
+                if not any(m == method and regex.match(p.replace("{", "1").replace("}", "")) for m, p in covered):
+                    missing.append(f"{method} {prefix}{route.path}")
+    return missing
+
+
+def _setup(client, headers) -> dict:
+    """Borrowed books for the listings and for the batch cases."""
+    csv = "title,author,isbn,category\n" + "".join(f"Title {i},Author,qc-extra-{i},QC\n" for i in range(EXTRA_BOOKS))
+    client.post("/api/books/bulk", files={"file": ("extra.csv", csv)}, headers=headers)
+    with engine.connect() as conn:
+        extra = list(conn.scalars(select(models.Book.id).where(models.Book.isbn.like("qc-extra-%"))))
+    member = client.post("/api/members/", json={"name": "Borrower", "email": "qc-borrower@example.com", "phone": "1"},
+                         headers=headers).json()["id"]
+    response = client.post("/api/transactions/borrow/batch", json={"member_id": member, "book_ids": extra[5:]},
+                           headers=headers)
+    assert response.status_code == 200 and response.json()["failed"] == 0, response.text
+    return {"loan_member": member, "batch_books": extra[:5]}
+
+
+def measure() -> list:
+    """Run every case once; returns (case, statements, response) in CASES order."""
+    results = []
+    count = 0
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        nonlocal count
+        count += 1
+
+    # The in-memory database lives while a connection is open
+    with engine.connect():
+        from app.seed_data import seed_database
+        seed_database()
+        from app.main import app
+        client = TestClient(app)
+        token = client.post("/api/auth/login", data={"username": "admin", "password": "admin123"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        ids = _setup(client, headers)
+
+        event.listen(engine, "after_cursor_execute", _count)
+        try:
+            for method, path, kwargs in CASES:
+                url = _fill(path, ids)
+                kwargs = _fill(kwargs, ids)
+                if "files" in kwargs:
+                    kwargs["files"] = {k: (name, io.BytesIO(body.encode())) for k, (name, body) in kwargs["files"].items()}
+                count = 0
+                response = client.request(method, url, **{"headers": headers, **kwargs})
+                results.append((f"{method} {path}", count, response))
+
+                created = response.json() if response.headers.get("content-type", "").startswith("application/json") else {}
+                if (method, path) == ("POST", "/api/books/"):
+                    ids["new_book"] = created["id"]
+                elif (method, path) == ("POST", "/api/members/"):
+                    ids["new_member"] = created["id"]
+                elif (method, path) == ("POST", "/api/auth/login"):
+                    # Refreshed and logged out by the cases for those routes
+                    ids["refresh_token"] = created["refresh_token"]
+                    ids["qc_headers"] = {"Authorization": f"Bearer {created['access_token']}"}
+        finally:
+            event.remove(engine, "after_cursor_execute", _count)
+    return results
+
+
+def main():
+    failures = []
+    print(f"{'statements':>10} {'budget':>6}  request")
+    for case, used, response in measure():
+        budget = BUDGETS.get(case)
+        flag = ""
+        if response.status_code >= 300:
+            flag = f"  FAILED {response.status_code}: {response.text[:200]}"
+        elif budget is None:
+            flag = "  NO BUDGET"
+        elif used > budget:
+            flag = "  OVER BUDGET"
+        if flag:
+            failures.append(case)
+        print(f"{used:>10} {budget if budget is not None else '-':>6}  {case}{flag}")
+
+    missing = uncovered_routes()
+    for route in missing:
+        print(f"  NOT COVERED: {route}")
+
+    if failures or missing:
+        print(f"{len(failures)} request(s) failed or went over budget, {len(missing)} route(s) not covered")
+        sys.exit(1)
+    print("All endpoints are within their query budgets.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Fail if a hot query falls back to a full table scan.
+
+Runs the hot endpoints against a freshly seeded SQLite database, captures
+every SELECT/UPDATE/DELETE they issue and checks its EXPLAIN QUERY PLAN.
+A bare `SCAN <table>` (no index) on a table is a violation unless it is
+explicitly allowed for that endpoint, or it walks the table in primary key
+order under a LIMIT (no temp b-tree sort), which stops after one page. Exits with status 1 on violations,
+so it can run in CI.
+
+Run from the backend directory:
+
+    python -m benchmarks.query_plans
+"""
+from pathlib import Path
+import os
+import re
+import sys
+import tempfile
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp.name}/plans.db"
+os.environ["STATS_CACHE_TTL_SECONDS"] = "0"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app.database import engine
+from app.seed_data import seed_database
+
+# (method, path, payload) of each hot endpoint; {book}/{member} are filled in
+# with an open loan from the seeded data
+HOT_REQUESTS = [
+    ("GET", "/api/books/{book}", None),
+    ("GET", "/api/books/?search=harry", None),
+    ("GET", "/api/books/?cursor=&limit=20", None),
+    ("GET", "/api/members/{member}", None),
+    ("GET", "/api/transactions/?member_id={member}", None),
+    ("GET", "/api/transactions/?book_id={book}", None),
+    ("GET", "/api/transactions/?cursor=&limit=20", None),
+    ("GET", "/api/transactions/active-borrows", None),
+    ("GET", "/api/transactions/active-borrows?member_id={member}", None),
+    ("GET", "/api/transactions/active-borrows?cursor=&limit=20", None),
+    ("GET", "/api/transactions/overdue?cursor=&limit=20", None),
+    ("GET", "/api/stats/dashboard", None),
+    ("POST", "/api/transactions/return", {"book_id": "{book}", "member_id": "{member}"}),
+    ("POST", "/api/transactions/borrow", {"book_id": "{book}", "member_id": "{member}"}),
+    ("POST", "/api/transactions/return/batch", {"member_id": "{member}", "book_ids": ["{book}"]}),
+]
+
+# The dashboard reads every stored counter, a table of a few dozen rows
+ALLOWED_SCANS = {
+    "/api/stats/dashboard": {"counters"},
+}
+
+_FULL_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+
+
+def _fill(value, ids):
+    if isinstance(value, str):
+        filled = value.format(**ids)
+        return int(filled) if filled.isdigit() and value.startswith("{") else filled
+    if isinstance(value, list):
+        return [_fill(v, ids) for v in value]
+    if isinstance(value, dict):
+        return {k: _fill(v, ids) for k, v in value.items()}
+    return value
+
+
+def main():
+    seed_database()
+    from app.main import app
+    client = TestClient(app)
+    token = client.post("/api/auth/login", data={"username": "admin", "password": "admin123"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    loans = client.get("/api/transactions/active-borrows", headers=headers).json()
+    if not loans:
+        print("Seed produced no open loans; rerun.")
+        sys.exit(2)
+    ids = {"book": loans[0]["book_id"], "member": loans[0]["member_id"]}
+
+    captured = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().split(" ", 1)[0] in ("SELECT", "UPDATE", "DELETE"):
+            captured.append((statement, parameters))
+
+    violations = 0
+    for method, path, payload in HOT_REQUESTS:
+        url = _fill(path, ids)
+        captured.clear()
+        response = client.request(method, url, json=_fill(payload, ids), headers=headers)
+        statements = list(captured)
+        print(f"{method} {url} -> {response.status_code}")
+
+        raw = engine.raw_connection()
+        try:
+            for statement, parameters in statements:
+                plan = [row[3] for row in raw.cursor().execute(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+                ordered_page = " LIMIT " in statement and not any("TEMP B-TREE" in step for step in plan)
+                for step in plan:
+                    match = _FULL_SCAN.match(step)
+                    if match and not ordered_page and match.group(1) not in ALLOWED_SCANS.get(path.split("?")[0], set()):
+                        violations += 1
+                        print(f"  FULL SCAN: {step}\n    {' '.join(statement.split())}")
+        finally:
+            raw.close()
+
+    if violations:
+        print(f"{violations} hot query plan(s) fall back to a full table scan")
+        sys.exit(1)
+    print("All hot queries use an index.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Check read-replica routing and read-your-writes against SQLite stand-ins.
+
+Seeds a primary SQLite database and snapshots it into two replica files
+(the SQLite backup API plays the part of replication, so the replicas lag
+until the next snapshot). Then checks that:
+
+- every GET route of the API routers reads through `get_read_db` and every
+  other route writes through `get_db`;
+- reads of a caller that hasn't written are spread over the replicas and
+  don't see the primary's newer rows;
+- after a write, the same caller reads the primary, by echoing
+  X-Read-Primary-Until or through the worker's own memory, until
+  REPLICA_STICKY_SECONDS have passed;
+- once replicated, everyone sees the write.
+
+Exits with status 1 if a check fails. Run from the backend directory:
+
+    python -m benchmarks.replica_routing
+"""
+from pathlib import Path
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+_tmp = tempfile.TemporaryDirectory()
+PRIMARY = f"{_tmp.name}/primary.db"
+REPLICAS = [f"{_tmp.name}/replica1.db", f"{_tmp.name}/replica2.db"]
+STICKY_SECONDS = 1.0
+
+os.environ["DATABASE_URL"] = f"sqlite:///{PRIMARY}"
+os.environ["DATABASE_REPLICA_URLS"] = json.dumps([f"sqlite:///{path}" for path in REPLICAS])
+os.environ["REPLICA_STICKY_SECONDS"] = str(STICKY_SECONDS)
+os.environ["STATS_CACHE_TTL_SECONDS"] = "0"
+os.environ["OPEN_LOANS_REFRESH_SECONDS"] = "0"
+
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.database import get_db, get_read_db
+
+failures = []
+
+
+def check(ok: bool, message: str):
+    print(f"{'ok  ' if ok else 'FAIL'} {message}")
+    if not ok:
+        failures.append(message)
+
+
+def replicate():
+    """Copy the primary into every replica, as if replication caught up."""
+    source = sqlite3.connect(PRIMARY)
+    for path in REPLICAS:
+        target = sqlite3.connect(path)
+        source.backup(target)
+        target.close()
+    source.close()
+
+
+def _dependencies(dependant):
+    for sub in dependant.dependencies:
+        yield sub.call
+        yield from _dependencies(sub)
+
+
+def check_route_sessions():
+    from app.routers import books, members, stats, transactions
+
+    for prefix, router in (("/api/books", books.router), ("/api/members", members.router),
+                           ("/api/transactions", transactions.router), ("/api/stats", stats.router)):
+        for route in router.routes:
+            if not isinstance(route, APIRoute):
+                continue
+            calls = set(_dependencies(route.dependant))
+            expected = get_read_db if route.methods == {"GET"} else get_db
+            check(expected in calls and ({get_db, get_read_db} - {expected}).isdisjoint(calls),
+                  f"{'/'.join(sorted(route.methods))} {prefix}{route.path} uses {expected.__name__}")
+
+
+def main():
+    from app.seed_data import seed_database
+    seed_database()
+    replicate()
+
+    check_route_sessions()
+
+    from app.main import app
+    client = TestClient(app)
+
+    def login(username: str, password: str) -> dict:
+        token = client.post("/api/auth/login", data={"username": username, "password": password}).json()
+        return {"Authorization": f"Bearer {token['access_token']}"}
+
+    writer = login("admin", "admin123")
+    reader = login("librarian", "lib123")
+
+    # Counted by database file, for the sync and the async (DB_ASYNC) engines alike
+    replica_reads = [0] * len(REPLICAS)
+
+    @event.listens_for(Engine, "after_cursor_execute")
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        if conn.engine.url.database in REPLICAS:
+            replica_reads[REPLICAS.index(conn.engine.url.database)] += 1
+
+    for _ in range(4):
+        client.get("/api/books/?limit=5", headers=reader)
+    check(all(replica_reads), f"reads spread over both replicas {replica_reads}")
+
+    # Wait out the writer's pin from logging in
+    time.sleep(STICKY_SECONDS)
+    response = client.post("/api/books/", headers=writer, json={
+        "title": "Replica check", "author": "Perpus", "isbn": "replica-check", "category": "Test", "copies": 1,
+    })
+    book_id = response.json()["id"]
+    until = response.headers.get("X-Read-Primary-Until")
+    check(until is not None, "writes answer with X-Read-Primary-Until")
+
+    check(client.get(f"/api/books/{book_id}", headers=reader).status_code == 404,
+          "another caller reads a replica that hasn't seen the write")
+    check(client.get(f"/api/books/{book_id}", headers={**reader, "X-Read-Primary-Until": until}).status_code == 200,
+          "echoing X-Read-Primary-Until reads the primary")
+    check(client.get(f"/api/books/{book_id}", headers=writer).status_code == 200,
+          "the writer reads the primary without echoing the header")
+    stale = client.get("/api/stats/dashboard", headers=reader).json()["books"]["total_books"]
+    fresh = client.get("/api/stats/dashboard", headers=writer).json()["books"]["total_books"]
+    check(fresh == stale + 1, f"dashboard stats: writer sees {fresh}, others {stale}")
+    far = f"{time.time() + 3600:.3f}"
+    check(client.get(f"/api/books/{book_id}", headers={**reader, "X-Read-Primary-Until": far}).status_code == 404,
+          "a deadline beyond REPLICA_STICKY_SECONDS is ignored")
+
+    time.sleep(STICKY_SECONDS)
+    check(client.get(f"/api/books/{book_id}", headers=writer).status_code == 404,
+          "the writer is back on the replicas after REPLICA_STICKY_SECONDS")
+
+    replicate()
+    check(client.get(f"/api/books/{book_id}", headers=reader).status_code == 200,
+          "everyone sees the write once replicated")
+
+    if failures:
+        print(f"{len(failures)} check(s) failed")
+        sys.exit(1)
+    print("Replica routing and read-your-writes hold.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Baseline schema: books, members, users, transactions
+
+Matches the tables that Base.metadata.create_all used to build at import
+time. Databases created that way are stamped at this revision by
+`perpus migrate` and upgraded from here.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+book_status = sa.Enum("AVAILABLE", "BORROWED", "RESERVED", name="bookstatus")
+membership_type = sa.Enum("BASIC", "PREMIUM", "VIP", name="membershiptype")
+member_status = sa.Enum("ACTIVE", "INACTIVE", "EXPIRED", name="memberstatus")
+transaction_type = sa.Enum("BORROW", "RETURN", name="transactiontype")
+
+
+def upgrade():
+    op.create_table(
+        "books",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("author", sa.String(), nullable=False),
+        sa.Column("isbn", sa.String(), nullable=False),
+        sa.Column("category", sa.String(), nullable=False),
+        sa.Column("status", book_status, nullable=True),
+        sa.Column("copies", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    )
+    op.create_index("ix_books_id", "books", ["id"])
+    op.create_index("ix_books_title", "books", ["title"])
+    op.create_index("ix_books_author", "books", ["author"])
+    op.create_index("ix_books_isbn", "books", ["isbn"], unique=True)
+
+    op.create_table(
+        "members",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("phone", sa.String(), nullable=False),
+        sa.Column("membership_type", membership_type, nullable=True),
+        sa.Column("status", member_status, nullable=True),
+        sa.Column("books_count", sa.Integer(), nullable=True),
+        sa.Column("join_date", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    )
+    op.create_index("ix_members_id", "members", ["id"])
+    op.create_index("ix_members_name", "members", ["name"])
+    op.create_index("ix_members_email", "members", ["email"], unique=True)
+
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("username", sa.String(), nullable=False),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("hashed_password", sa.String(), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_username", "users", ["username"], unique=True)
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "transactions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("book_id", sa.Integer(), sa.ForeignKey("books.id"), nullable=False),
+        sa.Column("member_id", sa.Integer(), sa.ForeignKey("members.id"), nullable=False),
+        sa.Column("transaction_type", transaction_type, nullable=False),
+        sa.Column("transaction_date", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("due_date", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("return_date", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    )
+    op.create_index("ix_transactions_id", "transactions", ["id"])
+    op.create_index("ix_transactions_book_id", "transactions", ["book_id"])
+    op.create_index("ix_transactions_member_id", "transactions", ["member_id"])
+
+
+def downgrade():
+    op.drop_table("transactions")
+    op.drop_table("users")
+    op.drop_table("members")
+    op.drop_table("books")
+    bind = op.get_bind()
+    for enum in (transaction_type, member_status, membership_type, book_status):
+        enum.drop(bind, checkfirst=True)
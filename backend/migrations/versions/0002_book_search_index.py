@@ -0,0 +1,87 @@
+"""Full-text search index for the book catalog
+
+SQLite: external-content FTS5 table kept in sync by triggers.
+PostgreSQL: GIN tsvector expression index plus pg_trgm indexes.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+SQLITE_UPGRADE = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+        title, author, isbn,
+        content='books', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS books_fts_ai AFTER INSERT ON books BEGIN
+        INSERT INTO books_fts(rowid, title, author, isbn)
+        VALUES (new.id, new.title, new.author, new.isbn);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS books_fts_ad AFTER DELETE ON books BEGIN
+        INSERT INTO books_fts(books_fts, rowid, title, author, isbn)
+        VALUES ('delete', old.id, old.title, old.author, old.isbn);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS books_fts_au AFTER UPDATE OF title, author, isbn ON books BEGIN
+        INSERT INTO books_fts(books_fts, rowid, title, author, isbn)
+        VALUES ('delete', old.id, old.title, old.author, old.isbn);
+        INSERT INTO books_fts(rowid, title, author, isbn)
+        VALUES (new.id, new.title, new.author, new.isbn);
+    END
+    """,
+    # Index rows that existed before the triggers
+    "INSERT INTO books_fts(books_fts) VALUES ('rebuild')",
+]
+
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER IF EXISTS books_fts_au",
+    "DROP TRIGGER IF EXISTS books_fts_ad",
+    "DROP TRIGGER IF EXISTS books_fts_ai",
+    "DROP TABLE IF EXISTS books_fts",
+]
+
+PG_TSVECTOR = (
+    "to_tsvector('simple', coalesce(title, '') || ' ' || "
+    "coalesce(author, '') || ' ' || coalesce(isbn, ''))"
+)
+
+POSTGRES_UPGRADE = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS ix_books_search_tsv ON books USING GIN ({PG_TSVECTOR})",
+    "CREATE INDEX IF NOT EXISTS ix_books_title_trgm ON books USING GIN (title gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_books_author_trgm ON books USING GIN (author gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_books_isbn_trgm ON books USING GIN (isbn gin_trgm_ops)",
+]
+
+POSTGRES_DOWNGRADE = [
+    "DROP INDEX IF EXISTS ix_books_isbn_trgm",
+    "DROP INDEX IF EXISTS ix_books_author_trgm",
+    "DROP INDEX IF EXISTS ix_books_title_trgm",
+    "DROP INDEX IF EXISTS ix_books_search_tsv",
+]
+
+
+def _run(statements_by_dialect):
+    for statement in statements_by_dialect.get(op.get_bind().dialect.name, []):
+        op.execute(statement)
+
+
+def upgrade():
+    _run({"sqlite": SQLITE_UPGRADE, "postgresql": POSTGRES_UPGRADE})
+
+
+def downgrade():
+    _run({"sqlite": SQLITE_DOWNGRADE, "postgresql": POSTGRES_DOWNGRADE})
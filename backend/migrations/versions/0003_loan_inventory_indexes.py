@@ -0,0 +1,63 @@
+"""Per-title available copies and loan access-path indexes
+
+Adds books.available_copies (backfilled from open loans), the
+(transaction_date, id) history index, the (book_id, member_id, return_date)
+composite index and the open-loan partial indexes.
+
+Databases built by the old create_all startup path may already have some
+of these, so each step checks first.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+OPEN_LOAN_CLAUSE = sa.text("transaction_type = 'BORROW' AND return_date IS NULL")
+
+INDEXES = [
+    ("ix_transactions_date_id", ["transaction_date", "id"], None),
+    ("ix_transactions_book_member_return", ["book_id", "member_id", "return_date"], None),
+    ("ix_transactions_open_member_book", ["member_id", "book_id"], OPEN_LOAN_CLAUSE),
+    ("ix_transactions_open_due", ["due_date", "id"], OPEN_LOAN_CLAUSE),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    if "available_copies" not in {c["name"] for c in inspector.get_columns("books")}:
+        with op.batch_alter_table("books") as batch:
+            batch.add_column(sa.Column("available_copies", sa.Integer(), nullable=False, server_default="0"))
+        # Copies on the shelf = copies minus open loans
+        op.execute("""
+            UPDATE books SET available_copies = MAX(COALESCE(copies, 1) - (
+                SELECT COUNT(*) FROM transactions t
+                WHERE t.book_id = books.id AND t.transaction_type = 'BORROW' AND t.return_date IS NULL
+            ), 0)
+        """ if op.get_bind().dialect.name == "sqlite" else """
+            UPDATE books SET available_copies = GREATEST(COALESCE(copies, 1) - (
+                SELECT COUNT(*) FROM transactions t
+                WHERE t.book_id = books.id AND t.transaction_type = 'BORROW' AND t.return_date IS NULL
+            ), 0)
+        """)
+
+    existing = {index["name"] for index in inspector.get_indexes("transactions")}
+    for name, columns, where in INDEXES:
+        if name in existing:
+            continue
+        op.create_index(name, "transactions", columns, sqlite_where=where, postgresql_where=where)
+
+
+def downgrade():
+    for name, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name="transactions")
+    # Native DROP COLUMN (SQLite 3.35+): a batch rebuild of books would drop
+    # the books_fts triggers of 0002
+    op.drop_column("books", "available_copies")
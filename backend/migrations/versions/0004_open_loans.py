@@ -0,0 +1,43 @@
+"""Open-loans table behind the active-borrows and overdue listings
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "open_loans",
+        sa.Column("transaction_id", sa.Integer(), sa.ForeignKey("transactions.id"), primary_key=True),
+        sa.Column("book_id", sa.Integer(), nullable=False),
+        sa.Column("member_id", sa.Integer(), nullable=False),
+        sa.Column("book_title", sa.String(), nullable=False),
+        sa.Column("member_name", sa.String(), nullable=False),
+        sa.Column("borrow_date", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("due_date", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_open_loans_book_id", "open_loans", ["book_id"])
+    op.create_index("ix_open_loans_member_id", "open_loans", ["member_id"])
+    op.create_index("ix_open_loans_due_transaction", "open_loans", ["due_date", "transaction_id"])
+
+    op.execute("""
+        INSERT INTO open_loans (transaction_id, book_id, member_id, book_title, member_name, borrow_date, due_date)
+        SELECT t.id, t.book_id, t.member_id, COALESCE(b.title, 'Unknown'), COALESCE(m.name, 'Unknown'),
+               t.transaction_date, t.due_date
+        FROM transactions t
+        LEFT JOIN books b ON b.id = t.book_id
+        LEFT JOIN members m ON m.id = t.member_id
+        WHERE t.transaction_type = 'BORROW' AND t.return_date IS NULL
+    """)
+
+
+def downgrade():
+    op.drop_table("open_loans")
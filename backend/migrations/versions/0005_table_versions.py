@@ -0,0 +1,72 @@
+"""Per-table version counters for HTTP validators
+
+One row per tracked table, bumped by triggers on every insert, update and
+delete, so ETags change whatever path (ORM, bulk statements, other workers,
+raw SQL) wrote the data.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+TABLES = ("books", "members", "transactions")
+EVENTS = {"ai": "INSERT", "au": "UPDATE", "ad": "DELETE"}
+
+POSTGRES_FUNCTION = """
+CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger AS $$
+BEGIN
+    UPDATE table_versions SET version = version + 1, updated_at = now() WHERE name = TG_TABLE_NAME;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+
+def upgrade():
+    table_versions = op.create_table(
+        "table_versions",
+        sa.Column("name", sa.String(), primary_key=True),
+        sa.Column("version", sa.Integer(), nullable=False, server_default="1"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.bulk_insert(table_versions, [{"name": table, "version": 1} for table in TABLES])
+
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        # SQLite only has row-level triggers
+        for table in TABLES:
+            for suffix, event in EVENTS.items():
+                op.execute(f"""
+                    CREATE TRIGGER {table}_version_{suffix} AFTER {event} ON {table} BEGIN
+                        UPDATE table_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP
+                        WHERE name = '{table}';
+                    END
+                """)
+    elif dialect == "postgresql":
+        # One bump per statement, so bulk writes don't hammer the counter row
+        op.execute(POSTGRES_FUNCTION)
+        for table in TABLES:
+            op.execute(f"""
+                CREATE TRIGGER {table}_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+                FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()
+            """)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    for table in TABLES:
+        if dialect == "sqlite":
+            for suffix in EVENTS:
+                op.execute(f"DROP TRIGGER IF EXISTS {table}_version_{suffix}")
+        elif dialect == "postgresql":
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_version ON {table}")
+    if dialect == "postgresql":
+        op.execute("DROP FUNCTION IF EXISTS bump_table_version()")
+    op.drop_table("table_versions")
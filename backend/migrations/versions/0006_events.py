@@ -0,0 +1,32 @@
+"""Change events for the database event bus
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "events",
+        # AUTOINCREMENT on SQLite so ids of pruned rows are never reused;
+        # clients resume from the last id they saw
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("type", sa.String(), nullable=False),
+        sa.Column("payload", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sqlite_autoincrement=True,
+    )
+    op.create_index("ix_events_created_at", "events", ["created_at"])
+
+
+def downgrade():
+    op.drop_index("ix_events_created_at", table_name="events")
+    op.drop_table("events")
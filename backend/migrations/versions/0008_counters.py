@@ -0,0 +1,44 @@
+"""Denormalized counters behind the stats endpoints
+
+Filled from the current tables; afterwards the write handlers keep them up
+to date and `app.counters.reconcile` repairs drift.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "counters",
+        sa.Column("name", sa.String(), primary_key=True),
+        sa.Column("value", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+    op.execute("""
+        INSERT INTO counters (name, value)
+        SELECT 'books.total_books', COUNT(*) FROM books
+        UNION ALL SELECT 'books.available', COUNT(*) FROM books WHERE status = 'AVAILABLE'
+        UNION ALL SELECT 'books.borrowed', COUNT(*) FROM books WHERE status = 'BORROWED'
+        UNION ALL SELECT 'books.reserved', COUNT(*) FROM books WHERE status = 'RESERVED'
+        UNION ALL SELECT 'books.total_copies', COALESCE(SUM(copies), 0) FROM books
+        UNION ALL SELECT 'books.available_copies', COALESCE(SUM(available_copies), 0) FROM books
+        UNION ALL SELECT 'members.total_members', COUNT(*) FROM members
+        UNION ALL SELECT 'members.active', COUNT(*) FROM members WHERE status = 'ACTIVE'
+        UNION ALL SELECT 'members.expired', COUNT(*) FROM members WHERE status = 'EXPIRED'
+        UNION ALL SELECT 'loans.active_borrows', COUNT(*) FROM transactions
+            WHERE transaction_type = 'BORROW' AND return_date IS NULL
+        UNION ALL SELECT 'categories.' || category, COUNT(*) FROM books GROUP BY category
+    """)
+
+
+def downgrade():
+    op.drop_table("counters")
@@ -0,0 +1,35 @@
+"""Full-precision transaction dates on SQLite
+
+Rows dated by the CURRENT_TIMESTAMP server default are stored as
+'YYYY-MM-DD HH:MM:SS', while SQLAlchemy writes and binds
+'YYYY-MM-DD HH:MM:SS.ffffff'. SQLite compares the text, so keyset cursors
+on (transaction_date, id) matched their own row again. New rows get their
+date from Python; this pads the existing ones to the same format.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+COLUMNS = (("transactions", "transaction_date"), ("open_loans", "borrow_date"))
+
+
+def upgrade():
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for table, column in COLUMNS:
+        op.execute(f"""
+            UPDATE {table} SET {column} = {column} || '.000000'
+            WHERE length({column}) = 19
+        """)
+
+
+def downgrade():
+    # The padded values are valid in both formats
+    pass
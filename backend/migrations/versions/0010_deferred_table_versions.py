@@ -0,0 +1,75 @@
+"""Bump table versions at commit on PostgreSQL
+
+The statement triggers of 0005 updated the shared `table_versions` row of
+a table inside the writer's transaction, so the row lock was held until
+commit: every borrow and return on every worker queued on the same rows,
+and borrow (books, members, transactions) and return (transactions,
+books, members) took them in opposite orders, which can deadlock.
+
+The bump is now a deferred constraint trigger. It runs once per table and
+transaction, at commit, and locks all version rows in name order first,
+so the locks are held only while committing and always taken in the same
+order. The version still commits atomically with the data it describes.
+(A sequence would take no lock, but `nextval` is visible before the
+writer commits, so a reader could pair the new ETag with the old body.)
+
+SQLite has a single writer at a time, so its row triggers are kept.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+TABLES = ("books", "members", "transactions")
+
+DEFERRED_FUNCTION = """
+CREATE OR REPLACE FUNCTION bump_table_version_at_commit() RETURNS trigger AS $$
+BEGIN
+    -- Row triggers: bump once per table and transaction
+    IF current_setting('perpus.version_bumped_' || TG_TABLE_NAME, true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    PERFORM set_config('perpus.version_bumped_' || TG_TABLE_NAME, 'on', true);
+    PERFORM 1 FROM table_versions ORDER BY name FOR UPDATE;
+    UPDATE table_versions SET version = version + 1, updated_at = now() WHERE name = TG_TABLE_NAME;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+
+def upgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute(DEFERRED_FUNCTION)
+    for table in TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_version ON {table}")
+        op.execute(f"""
+            CREATE CONSTRAINT TRIGGER {table}_version AFTER INSERT OR UPDATE OR DELETE ON {table}
+            DEFERRABLE INITIALLY DEFERRED
+            FOR EACH ROW EXECUTE FUNCTION bump_table_version_at_commit()
+        """)
+        # Constraint triggers can't fire on TRUNCATE, which locks the whole table anyway
+        op.execute(f"""
+            CREATE TRIGGER {table}_version_truncate AFTER TRUNCATE ON {table}
+            FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()
+        """)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    for table in TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_version ON {table}")
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_version_truncate ON {table}")
+        op.execute(f"""
+            CREATE TRIGGER {table}_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+            FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()
+        """)
+    op.execute("DROP FUNCTION IF EXISTS bump_table_version_at_commit()")
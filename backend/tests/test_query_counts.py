@@ -0,0 +1,29 @@
+"""SQL statement budgets per endpoint; see benchmarks/query_counts.py.
+
+After an intentional change in the number of queries, update
+`query_counts.BUDGETS` with the counts `python -m benchmarks.query_counts`
+prints.
+"""
+import pytest
+
+# Imported first: it points the app at the in-memory database
+from benchmarks import query_counts
+
+CASES = [f"{method} {path}" for method, path, _ in query_counts.CASES]
+
+
+@pytest.fixture(scope="module")
+def measured():
+    return {case: (used, response) for case, used, response in query_counts.measure()}
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_within_budget(measured, case):
+    used, response = measured[case]
+    assert response.status_code < 300, response.text[:200]
+    assert case in query_counts.BUDGETS, "no budget for this case"
+    assert used <= query_counts.BUDGETS[case], f"{used} statements, budget {query_counts.BUDGETS[case]}"
+
+
+def test_every_route_has_a_case():
+    assert query_counts.uncovered_routes() == []
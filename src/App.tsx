@@ -5,7 +5,7 @@ import Dashboard from './pages/Dashboard'
 import Books from './pages/Books'
 import Membership from './pages/Membership'
 import Layout from './components/Layout'
-import { getAuthToken, clearAuthToken, checkAuthStatus } from './services/api'
+import { getAuthToken, clearAuthToken, checkAuthStatus, logout } from './services/api'
 
 function App() {
   const [isAuthenticated, setIsAuthenticated] = useState(false)
@@ -33,8 +33,8 @@ function App() {
     setIsAuthenticated(true)
   }
 
-  const handleLogout = () => {
-    clearAuthToken()
+  const handleLogout = async () => {
+    await logout()
     setIsAuthenticated(false)
   }
 
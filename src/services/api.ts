@@ -1,10 +1,25 @@
 export const API_BASE_URL = 'http://localhost:8000'
 
 let authToken: string | null = null
+let refreshToken: string | null = null
+// Refresh in flight, shared by requests that find the access token expired
+let refreshing: Promise<boolean> | null = null
 
-export const setAuthToken = (token: string) => {
+// X-Read-Primary-Until from our last write, sent back with every request so
+// reads see that write even while read replicas catch up
+let readPrimaryUntil: string | null = null
+
+// Last body and ETag per URL. Cacheable reads send If-None-Match and reuse
+// the stored body when the server answers 304 Not Modified.
+const revalidationCache = new Map<string, { etag: string; data: unknown }>()
+
+export const setAuthToken = (token: string, refresh?: string) => {
   authToken = token
   localStorage.setItem('authToken', token)
+  if (refresh) {
+    refreshToken = refresh
+    localStorage.setItem('refreshToken', refresh)
+  }
 }
 
 export const getAuthToken = () => {
@@ -14,9 +29,55 @@ export const getAuthToken = () => {
   return authToken
 }
 
+const getRefreshToken = () => {
+  if (!refreshToken) {
+    refreshToken = localStorage.getItem('refreshToken')
+  }
+  return refreshToken
+}
+
 export const clearAuthToken = () => {
   authToken = null
+  refreshToken = null
   localStorage.removeItem('authToken')
+  localStorage.removeItem('refreshToken')
+  revalidationCache.clear()
+}
+
+// Seconds left before the token's exp claim (0 if it can't be read)
+const secondsUntilExpiry = (token: string) => {
+  try {
+    const payload = JSON.parse(atob(token.split('.')[1].replace(/-/g, '+').replace(/_/g, '/')))
+    return payload.exp - Date.now() / 1000
+  } catch {
+    return 0
+  }
+}
+
+// Trade the refresh token for new tokens; false once the session has ended
+export const refreshAuthToken = (): Promise<boolean> => {
+  if (!refreshing) {
+    refreshing = (async () => {
+      const token = getRefreshToken()
+      if (!token) return false
+      try {
+        const response = await fetch(`${API_BASE_URL}/api/auth/refresh`, {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify({ refresh_token: token }),
+        })
+        if (!response.ok) return false
+        const data = await response.json()
+        setAuthToken(data.access_token, data.refresh_token)
+        return true
+      } catch {
+        return false
+      }
+    })().finally(() => {
+      refreshing = null
+    })
+  }
+  return refreshing
 }
 
 const getHeaders = () => {
@@ -28,14 +89,65 @@ const getHeaders = () => {
   if (token) {
     headers['Authorization'] = `Bearer ${token}`
   }
+  if (readPrimaryUntil) {
+    headers['X-Read-Primary-Until'] = readPrimaryUntil
+  }
 
   return headers
 }
 
+// fetch for authenticated calls. Access tokens are short-lived: refresh one
+// that is about to expire before sending, and if the server still rejects
+// it, refresh once and retry.
+const apiFetch = async (url: string, init: RequestInit = {}): Promise<Response> => {
+  const token = getAuthToken()
+  if (token && secondsUntilExpiry(token) < 30) {
+    await refreshAuthToken()
+  }
+
+  const send = async () => {
+    const response = await fetch(url, { ...init, headers: { ...(init.headers as Record<string, string>), ...getHeaders() } })
+    readPrimaryUntil = response.headers.get('X-Read-Primary-Until') ?? readPrimaryUntil
+    return response
+  }
+  const response = await send()
+  if (response.status === 401 && getRefreshToken() && await refreshAuthToken()) {
+    return send()
+  }
+  return response
+}
+
+const getRevalidated = async <T>(url: string, errorMessage: string): Promise<T> => {
+  const cached = revalidationCache.get(url)
+  const headers = getHeaders()
+  if (cached) {
+    headers['If-None-Match'] = cached.etag
+  }
+
+  // Revalidate ourselves rather than through the browser's HTTP cache
+  const response = await apiFetch(url, { headers, cache: 'no-store' })
+
+  if (response.status === 304 && cached) {
+    return cached.data as T
+  }
+  if (!response.ok) {
+    throw new Error(errorMessage)
+  }
+
+  const data = await response.json()
+  const etag = response.headers.get('ETag')
+  if (etag) {
+    revalidationCache.set(url, { etag, data })
+  } else {
+    revalidationCache.delete(url)
+  }
+  return data as T
+}
+
 // Helper function to handle API responses and token expiration
 const handleApiResponse = async (response: Response) => {
   if (response.status === 401) {
-    // Token expired or invalid - clear it and redirect to login
+    // Session ended (apiFetch already tried refreshing) - clear it and redirect to login
     clearAuthToken()
     window.location.href = '/login'
     throw new Error('Authentication expired. Please login again.')
@@ -59,6 +171,7 @@ export interface Book {
   category: string
   status: BookStatus
   copies: number
+  available_copies: number
   created_at?: string
   updated_at?: string | null
 }
@@ -124,10 +237,23 @@ export const login = async (username: string, password: string) => {
   }
   
   const data = await response.json()
-  setAuthToken(data.access_token)
+  setAuthToken(data.access_token, data.refresh_token)
   return data
 }
 
+// Ends the session on the server (best effort) and forgets the tokens
+export const logout = async () => {
+  try {
+    await apiFetch(`${API_BASE_URL}/api/auth/logout`, {
+      method: 'POST',
+      headers: getHeaders(),
+    })
+  } catch {
+    // Offline: the session still expires on its own
+  }
+  clearAuthToken()
+}
+
 // Books API
 export const getBooks = async (
   params?: { category?: string; status?: string; search?: string }
@@ -137,19 +263,26 @@ export const getBooks = async (
   if (params?.status) queryParams.append('status', params.status)
   if (params?.search) queryParams.append('search', params.search)
   
-  const response = await fetch(`${API_BASE_URL}/api/books?${queryParams}`, {
-    headers: getHeaders(),
-  })
-  
-  if (!response.ok) {
-    throw new Error('Failed to fetch books')
-  }
+  return getRevalidated<Book[]>(`${API_BASE_URL}/api/books/?${queryParams}`, 'Failed to fetch books')
+}
+
+// Only the requested columns (plus id), for grids that don't need full books
+export const getBookFields = async <K extends keyof Book>(
+  fields: K[],
+  params?: { category?: string; status?: string; search?: string; skip?: number; limit?: number }
+): Promise<Pick<Book, K | 'id'>[]> => {
+  const queryParams = new URLSearchParams({ fields: fields.join(',') })
+  if (params?.category) queryParams.append('category', params.category)
+  if (params?.status) queryParams.append('status', params.status)
+  if (params?.search) queryParams.append('search', params.search)
+  if (params?.skip !== undefined) queryParams.append('skip', params.skip.toString())
+  if (params?.limit !== undefined) queryParams.append('limit', params.limit.toString())
   
-  return response.json()
+  return getRevalidated<Pick<Book, K | 'id'>[]>(`${API_BASE_URL}/api/books/?${queryParams}`, 'Failed to fetch books')
 }
 
 export const createBook = async (book: NewBookRequest): Promise<Book> => {
-  const response = await fetch(`${API_BASE_URL}/api/books`, {
+  const response = await apiFetch(`${API_BASE_URL}/api/books`, {
     method: 'POST',
     headers: getHeaders(),
     body: JSON.stringify(book),
@@ -167,7 +300,7 @@ export const getMembers = async (
   if (params?.status) queryParams.append('status', params.status)
   if (params?.search) queryParams.append('search', params.search)
 
-  const response = await fetch(`${API_BASE_URL}/api/members?${queryParams}`, {
+  const response = await apiFetch(`${API_BASE_URL}/api/members?${queryParams}`, {
     headers: getHeaders(),
   })
 
@@ -179,7 +312,7 @@ export const getMembers = async (
 }
 
 export const getMember = async (memberId: number): Promise<Member> => {
-  const response = await fetch(`${API_BASE_URL}/api/members/${memberId}`, {
+  const response = await apiFetch(`${API_BASE_URL}/api/members/${memberId}`, {
     headers: getHeaders(),
   })
 
@@ -192,7 +325,7 @@ export const getMember = async (memberId: number): Promise<Member> => {
 }
 
 export const createMember = async (member: NewMemberRequest): Promise<Member> => {
-  const response = await fetch(`${API_BASE_URL}/api/members`, {
+  const response = await apiFetch(`${API_BASE_URL}/api/members`, {
     method: 'POST',
     headers: getHeaders(),
     body: JSON.stringify(member),
@@ -203,7 +336,7 @@ export const createMember = async (member: NewMemberRequest): Promise<Member> =>
 }
 
 export const updateMember = async (memberId: number, member: UpdateMemberRequest): Promise<Member> => {
-  const response = await fetch(`${API_BASE_URL}/api/members/${memberId}`, {
+  const response = await apiFetch(`${API_BASE_URL}/api/members/${memberId}`, {
     method: 'PUT',
     headers: getHeaders(),
     body: JSON.stringify(member),
@@ -218,7 +351,7 @@ export const updateMember = async (memberId: number, member: UpdateMemberRequest
 }
 
 export const deleteMember = async (memberId: number): Promise<void> => {
-  const response = await fetch(`${API_BASE_URL}/api/members/${memberId}`, {
+  const response = await apiFetch(`${API_BASE_URL}/api/members/${memberId}`, {
     method: 'DELETE',
     headers: getHeaders(),
   })
@@ -229,21 +362,123 @@ export const deleteMember = async (memberId: number): Promise<void> => {
   }
 }
 
-export const getMembersStats = async () => {
-  const response = await fetch(`${API_BASE_URL}/api/members/stats/summary`, {
-    headers: getHeaders(),
-  })
+export const getMembersStats = async () =>
+  getRevalidated<{ total_members: number; active: number; expired: number }>(
+    `${API_BASE_URL}/api/members/stats/summary`,
+    'Failed to fetch members stats'
+  )
+
+export interface DashboardStats {
+  books: {
+    total_books: number
+    available: number
+    borrowed: number
+    reserved: number
+    total_copies: number
+    available_copies: number
+  }
+  members: { total_members: number; active: number; expired: number }
+  loans: { active_borrows: number; overdue: number; due_today: number }
+  // Titles per category
+  categories: Record<string, number>
+  generated_at: string
+}
 
-  if (!response.ok) {
-    throw new Error('Failed to fetch members stats')
+export const getDashboardStats = async (): Promise<DashboardStats> =>
+  getRevalidated<DashboardStats>(`${API_BASE_URL}/api/stats/dashboard`, 'Failed to fetch dashboard stats')
+
+// Live events API
+export type LibraryEventType =
+  | 'borrow'
+  | 'return'
+  | 'book_created'
+  | 'book_updated'
+  | 'book_deleted'
+  | 'books_imported'
+  | 'member_created'
+  | 'member_updated'
+  | 'member_deleted'
+  | 'resync'
+
+export interface LibraryEvent {
+  type: LibraryEventType
+  // Dashboard counter changes keyed "<section>.<counter>", e.g. "loans.overdue"
+  deltas: Record<string, number>
+  at: string
+  [key: string]: unknown
+}
+
+const LIBRARY_EVENT_TYPES: LibraryEventType[] = [
+  'borrow', 'return', 'book_created', 'book_updated', 'book_deleted',
+  'books_imported', 'member_created', 'member_updated', 'member_deleted', 'resync',
+]
+
+// Load getDashboardStats() once, then apply each event with applyStatsDeltas;
+// on 'resync' fetch the stats again. The browser reconnects by itself and the
+// server replays what was missed. Returns a function that closes the stream.
+export const subscribeToEvents = (onEvent: (event: LibraryEvent) => void): (() => void) => {
+  let source: EventSource | null = null
+  let closed = false
+  const listener = (message: MessageEvent) => {
+    onEvent({ type: message.type as LibraryEventType, ...JSON.parse(message.data) })
   }
 
-  return response.json()
+  const open = async () => {
+    const token = getAuthToken()
+    if (token && secondsUntilExpiry(token) < 30) {
+      await refreshAuthToken()
+    }
+    if (closed) return
+    // EventSource can't send an Authorization header
+    source = new EventSource(
+      `${API_BASE_URL}/api/events/stream?access_token=${encodeURIComponent(getAuthToken() ?? '')}`
+    )
+    LIBRARY_EVENT_TYPES.forEach(type => source?.addEventListener(type, listener))
+    source.onerror = () => {
+      // The browser gives up when a reconnect is refused, usually because the
+      // token in the URL has expired: reopen with a fresh one. A new stream
+      // can't resume where the old one stopped, so resync.
+      if (source?.readyState !== EventSource.CLOSED) return
+      setTimeout(async () => {
+        if (!closed && await refreshAuthToken()) {
+          await open()
+          onEvent({ type: 'resync', deltas: {}, at: new Date().toISOString() })
+        }
+      }, 1000)
+    }
+  }
+
+  open()
+  return () => {
+    closed = true
+    source?.close()
+  }
+}
+
+export const applyStatsDeltas = (stats: DashboardStats, deltas: Record<string, number>): DashboardStats => {
+  const next = { books: { ...stats.books }, members: { ...stats.members }, loans: { ...stats.loans } }
+  const categories = { ...stats.categories }
+  for (const [key, value] of Object.entries(deltas)) {
+    const dot = key.indexOf('.')
+    const section = key.slice(0, dot)
+    const counter = key.slice(dot + 1)
+    if (section === 'categories') {
+      // New categories appear, emptied ones go away
+      categories[counter] = (categories[counter] ?? 0) + value
+      if (categories[counter] <= 0) delete categories[counter]
+      continue
+    }
+    const counters = next[section as keyof typeof next] as Record<string, number> | undefined
+    if (counters && counter in counters) {
+      counters[counter] += value
+    }
+  }
+  return { ...stats, ...next, categories }
 }
 
 // Transactions API
 export const borrowBook = async (bookId: number, memberId: number, dueDays: number = 14) => {
-  const response = await fetch(`${API_BASE_URL}/api/transactions/borrow`, {
+  const response = await apiFetch(`${API_BASE_URL}/api/transactions/borrow`, {
     method: 'POST',
     headers: getHeaders(),
     body: JSON.stringify({
@@ -262,7 +497,7 @@ export const borrowBook = async (bookId: number, memberId: number, dueDays: numb
 }
 
 export const returnBook = async (bookId: number, memberId: number) => {
-  const response = await fetch(`${API_BASE_URL}/api/transactions/return`, {
+  const response = await apiFetch(`${API_BASE_URL}/api/transactions/return`, {
     method: 'POST',
     headers: getHeaders(),
     body: JSON.stringify({
@@ -279,12 +514,50 @@ export const returnBook = async (bookId: number, memberId: number) => {
   return response.json()
 }
 
+export interface BatchItemResult {
+  book_id: number
+  ok: boolean
+  transaction_id?: number | null
+  due_date?: string | null
+  is_late?: boolean | null
+  error?: string | null
+}
+
+export interface BatchResult {
+  member_id: number
+  succeeded: number
+  failed: number
+  results: BatchItemResult[]
+}
+
+const postBatch = async (path: string, body: object, fallbackError: string): Promise<BatchResult> => {
+  const response = await apiFetch(`${API_BASE_URL}/api/transactions/${path}`, {
+    method: 'POST',
+    headers: getHeaders(),
+    body: JSON.stringify(body),
+  })
+
+  if (!response.ok) {
+    const error = await response.json().catch(() => null)
+    const detail = error?.detail
+    throw new Error(typeof detail === 'string' ? detail : detail?.message || fallbackError)
+  }
+
+  return response.json()
+}
+
+export const borrowBooksBatch = (memberId: number, bookIds: number[], dueDays: number = 14, atomic: boolean = true) =>
+  postBatch('borrow/batch', { member_id: memberId, book_ids: bookIds, due_days: dueDays, atomic }, 'Failed to borrow books')
+
+export const returnBooksBatch = (memberId: number, bookIds: number[], atomic: boolean = true) =>
+  postBatch('return/batch', { member_id: memberId, book_ids: bookIds, atomic }, 'Failed to return books')
+
 export const getTransactions = async (params?: { book_id?: number; member_id?: number }) => {
   const queryParams = new URLSearchParams()
   if (params?.book_id) queryParams.append('book_id', params.book_id.toString())
   if (params?.member_id) queryParams.append('member_id', params.member_id.toString())
   
-  const response = await fetch(`${API_BASE_URL}/api/transactions?${queryParams}`, {
+  const response = await apiFetch(`${API_BASE_URL}/api/transactions?${queryParams}`, {
     headers: getHeaders(),
   })
   
@@ -295,8 +568,25 @@ export const getTransactions = async (params?: { book_id?: number; member_id?: n
   return response.json()
 }
 
-export const getActiveBorrows = async () => {
-  const response = await fetch(`${API_BASE_URL}/api/transactions/active-borrows`, {
+export interface LoanListParams {
+  book_id?: number
+  member_id?: number
+  skip?: number
+  limit?: number
+}
+
+const loanQuery = (params: Record<string, number | boolean | undefined> = {}) => {
+  const queryParams = new URLSearchParams()
+  Object.entries(params).forEach(([key, value]) => {
+    if (value !== undefined) queryParams.append(key, value.toString())
+  })
+  return queryParams
+}
+
+export const getActiveBorrows = async (
+  params?: LoanListParams & { overdue?: boolean; due_within_days?: number }
+) => {
+  const response = await apiFetch(`${API_BASE_URL}/api/transactions/active-borrows?${loanQuery(params)}`, {
     headers: getHeaders(),
   })
   
@@ -307,6 +597,18 @@ export const getActiveBorrows = async () => {
   return response.json()
 }
 
+export const getOverdueLoans = async (params?: LoanListParams) => {
+  const response = await apiFetch(`${API_BASE_URL}/api/transactions/overdue?${loanQuery(params)}`, {
+    headers: getHeaders(),
+  })
+  
+  if (!response.ok) {
+    throw new Error('Failed to fetch overdue loans')
+  }
+  
+  return response.json()
+}
+
 export const checkApiHealth = async () => {
   const response = await fetch(`${API_BASE_URL}/api/health`, {
     headers: { 'Content-Type': 'application/json' },
@@ -321,7 +623,7 @@ export const checkApiHealth = async () => {
 
 export const checkAuthStatus = async (): Promise<boolean> => {
   try {
-    const response = await fetch(`${API_BASE_URL}/api/auth/me`, {
+    const response = await apiFetch(`${API_BASE_URL}/api/auth/me`, {
       headers: getHeaders(),
     })
     return response.ok